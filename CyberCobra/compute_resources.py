@@ -0,0 +1,198 @@
+"""
+Compute resources of a server process
+OpenCV, the BLAS behind NumPy and the model runtimes each start one thread per core by
+default: with several gunicorn workers, each running several requests, the host ends up
+with far more busy threads than cores. `configure_compute()`, called when a worker boots
+(CyberCobra/wsgi.py, gunicorn.conf.py), gives every process its share of the cores, and
+`heavy_job()` bounds the number of heavy vision jobs (detection, recognition) running at
+once in a process.
+"""
+
+import os
+import sys
+import threading
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+
+
+# Thread count variables read by the BLAS / OpenMP libraries when they are loaded
+BLAS_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+)
+
+
+class ComputeBusy(Exception):
+    """No heavy job slot was freed in time"""
+
+
+_configured = None  # (pid, threads) of the last configure_compute()
+
+
+def default_compute_threads(workers=None):
+    """
+    COMPUTE_THREADS_PER_WORKER, or the cores divided between the `workers` processes of
+    the host (default COMPUTE_WORKER_PROCESSES), at least one
+    """
+    configured = getattr(settings, 'COMPUTE_THREADS_PER_WORKER', None)
+    if configured:
+        return configured
+    workers = workers or getattr(settings, 'COMPUTE_WORKER_PROCESSES', 1) or 1
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def compute_threads():
+    """Threads this process may use: the configured budget, or the default one"""
+    if _configured is not None and _configured[0] == os.getpid():
+        return _configured[1]
+    return default_compute_threads()
+
+
+def configure_compute(threads=None, workers=None):
+    """
+    Limit the thread pools of this process to `threads` (default: its share of the
+    cores among `workers` processes, see default_compute_threads): BLAS environment
+    variables (unless set explicitly), BLAS pools already loaded (with threadpoolctl,
+    when installed), OpenCV and PyTorch if imported. The model runtime and the tile pool
+    created later use the same budget (compute_threads()).
+    Without arguments, a process already configured keeps its budget.
+    Returns the thread count.
+    """
+    global _configured
+    if threads is None and workers is None and _configured is not None and _configured[0] == os.getpid():
+        return _configured[1]
+    threads = threads or default_compute_threads(workers)
+    for name in BLAS_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+    import cv2
+    cv2.setNumThreads(threads)
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(threads)
+    _configured = (os.getpid(), threads)
+    return threads
+
+
+def max_heavy_jobs():
+    """
+    Heavy jobs run at once per process: COMPUTE_MAX_HEAVY_JOBS, by default 2 (one job
+    decoding or encoding while another runs OpenCV / the model) or the micro-batch size,
+    so that batched requests can still be in flight together
+    """
+    configured = getattr(settings, 'COMPUTE_MAX_HEAVY_JOBS', None)
+    if configured:
+        return configured
+    return max(2, getattr(settings, 'FIRE_DETECTION_MAX_BATCH_SIZE', 1))
+
+
+class JobSlots:
+    """
+    Semaphore granting its slots in arrival order: a released slot is handed to the
+    oldest waiter, so a thread that releases and immediately asks again cannot starve
+    the others (threading.Semaphore lets it barge in)
+    """
+
+    def __init__(self, slots):
+        self._free = slots
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self._lock:
+            # Granted between the timeout and this lock
+            if waiter.is_set():
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._free += 1
+
+
+_heavy_jobs = None
+_heavy_jobs_pid = None
+_heavy_jobs_lock = threading.Lock()
+
+
+def _heavy_job_slots():
+    # Created again in forked workers: slots held in the parent at fork time stay held
+    global _heavy_jobs, _heavy_jobs_pid
+    if _heavy_jobs is None or _heavy_jobs_pid != os.getpid():
+        with _heavy_jobs_lock:
+            if _heavy_jobs is None or _heavy_jobs_pid != os.getpid():
+                _heavy_jobs = JobSlots(max_heavy_jobs())
+                _heavy_jobs_pid = os.getpid()
+    return _heavy_jobs
+
+
+@contextmanager
+def heavy_job(timeout=None):
+    """
+    Hold one heavy job slot of this process for the duration of the block.
+    Raises ComputeBusy if no slot is freed within `timeout` seconds
+    (default COMPUTE_HEAVY_JOB_TIMEOUT).
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'COMPUTE_HEAVY_JOB_TIMEOUT', 30.0)
+    slots = _heavy_job_slots()
+    if not slots.acquire(timeout):
+        raise ComputeBusy(f"Server busy: no vision job slot freed within {timeout:g} s, retry later")
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+class HeavyJobStream:
+    """
+    Iterator over `iterable` holding a heavy job slot (see heavy_job) from its creation
+    until it is exhausted or closed: the body of a streaming response runs after the
+    view returned. Raises ComputeBusy when created if no slot is freed in time.
+    Django closes the streamed iterator when the response ends, even if it was never read.
+    """
+
+    def __init__(self, iterable, timeout=None):
+        self._job = ExitStack()
+        self._job.enter_context(heavy_job(timeout))
+        self._iterator = iter(iterable)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        close = getattr(self._iterator, 'close', None)
+        try:
+            if close is not None:
+                close()
+        finally:
+            self._job.close()
@@ -144,6 +144,8 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  
       "https://v0-cyber-cobramain-three.vercel.app",
 ]
+# Readable by the dashboards (conditional polling of the camera list)
+CORS_EXPOSE_HEADERS = ["ETag"]
 
 # -----------------------------
 # REST framework (JWT)
@@ -154,6 +156,107 @@ REST_FRAMEWORK = {
     ),
 }
 
+# -----------------------------
+# Fire detection
+# -----------------------------
+# Compute resources of each server process (CyberCobra/compute_resources.py), applied at
+# worker boot: OpenCV, BLAS and model runtime threads per process (None = cores divided
+# by COMPUTE_WORKER_PROCESSES, the gunicorn worker count), and heavy vision jobs
+# (detection, recognition) run at once per process (None = 2, or the micro-batch size);
+# requests waiting more than COMPUTE_HEAVY_JOB_TIMEOUT seconds get a 503
+COMPUTE_WORKER_PROCESSES = int(os.environ.get("WEB_CONCURRENCY", "1"))
+COMPUTE_THREADS_PER_WORKER = int(os.environ["COMPUTE_THREADS_PER_WORKER"]) if os.environ.get("COMPUTE_THREADS_PER_WORKER") else None
+COMPUTE_MAX_HEAVY_JOBS = int(os.environ["COMPUTE_MAX_HEAVY_JOBS"]) if os.environ.get("COMPUTE_MAX_HEAVY_JOBS") else None
+COMPUTE_HEAVY_JOB_TIMEOUT = float(os.environ.get("COMPUTE_HEAVY_JOB_TIMEOUT", "30"))
+
+# Load the model and run a dummy inference at startup instead of on the first request
+FIRE_DETECTION_WARMUP = os.environ.get("FIRE_DETECTION_WARMUP", "False") == "True"
+
+# Inference backend: "ultralytics" (.pt, PyTorch), "onnxruntime" or "opencv" (exported .onnx)
+FIRE_DETECTION_BACKEND = os.environ.get("FIRE_DETECTION_BACKEND", "ultralytics")
+FIRE_DETECTION_MODEL_PATH = os.environ.get("FIRE_DETECTION_MODEL_PATH") or None
+# Intra-op threads of the model runtime (None = COMPUTE_THREADS_PER_WORKER share)
+FIRE_DETECTION_THREADS = int(os.environ["FIRE_DETECTION_THREADS"]) if os.environ.get("FIRE_DETECTION_THREADS") else None
+# Micro-batching of concurrent inference requests (1 = disabled; needs threaded workers)
+FIRE_DETECTION_MAX_BATCH_SIZE = int(os.environ.get("FIRE_DETECTION_MAX_BATCH_SIZE", "1"))
+FIRE_DETECTION_MAX_BATCH_WAIT_MS = float(os.environ.get("FIRE_DETECTION_MAX_BATCH_WAIT_MS", "10"))
+# Default analysis resolution (longest side in px) when neither the request nor the camera sets one
+FIRE_DETECTION_ANALYSIS_MAX_SIDE = int(os.environ["FIRE_DETECTION_ANALYSIS_MAX_SIDE"]) if os.environ.get("FIRE_DETECTION_ANALYSIS_MAX_SIDE") else None
+# Default size (longest side in px) of annotated images returned by the detection endpoints (None = full)
+FIRE_DETECTION_ANNOTATION_MAX_SIDE = int(os.environ["FIRE_DETECTION_ANNOTATION_MAX_SIDE"]) if os.environ.get("FIRE_DETECTION_ANNOTATION_MAX_SIDE") else None
+# Most fire regions the color heuristic reports per frame (largest first)
+FIRE_DETECTION_MAX_DETECTIONS = int(os.environ.get("FIRE_DETECTION_MAX_DETECTIONS", "100"))
+# Cameras of these resolutions (Camera.resolution, case-insensitive) are analyzed on overlapping
+# full-resolution tiles instead of one downscaled frame
+FIRE_DETECTION_TILED_RESOLUTIONS = [r.strip() for r in os.environ.get("FIRE_DETECTION_TILED_RESOLUTIONS", "4K,2160p").split(",") if r.strip()]
+FIRE_DETECTION_TILE_SIZE = int(os.environ.get("FIRE_DETECTION_TILE_SIZE", "640"))
+FIRE_DETECTION_TILE_OVERLAP = float(os.environ.get("FIRE_DETECTION_TILE_OVERLAP", "0.2"))
+# Threads for the OpenCV work of heuristic tiles (None = one per core) and model tiles per batch
+FIRE_DETECTION_TILE_WORKERS = int(os.environ["FIRE_DETECTION_TILE_WORKERS"]) if os.environ.get("FIRE_DETECTION_TILE_WORKERS") else None
+FIRE_DETECTION_TILE_BATCH_SIZE = int(os.environ.get("FIRE_DETECTION_TILE_BATCH_SIZE", "8"))
+
+# Batch detection (POST /api/cameras/detect-fire-batch/, manage.py detect_fire_dir):
+# pool processes per server process (None or more = the COMPUTE_THREADS_PER_WORKER share),
+# images per batch and uncompressed size per image
+BATCH_DETECTION_PROCESSES = int(os.environ["BATCH_DETECTION_PROCESSES"]) if os.environ.get("BATCH_DETECTION_PROCESSES") else None
+BATCH_DETECTION_MAX_FRAMES = int(os.environ.get("BATCH_DETECTION_MAX_FRAMES", "5000"))
+BATCH_DETECTION_MAX_IMAGE_BYTES = int(os.environ.get("BATCH_DETECTION_MAX_IMAGE_BYTES", str(50 * 1024 * 1024)))
+
+# Asynchronous detection jobs (POST /api/cameras/detect-fire/jobs/): runner threads and
+# queued images per server process (429 beyond), seconds a job may wait in the queue,
+# seconds a finished job is kept, longest long poll (GET ...?wait=; a waiting poll holds
+# a gunicorn thread, so keep it short)
+DETECTION_JOBS_WORKERS = int(os.environ.get("DETECTION_JOBS_WORKERS", "2"))
+DETECTION_JOBS_MAX_QUEUED = int(os.environ.get("DETECTION_JOBS_MAX_QUEUED", "16"))
+DETECTION_JOBS_QUEUE_TIMEOUT = float(os.environ.get("DETECTION_JOBS_QUEUE_TIMEOUT", "120"))
+DETECTION_JOBS_RESULT_TTL = float(os.environ.get("DETECTION_JOBS_RESULT_TTL", "600"))
+DETECTION_JOBS_MAX_WAIT = float(os.environ.get("DETECTION_JOBS_MAX_WAIT", "5"))
+
+# Positive detections stored as DetectionEvent rows, written in batches of
+# DETECTION_EVENTS_BATCH_SIZE events or every DETECTION_EVENTS_FLUSH_MS ms
+DETECTION_EVENTS_ENABLED = os.environ.get("DETECTION_EVENTS_ENABLED", "True") == "True"
+DETECTION_EVENTS_BATCH_SIZE = int(os.environ.get("DETECTION_EVENTS_BATCH_SIZE", "100"))
+DETECTION_EVENTS_FLUSH_MS = float(os.environ.get("DETECTION_EVENTS_FLUSH_MS", "1000"))
+# Retention applied by `manage.py prune_detection_events`: events are downsampled after
+# DETECTION_EVENTS_DOWNSAMPLE_DAYS and deleted after DETECTION_EVENTS_RETENTION_DAYS
+DETECTION_EVENTS_RETENTION_DAYS = float(os.environ.get("DETECTION_EVENTS_RETENTION_DAYS", "90"))
+DETECTION_EVENTS_DOWNSAMPLE_DAYS = float(os.environ.get("DETECTION_EVENTS_DOWNSAMPLE_DAYS", "7"))
+
+# -----------------------------
+# Camera ingestion
+# -----------------------------
+# Most cameras created, updated or deleted by one request to /api/cameras/bulk/
+CAMERA_BULK_MAX_ITEMS = int(os.environ.get("CAMERA_BULK_MAX_ITEMS", "1000"))
+# Stream URL of a camera ({ip} and {id} placeholders)
+CAMERA_STREAM_URL_TEMPLATE = os.environ.get("CAMERA_STREAM_URL_TEMPLATE", "rtsp://{ip}:554/stream")
+# Per-camera stats written by `manage.py ingest_cameras`, served by /api/cameras/ingestion-stats/
+CAMERA_INGESTION_STATS_FILE = os.environ.get("CAMERA_INGESTION_STATS_FILE", str(BASE_DIR / "ingestion_stats.json"))
+# Detection priority of the cameras of each zone type (zone_type -> weight, default 1.0),
+# used by `ingest_cameras --detection-workers`
+DETECTION_ZONE_TYPE_WEIGHTS = {}
+# Camera health probes (`manage.py probe_cameras`): "tcp" (connect) or "http" (HEAD),
+# port (empty = the port of CAMERA_STREAM_URL_TEMPLATE), seconds per attempt, probes in
+# flight, attempts after a failure before a camera counts as down
+CAMERA_HEALTH_METHOD = os.environ.get("CAMERA_HEALTH_METHOD", "tcp")
+CAMERA_HEALTH_PORT = int(os.environ["CAMERA_HEALTH_PORT"]) if os.environ.get("CAMERA_HEALTH_PORT") else None
+CAMERA_HEALTH_TIMEOUT = float(os.environ.get("CAMERA_HEALTH_TIMEOUT", "2.0"))
+CAMERA_HEALTH_CONCURRENCY = int(os.environ.get("CAMERA_HEALTH_CONCURRENCY", "256"))
+CAMERA_HEALTH_RETRIES = int(os.environ.get("CAMERA_HEALTH_RETRIES", "1"))
+CAMERA_HEALTH_HTTP_PATH = os.environ.get("CAMERA_HEALTH_HTTP_PATH", "/")
+# Motion gating of ingested frames: "average", "mog2" or empty (disabled)
+CAMERA_MOTION_GATE = os.environ.get("CAMERA_MOTION_GATE") or None
+# Temporal smoothing of ingested verdicts: a camera enters the fire/smoke state when the
+# moving confidence (time constant FIRE_TRACKER_TIME_CONSTANT s) of a tracked box reaches
+# FIRE_TRACKER_ENTER_THRESHOLD and leaves it below FIRE_TRACKER_CLEAR_THRESHOLD; events and
+# alerts are only emitted when fire or smoke starts
+FIRE_TRACKER_ENABLED = os.environ.get("FIRE_TRACKER_ENABLED", "True") == "True"
+FIRE_TRACKER_ENTER_THRESHOLD = float(os.environ.get("FIRE_TRACKER_ENTER_THRESHOLD", "0.35"))
+FIRE_TRACKER_CLEAR_THRESHOLD = float(os.environ.get("FIRE_TRACKER_CLEAR_THRESHOLD", "0.1"))
+FIRE_TRACKER_TIME_CONSTANT = float(os.environ.get("FIRE_TRACKER_TIME_CONSTANT", "4.0"))
+FIRE_TRACKER_IOU_THRESHOLD = float(os.environ.get("FIRE_TRACKER_IOU_THRESHOLD", "0.3"))
+# Tracks kept per camera (the weakest are dropped beyond)
+FIRE_TRACKER_MAX_TRACKS = int(os.environ.get("FIRE_TRACKER_MAX_TRACKS", "64"))
+
 # -----------------------------
 # Optional: disable heavy libs on Render
 # -----------------------------
@@ -13,4 +13,19 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
 
+# Per-process OpenCV / BLAS / model runtime threads, before the vision libraries start
+# their pools (kept if gunicorn.conf.py already configured this worker)
+from CyberCobra.compute_resources import configure_compute  # noqa: E402
+
+configure_compute()
+
 application = get_wsgi_application()
+
+# Opt-in: load the fire detection model before the worker accepts traffic. Done here,
+# not in AppConfig.ready(), so migrate and the other management commands never load it
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'FIRE_DETECTION_WARMUP', False):
+    from gestion_camera.fire_detection_service import get_fire_detector
+
+    get_fire_detector().warmup()
@@ -0,0 +1,154 @@
+"""
+Benchmark of the camera health prober against local stand-in sockets
+Simulates a fleet of --cameras cameras on the loopback interface:
+- up: a server accepting connections (and answering HEAD after --latency-ms)
+- refused (--refused-fraction): a closed port
+- timeout (--timeout-fraction): a socket that never accepts (its backlog is full, so
+  connection attempts hang like on an unplugged camera); in http mode, a server that
+  accepts but never answers
+
+and probes them at each --concurrency level, reporting elapsed time, probes/s, up/down
+counts against the expected ones and the latency distribution. No database access.
+
+Usage:
+    python bench_camera_health.py [--cameras 5000] [--method tcp|http] [--concurrency 16,256,1024]
+        [--timeout 1.0] [--retries 0] [--refused-fraction 0.05] [--timeout-fraction 0.01]
+        [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import socket
+import threading
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+from gestion_camera.health_probe import PROBE_METHODS, probe_summary, run_probes
+
+
+HOST = '127.0.0.1'
+
+
+class StandInCameras:
+    """Stand-in servers run by an event loop in a background thread"""
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='stand-in-cameras', daemon=True)
+        self.thread.start()
+        self.up_port = self.run(self.serve(self.answer))
+        self.silent_port = self.run(self.serve(self.stay_silent))
+        self.refused_port = self.free_port()
+        # Never accepted: once its one-connection backlog is full, SYNs are dropped
+        self.hanging = socket.socket()
+        self.hanging.bind((HOST, 0))
+        self.hanging.listen(0)
+        self.hanging_port = self.hanging.getsockname()[1]
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def serve(self, handler):
+        server = await asyncio.start_server(handler, HOST, 0, backlog=4096)
+        return server.sockets[0].getsockname()[1]
+
+    async def answer(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+            if request.startswith(b'HEAD'):
+                await asyncio.sleep(self.latency)
+                writer.write(b'HTTP/1.0 401 Unauthorized\r\nWWW-Authenticate: Digest realm="camera"\r\n\r\n')
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stay_silent(self, reader, writer):
+        try:
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def free_port():
+        with socket.socket() as sock:
+            sock.bind((HOST, 0))
+            return sock.getsockname()[1]
+
+    def close(self):
+        self.hanging.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def raise_file_limit():
+    """Probes and stand-in servers hold two descriptors per connection in flight"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def fleet(args, cameras):
+    """(key, host, port) targets and the number expected up"""
+    rng = random.Random(args.seed)
+    timeout_port = cameras.hanging_port if args.method == 'tcp' else cameras.silent_port
+    targets, expected_up = [], 0
+    for key in range(args.cameras):
+        draw = rng.random()
+        if draw < args.refused_fraction:
+            port = cameras.refused_port
+        elif draw < args.refused_fraction + args.timeout_fraction:
+            port = timeout_port
+        else:
+            port = cameras.up_port
+            expected_up += 1
+        targets.append((key, HOST, port))
+    return targets, expected_up
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cameras', type=int, default=5000)
+    parser.add_argument('--method', choices=PROBE_METHODS, default='tcp')
+    parser.add_argument('--concurrency', default='16,256,1024', help="Concurrency levels, separated by commas")
+    parser.add_argument('--timeout', type=float, default=1.0, help="Seconds per attempt")
+    parser.add_argument('--retries', type=int, default=0)
+    parser.add_argument('--refused-fraction', type=float, default=0.05)
+    parser.add_argument('--timeout-fraction', type=float, default=0.01)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="Delay of the stand-in HEAD answers")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    limit = raise_file_limit()
+    cameras = StandInCameras(args.latency_ms)
+    targets, expected_up = fleet(args, cameras)
+    print(f"{args.cameras} stand-in cameras ({expected_up} up), {args.method} probes, "
+          f"timeout {args.timeout:g} s, {args.retries} retries, open file limit {limit}\n")
+    print(f"{'concurrency':>11} {'elapsed s':>10} {'probes/s':>9} {'up':>6} {'down':>6} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}  errors")
+    try:
+        for concurrency in (int(value) for value in args.concurrency.split(',')):
+            started = time.perf_counter()
+            results = run_probes(targets, method=args.method, timeout=args.timeout,
+                                 concurrency=concurrency, retries=args.retries)
+            summary = probe_summary(results, time.perf_counter() - started)
+            print(f"{concurrency:>11} {summary['elapsed_s']:>10.2f} {summary['probes_per_s']:>9.0f} "
+                  f"{summary['up']:>6} {summary['down']:>6} {summary['p50_ms'] or 0:>8.2f} "
+                  f"{summary['p90_ms'] or 0:>8.2f} {summary['p99_ms'] or 0:>8.2f}  {summary['errors']}")
+    finally:
+        cameras.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Simulation benchmark of the multi-camera detection scheduler
+Discrete-event simulation (virtual time, no real detection) of N cameras sharing W
+detection workers, comparing:
+- fifo: every camera sampled at a fixed rate, frames queued in one unbounded FIFO
+- scheduler: DetectionScheduler (priorities, adaptive sampling, frame shedding)
+
+Reports, per camera class: analyses/s and fairness (Jain's index of the analyses of
+the cameras of the class that never had a fire, since fires boost their camera;
+1.0 = evenly shared), peak queued frames, and fire detection
+latency (time from fire start to the first analysis that flags it).
+
+Usage:
+    python bench_detection_scheduler.py [--cameras 60] [--workers 4] [--service-ms 40]
+        [--fifo-fps 2] [--duration 300] [--fires 30] [--seed 0]
+"""
+import argparse
+import heapq
+import os
+import random
+from collections import deque
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import numpy as np
+
+from gestion_camera.detection_scheduler import DetectionScheduler
+
+
+CAMERA_FPS = 10.0
+DETECTION_PROBABILITY = 0.9  # chance an analysis of a burning scene flags it
+
+
+class SimCamera:
+    def __init__(self, camera_id, priority, status):
+        self.camera_id = camera_id
+        self.priority = priority
+        self.status = status
+        self.label = 'maintenance' if status != 'RECORDING' else ('critical' if priority > 1 else 'normal')
+        self.fire_since = None
+        self.had_fire = False
+        self.analyzed = 0
+
+
+def build_cameras(count, rng):
+    cameras = []
+    for camera_id in range(count):
+        if camera_id % 10 == 9:
+            cameras.append(SimCamera(camera_id, 1.0, 'MAINTENANCE'))
+        elif camera_id % 4 == 0:
+            cameras.append(SimCamera(camera_id, 3.0, 'RECORDING'))
+        else:
+            cameras.append(SimCamera(camera_id, 1.0, 'RECORDING'))
+    return cameras
+
+
+def fire_schedule(cameras, fires, duration, rng):
+    recording = [c for c in cameras if c.status == 'RECORDING']
+    return sorted((rng.uniform(5, duration - 30), rng.choice(recording).camera_id) for _ in range(fires))
+
+
+class Simulation:
+    """Shared event loop; policies implement on_frame / next_job / on_done"""
+
+    def __init__(self, cameras, workers, service_ms, duration, fires, rng):
+        self.cameras = {c.camera_id: c for c in cameras}
+        self.workers = workers
+        self.service = service_ms / 1000
+        self.duration = duration
+        self.fires = fires
+        self.rng = rng
+        self.latencies = {label: [] for label in ('critical', 'normal')}
+        self.peak_queued = 0
+
+    def run(self):
+        events = []
+        for camera in self.cameras.values():
+            heapq.heappush(events, (self.rng.uniform(0, 1 / CAMERA_FPS), 'frame', camera.camera_id))
+        for start, camera_id in self.fires:
+            heapq.heappush(events, (start, 'fire', camera_id))
+        idle = self.workers
+        while events:
+            now, kind, payload = heapq.heappop(events)
+            if now > self.duration:
+                break
+            if kind == 'frame':
+                self.on_frame(self.cameras[payload], now)
+                heapq.heappush(events, (now + 1 / CAMERA_FPS, 'frame', payload))
+            elif kind == 'fire':
+                if self.cameras[payload].fire_since is None:
+                    self.cameras[payload].fire_since = now
+                    self.cameras[payload].had_fire = True
+            else:
+                idle += 1
+                self.finish(payload, now)
+            while idle:
+                job = self.next_job(now)
+                if job is None:
+                    break
+                idle -= 1
+                service = self.service * self.rng.lognormvariate(0, 0.3)
+                heapq.heappush(events, (now + service, 'done', job))
+        return self
+
+    def finish(self, job, now):
+        camera = self.cameras[job['camera_id']]
+        camera.analyzed += 1
+        # The frame shows fire if it was captured after the fire started
+        detected = (camera.fire_since is not None and job['captured_at'] >= camera.fire_since
+                    and self.rng.random() < DETECTION_PROBABILITY)
+        if detected:
+            self.latencies[camera.label].append(now - camera.fire_since)
+            camera.fire_since = None
+        self.on_done(job, detected, now)
+
+
+class FifoSimulation(Simulation):
+    def __init__(self, *args, fifo_fps=2.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = 1 / fifo_fps
+        self.queue = deque()
+        self.next_sample = {}
+
+    def on_frame(self, camera, now):
+        if camera.status != 'RECORDING' or now < self.next_sample.get(camera.camera_id, 0.0):
+            return
+        self.next_sample[camera.camera_id] = now + self.interval
+        self.queue.append({'camera_id': camera.camera_id, 'captured_at': now})
+        self.peak_queued = max(self.peak_queued, len(self.queue))
+
+    def next_job(self, now):
+        return self.queue.popleft() if self.queue else None
+
+    def on_done(self, job, detected, now):
+        pass
+
+
+class SchedulerSimulation(Simulation):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = DetectionScheduler(clock=lambda: 0.0)
+        for camera in self.cameras.values():
+            self.scheduler.register(camera.camera_id, camera.priority, camera.status, now=0.0)
+
+    def on_frame(self, camera, now):
+        if self.scheduler.wants_frame(camera.camera_id, now):
+            self.scheduler.offer(camera.camera_id, None, now, now=now)
+            pending = sum(1 for s in self.scheduler.cameras.values() if s.pending is not None)
+            self.peak_queued = max(self.peak_queued, pending)
+
+    def next_job(self, now):
+        job = self.scheduler.acquire(now=now)
+        if job is None:
+            return None
+        return {'camera_id': job.camera_id, 'captured_at': job.captured_at, 'job': job}
+
+    def on_done(self, job, detected, now):
+        self.scheduler.complete(job['job'], detected, now=now)
+
+    def shed(self):
+        stats = [s.stats for s in self.scheduler.cameras.values()]
+        return sum(s['shed_superseded'] + s['shed_stale'] for s in stats)
+
+
+def jain(values):
+    values = np.asarray(values, dtype=float)
+    return float(values.sum() ** 2 / (len(values) * (values ** 2).sum())) if values.any() else None
+
+
+def report(name, sim):
+    cameras = list(sim.cameras.values())
+    print(f"\n[{name}]")
+    for label in ('critical', 'normal', 'maintenance'):
+        group = [c for c in cameras if c.label == label]
+        if group:
+            rate = sum(c.analyzed for c in group) / len(group) / sim.duration
+            fairness = jain([c.analyzed for c in group if not c.had_fire])
+            print(f"  {label:<12} {len(group):>3} cameras  {rate:>5.2f} analyses/s per camera  "
+                  f"fairness {'n/a' if fairness is None else f'{fairness:.3f}'}")
+    print(f"  peak queued frames                  {sim.peak_queued}")
+    if isinstance(sim, SchedulerSimulation):
+        print(f"  frames shed                         {sim.shed()}")
+    undetected = sum(1 for c in cameras if c.fire_since is not None)
+    for label, values in sim.latencies.items():
+        if values:
+            print(f"  detection latency {label:<9} p50 {np.percentile(values, 50):6.2f}s  "
+                  f"p95 {np.percentile(values, 95):6.2f}s  max {max(values):6.2f}s  (n={len(values)})")
+    print(f"  fires never detected                {undetected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cameras', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--service-ms', type=float, default=40.0, help="Mean detection time per frame")
+    parser.add_argument('--fifo-fps', type=float, default=2.0, help="Fixed sampling rate of the FIFO baseline")
+    parser.add_argument('--duration', type=float, default=300.0, help="Simulated seconds")
+    parser.add_argument('--fires', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    capacity = args.workers / (args.service_ms / 1000)
+    print(f"{args.cameras} cameras, {args.workers} workers, capacity ~{capacity:.0f} analyses/s, "
+          f"{args.duration:.0f}s simulated")
+
+    for name, cls, extra in (('fifo', FifoSimulation, {'fifo_fps': args.fifo_fps}),
+                             ('scheduler', SchedulerSimulation, {})):
+        rng = random.Random(args.seed)
+        cameras = build_cameras(args.cameras, rng)
+        fires = fire_schedule(cameras, args.fires, args.duration, rng)
+        sim = cls(cameras, args.workers, args.service_ms, args.duration, fires, rng, **extra).run()
+        report(name, sim)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Equivalence check and benchmark of the fire color classifier
+Compares FireDetectionService.fire_color_mask (lookup tables) with the previous
+pipeline (one cv2.inRange per fire color range, OR-ed together):
+- equivalence on every one of the 16.7M BGR colors, on sample images and on noise frames
+- timing of both at common camera resolutions
+
+Usage:
+    python bench_fire_color_mask.py [--images media/tmp] [--runs 20]
+
+Exits with status 1 if any mask differs.
+"""
+import argparse
+import os
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+
+from gestion_camera.fire_detection_service import FireDetectionService
+
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '4K': (3840, 2160)}
+
+
+def inrange_mask(hsv, ranges):
+    """Reference: the five-mask pipeline previously inlined in detect_fire_heuristic"""
+    fire_mask = None
+    for lower, upper in ranges:
+        mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+        fire_mask = mask if fire_mask is None else cv2.bitwise_or(fire_mask, mask)
+    return fire_mask
+
+
+def all_colors_frame():
+    """4096x4096 BGR frame containing every 24-bit color exactly once"""
+    colors = np.arange(1 << 24, dtype=np.uint32)
+    frame = np.stack([(colors >> 16) & 255, (colors >> 8) & 255, colors & 255], axis=1).astype(np.uint8)
+    return frame.reshape(4096, 4096, 3)
+
+
+def sample_frames(directory):
+    frames = {}
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            img = cv2.imread(os.path.join(directory, name))
+            if img is not None:
+                frames[name] = img
+    rng = np.random.default_rng(0)
+    frames['noise-1080p'] = rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    return frames
+
+
+def timed(fn, runs):
+    fn()
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default=os.path.join('media', 'tmp'))
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    service = FireDetectionService()
+    ranges = service.fire_hsv_ranges
+
+    mismatches = 0
+    frames = {'all-24bit-colors': all_colors_frame(), **sample_frames(args.images)}
+    print("Equivalence (LUT vs inRange)")
+    for name, frame in frames.items():
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        differing = int(np.count_nonzero(service.fire_color_mask(hsv) != inrange_mask(hsv, ranges)))
+        mismatches += differing
+        print(f"  {name:<40} {'OK' if not differing else f'{differing} pixels differ'}")
+
+    print(f"\n{'resolution':<10} {'inRange ms':>11} {'LUT ms':>8} {'speedup':>8}")
+    rng = np.random.default_rng(1)
+    for label, (w, h) in RESOLUTIONS.items():
+        hsv = cv2.cvtColor(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), cv2.COLOR_BGR2HSV)
+        legacy_ms = timed(lambda: inrange_mask(hsv, ranges), args.runs)
+        lut_ms = timed(lambda: service.fire_color_mask(hsv), args.runs)
+        print(f"{label:<10} {legacy_ms:>11.2f} {lut_ms:>8.2f} {legacy_ms / lut_ms:>7.2f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
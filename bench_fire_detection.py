@@ -0,0 +1,349 @@
+"""
+Benchmark of the fire detection service on synthetic scenes and recorded frames
+Times separately, per frame:
+- heuristic: detect_fire_heuristic on a decoded frame, without annotation (camera polling)
+- in_image: detect_fire_in_image from JPEG bytes, annotated (request path: decode,
+  heuristic, model when loaded and nothing was found, drawing)
+- base64: image_to_base64 of the annotated image (JSON response encoding)
+
+and reports, per stage and resolution, throughput (frames/s on one thread and frames per
+CPU-second, i.e. per core), p50/p95 latency, and the precision/recall of the detections:
+frame level (an alert is raised) and box level (boxes matching a labelled fire, IoU >= --iou).
+
+Synthetic scenes: a textured background with flame-colored blobs of several sizes, noise
+levels and resolutions, plus negatives with and without warm-colored distractors.
+Recorded frames (--frames DIR): images from DIR; labels are read from DIR/labels.json
+({"name.jpg": [[x1, y1, x2, y2], ...]} or {"name.jpg": true}) or, failing that, from the
+sub-directory name (images under fire/ or smoke/ are positive, the others negative).
+
+Usage:
+    python bench_fire_detection.py [--resolutions 720p,1080p,4K] [--frames dir] [--repeat 3]
+        [--analysis-max-side 960] [--save baseline.json] [--compare baseline.json]
+
+With --compare, differences with a saved baseline are printed and the exit status is 1
+if a stage got slower (p95) or less accurate than --tolerance allows.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+
+from gestion_camera.fire_detection_service import get_fire_detector
+from gestion_camera.frame_context import FrameContext
+
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '4K': (3840, 2160)}
+# Blob radius as a fraction of the frame height
+BLOB_SIZES = {'small': 0.02, 'medium': 0.06, 'large': 0.15}
+NOISE_LEVELS = (0, 8)
+STAGES = ('heuristic', 'in_image', 'base64')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def background(width, height, rng):
+    """Gray-blue scene with walls, a floor gradient and some furniture"""
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[:] = (85, 90, 95)
+    frame[height * 2 // 3:] = np.linspace((60, 65, 70), (40, 45, 50), height - height * 2 // 3)[:, None, :]
+    for _ in range(6):
+        x, y = int(rng.uniform(0, width * 0.8)), int(rng.uniform(0, height * 0.8))
+        w, h = int(rng.uniform(0.05, 0.2) * width), int(rng.uniform(0.05, 0.3) * height)
+        shade = rng.integers(40, 160)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (int(shade), int(shade), int(shade * 0.9)), -1)
+    return frame
+
+
+def draw_flame(frame, center, radius, rng):
+    """Flame-colored blob (orange halo, yellow core); returns its box"""
+    x, y = center
+    axes = (radius, int(radius * 1.6))
+    cv2.ellipse(frame, (x, y), axes, 0, 0, 360, (0, int(rng.uniform(100, 150)), 255), -1)
+    cv2.ellipse(frame, (x, y + axes[1] // 4), (axes[0] // 2, axes[1] // 2), 0, 0, 360, (80, 220, 255), -1)
+    return [x - axes[0], y - axes[1], x + axes[0], y + axes[1]]
+
+
+def add_noise(frame, sigma, rng):
+    if not sigma:
+        return frame
+    noise = rng.normal(0, sigma, frame.shape)
+    return np.clip(frame.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_scenes(resolutions, seed=0):
+    """Yields (name, resolution label, BGR frame, labelled fire boxes)"""
+    rng = np.random.default_rng(seed)
+    for label in resolutions:
+        width, height = RESOLUTIONS[label]
+        for sigma in NOISE_LEVELS:
+            for size, fraction in BLOB_SIZES.items():
+                frame = background(width, height, rng)
+                radius = max(3, int(fraction * height))
+                center = (int(rng.uniform(0.2, 0.8) * width), int(rng.uniform(0.3, 0.7) * height))
+                box = draw_flame(frame, center, radius, rng)
+                yield f"{label} {size} fire, noise {sigma}", label, add_noise(frame, sigma, rng), [box]
+            frame = background(width, height, rng)
+            yield f"{label} empty, noise {sigma}", label, add_noise(frame, sigma, rng), []
+            # Warm but not flame-colored objects: a brown door and a beige sofa
+            frame = background(width, height, rng)
+            cv2.rectangle(frame, (width // 10, height // 4), (width // 10 + width // 12, height * 3 // 4), (30, 60, 120), -1)
+            cv2.rectangle(frame, (width // 2, height // 2), (width // 2 + width // 4, height // 2 + height // 6), (150, 190, 215), -1)
+            yield f"{label} distractors, noise {sigma}", label, add_noise(frame, sigma, rng), []
+
+
+def recorded_frames(directory):
+    """Yields (name, 'recorded', BGR frame, labelled boxes or True/False/None)"""
+    labels = {}
+    labels_path = os.path.join(directory, 'labels.json')
+    if os.path.exists(labels_path):
+        with open(labels_path) as handle:
+            labels = json.load(handle)
+    for root, _, names in sorted(os.walk(directory)):
+        for name in sorted(names):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            relative = os.path.relpath(path, directory)
+            if labels:
+                truth = labels.get(relative, labels.get(name))
+            else:
+                parts = relative.split(os.sep)
+                truth = parts[0] in ('fire', 'smoke') if len(parts) > 1 else None
+            yield relative, 'recorded', frame, truth
+
+
+def iou(a, b):
+    x1, y1, x2, y2 = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_boxes(predicted, labelled, threshold):
+    """(true positives, false positives, false negatives) of a greedy one-to-one IoU matching"""
+    unmatched = list(labelled)
+    true_positives = 0
+    for box in predicted:
+        best = max(unmatched, key=lambda other: iou(box, other), default=None)
+        if best is not None and iou(box, best) >= threshold:
+            unmatched.remove(best)
+            true_positives += 1
+    return true_positives, len(predicted) - true_positives, len(unmatched)
+
+
+class Counts:
+    """Frame- and box-level confusion counts of one stage"""
+
+    def __init__(self):
+        self.frame = {'tp': 0, 'fp': 0, 'fn': 0}
+        self.box = {'tp': 0, 'fp': 0, 'fn': 0}
+
+    def add(self, result, truth, iou_threshold):
+        if truth is None:
+            return
+        alert = bool(result['fire_detected'] or result['smoke_detected'])
+        positive = bool(truth)
+        if alert and positive:
+            self.frame['tp'] += 1
+        elif alert:
+            self.frame['fp'] += 1
+        elif positive:
+            self.frame['fn'] += 1
+        if isinstance(truth, list):
+            tp, fp, fn = match_boxes([d['bbox'] for d in result['detections']], truth, iou_threshold)
+            self.box['tp'] += tp
+            self.box['fp'] += fp
+            self.box['fn'] += fn
+
+    @staticmethod
+    def ratios(counts):
+        predicted, actual = counts['tp'] + counts['fp'], counts['tp'] + counts['fn']
+        return {
+            'precision': round(counts['tp'] / predicted, 4) if predicted else None,
+            'recall': round(counts['tp'] / actual, 4) if actual else None,
+        }
+
+    def summary(self):
+        return {'frame': self.ratios(self.frame), 'box': self.ratios(self.box)}
+
+
+def timed(fn, repeat):
+    """Result of the last call, per-call wall times (ms) and total CPU seconds of the repeats"""
+    wall, cpu_start = [], time.process_time()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        wall.append((time.perf_counter() - start) * 1000)
+    return result, wall, time.process_time() - cpu_start
+
+
+def timing_summary(wall_ms, cpu_s):
+    wall = np.array(wall_ms)
+    return {
+        'frames': len(wall),
+        'fps': round(1000 / float(wall.mean()), 2),
+        'fps_per_core': round(len(wall) / cpu_s, 2) if cpu_s > 0 else None,
+        'mean_ms': round(float(wall.mean()), 3),
+        'p50_ms': round(float(np.percentile(wall, 50)), 3),
+        'p95_ms': round(float(np.percentile(wall, 95)), 3),
+    }
+
+
+def run(scenes, args):
+    detector = get_fire_detector()
+    timings, counts, names = {}, {}, []
+    for name, group, frame, truth in scenes:
+        names.append(name)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        jpeg_bytes = encoded.tobytes()
+        # Warm-up (lookup tables, thread pools, first inference)
+        detector.detect_fire_in_image(jpeg_bytes, analysis_max_side=args.analysis_max_side)
+
+        # Fresh FrameContext per call: conversions cached by a previous call are not reused
+        heuristic, wall, cpu = timed(lambda: detector.detect_fire_heuristic(
+            FrameContext.from_bgr(frame), analysis_max_side=args.analysis_max_side, annotate=False
+        ), args.repeat)
+        stages = {'heuristic': (heuristic, wall, cpu)}
+        stages['in_image'] = timed(lambda: detector.detect_fire_in_image(
+            jpeg_bytes, confidence_threshold=args.confidence, analysis_max_side=args.analysis_max_side
+        ), args.repeat)
+        annotated = stages['in_image'][0]['annotated_image']
+        if annotated is not None:
+            stages['base64'] = timed(lambda: detector.image_to_base64(annotated), args.repeat)
+
+        for stage, (result, wall, cpu) in stages.items():
+            entry = timings.setdefault((stage, group), {'wall': [], 'cpu': 0.0})
+            entry['wall'].extend(wall)
+            entry['cpu'] += cpu
+            if stage != 'base64':
+                counts.setdefault(stage, Counts()).add(result, truth, args.iou)
+        if args.verbose:
+            result = stages['in_image'][0]
+            print(f"  {name:<40} alert={bool(result['fire_detected'] or result['smoke_detected'])!s:<5} "
+                  f"boxes={len(result['detections']):<3} truth={truth if not isinstance(truth, list) else len(truth)}")
+
+    return {
+        'timing': {
+            f"{stage} {group}": timing_summary(entry['wall'], entry['cpu'])
+            for (stage, group), entry in sorted(timings.items(), key=lambda item: (STAGES.index(item[0][0]), item[0][1]))
+        },
+        'accuracy': {stage: stage_counts.summary() for stage, stage_counts in counts.items()},
+        'frames': len(names),
+    }
+
+
+def print_report(report):
+    print(f"\n{'stage / resolution':<22} {'frames':>7} {'fps':>8} {'fps/core':>9} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for key, row in report['timing'].items():
+        per_core = '-' if row['fps_per_core'] is None else f"{row['fps_per_core']:.2f}"
+        print(f"{key:<22} {row['frames']:>7} {row['fps']:>8.2f} {per_core:>9} {row['mean_ms']:>9.2f} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+    def fmt(value):
+        return '-' if value is None else f"{value:.1%}"
+
+    print(f"\n{'stage':<10} {'frame precision':>16} {'frame recall':>13} {'box precision':>14} {'box recall':>11}")
+    for stage, accuracy in report['accuracy'].items():
+        print(f"{stage:<10} {fmt(accuracy['frame']['precision']):>16} {fmt(accuracy['frame']['recall']):>13} "
+              f"{fmt(accuracy['box']['precision']):>14} {fmt(accuracy['box']['recall']):>11}")
+
+
+def compare(report, baseline, tolerance):
+    """Prints the differences with a baseline; returns the list of regressions"""
+    regressions = []
+    print(f"\nComparison with baseline of {baseline['meta'].get('date', '?')} (tolerance {tolerance:.0%})")
+    print(f"{'stage / resolution':<22} {'p95 ms':>16} {'change':>8} {'fps/core':>18}")
+    for key, row in report['timing'].items():
+        previous = baseline['timing'].get(key)
+        if previous is None:
+            continue
+        change = row['p95_ms'] / previous['p95_ms'] - 1 if previous['p95_ms'] else 0.0
+        flag = ''
+        if change > tolerance:
+            flag = '  slower'
+            regressions.append(f"{key}: p95 {previous['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms")
+        print(f"{key:<22} {previous['p95_ms']:>7.2f} -> {row['p95_ms']:<6.2f} {change:>+7.1%} "
+              f"{previous['fps_per_core'] or 0:>8.2f} -> {row['fps_per_core'] or 0:<7.2f}{flag}")
+    for stage, accuracy in report['accuracy'].items():
+        previous = baseline['accuracy'].get(stage, {})
+        for level in ('frame', 'box'):
+            for metric in ('precision', 'recall'):
+                before = previous.get(level, {}).get(metric)
+                after = accuracy[level][metric]
+                if before is not None and after is not None and after < before - 0.01:
+                    regressions.append(f"{stage}: {level} {metric} {before:.1%} -> {after:.1%}")
+    for regression in regressions:
+        print(f"⚠️ {regression}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', default='720p,1080p,4K',
+                        help=f"Synthetic scene resolutions among {', '.join(RESOLUTIONS)} (empty: none)")
+    parser.add_argument('--frames', help="Directory of recorded frames to replay")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed calls per frame and stage")
+    parser.add_argument('--analysis-max-side', type=int)
+    parser.add_argument('--confidence', type=float, default=0.3)
+    parser.add_argument('--iou', type=float, default=0.3, help="IoU for a box to match a labelled fire")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help="Write the results to this JSON baseline")
+    parser.add_argument('--compare', help="JSON baseline to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed p95 slowdown with --compare")
+    parser.add_argument('--verbose', action='store_true', help="Print the outcome of each frame")
+    args = parser.parse_args()
+
+    resolutions = [label for label in args.resolutions.split(',') if label]
+    unknown = set(resolutions) - set(RESOLUTIONS)
+    if unknown:
+        parser.error(f"Unknown resolutions: {', '.join(sorted(unknown))}")
+    if args.frames and not os.path.isdir(args.frames):
+        parser.error(f"{args.frames} is not a directory")
+
+    detector = get_fire_detector()
+    model_loaded = detector.load_model()
+
+    def scenes():
+        yield from synthetic_scenes(resolutions, args.seed)
+        if args.frames:
+            yield from recorded_frames(args.frames)
+
+    report = run(scenes(), args)
+    report['meta'] = {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'cpus': os.cpu_count(),
+        'opencv_threads': cv2.getNumThreads(),
+        'model': bool(model_loaded),
+        'options': {key: getattr(args, key) for key in ('resolutions', 'frames', 'repeat', 'analysis_max_side', 'confidence', 'iou', 'seed')},
+    }
+    print(f"{report['frames']} frames, model {'loaded' if model_loaded else 'unavailable (heuristic only)'}")
+    print_report(report)
+
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Worst-case benchmark of fire region extraction in the color heuristic
+Compares, on fire masks with many regions (noise that survives the morphology, e.g.
+foliage in sunset light or sensor noise on a dim orange wall):
+- legacy: cv2.findContours, then contourArea / boundingRect and drawing per contour
+  in a Python loop (the implementation before connected components)
+- components: FireDetectionService.extract_fire_regions (connectedComponentsWithStats,
+  vectorized filtering, top-N) and drawing of the kept regions only
+with and without annotation, then the whole detect_fire_heuristic on frames producing
+the same masks.
+
+Usage:
+    python bench_fire_extraction.py [--width 1920] [--height 1080] [--repeat 5]
+"""
+import argparse
+import os
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+
+from gestion_camera.fire_detection_service import MIN_FIRE_AREA, get_fire_detector
+from gestion_camera.frame_context import FrameContext
+
+
+FIRE_BGR = (0, 140, 255)
+BACKGROUND_BGR = (70, 80, 90)
+
+
+def scene_masks(width, height, seed=0):
+    """name -> fire mask (0/255)"""
+    rng = np.random.default_rng(seed)
+    masks = {}
+
+    mask = np.zeros((height, width), np.uint8)
+    cv2.ellipse(mask, (width // 2, height // 2), (120, 200), 0, 0, 360, 255, -1)
+    masks['one fire'] = mask
+
+    # Tens of thousands of separate 4x4 blobs, below MIN_FIRE_AREA: all filtered out
+    mask = np.zeros((height, width), np.uint8)
+    for y in range(0, height - 8, 8):
+        for x in range(0, width - 8, 8):
+            dx, dy = rng.integers(0, 2, 2)
+            mask[y + dy:y + dy + 4, x + dx:x + dx + 4] = 255
+    masks['speckle (small)'] = mask
+
+    # A grid of blobs just above MIN_FIRE_AREA: thousands of candidate detections
+    mask = np.zeros((height, width), np.uint8)
+    side = int(np.ceil(np.sqrt(MIN_FIRE_AREA))) + 2
+    for y in range(0, height - side, side + 3):
+        for x in range(0, width - side, side + 3):
+            mask[y:y + side, x:x + side] = 255
+    masks['blob grid (large)'] = mask
+    return masks
+
+
+def mask_frame(mask):
+    frame = np.empty((*mask.shape, 3), np.uint8)
+    frame[:] = BACKGROUND_BGR
+    frame[mask > 0] = FIRE_BGR
+    return frame
+
+
+def legacy_extract(fire_mask, fire_percentage, annotated_img=None):
+    """Per-contour Python loop of the former implementation (full resolution)"""
+    contours, _ = cv2.findContours(fire_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    detections = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > MIN_FIRE_AREA:
+            x, y, w, h = cv2.boundingRect(contour)
+            confidence = min(max(min(area / 1000, 1.0), min(fire_percentage / 5, 1.0)), 0.99)
+            detections.append({'class': 'fire', 'confidence': confidence,
+                               'bbox': [float(x), float(y), float(x + w), float(y + h)]})
+            if annotated_img is not None:
+                label = f"FIRE: {confidence:.1%}"
+                cv2.rectangle(annotated_img, (x, y), (x + w, y + h), (0, 0, 255), 3)
+                (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+                cv2.rectangle(annotated_img, (x, y - label_h - 10), (x + label_w + 10, y), (0, 0, 255), -1)
+                cv2.putText(annotated_img, label, (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return detections
+
+
+def components_extract(detector, fire_mask, fire_percentage, annotated_img=None):
+    boxes, confidences = detector.extract_fire_regions(fire_mask, fire_percentage)
+    if annotated_img is not None:
+        for (x, y, w, h), confidence in zip(boxes.tolist(), confidences.tolist()):
+            label = f"FIRE: {confidence:.1%}"
+            cv2.rectangle(annotated_img, (x, y), (x + w, y + h), (0, 0, 255), 3)
+            (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+            cv2.rectangle(annotated_img, (x, y - label_h - 10), (x + label_w + 10, y), (0, 0, 255), -1)
+            cv2.putText(annotated_img, label, (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return boxes
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    detector = get_fire_detector()
+    print(f"{args.width}x{args.height}, median of {args.repeat} runs, "
+          f"at most {detector.max_detections} detections kept\n")
+    print(f"{'scene':<19} {'regions':>8} {'kept':>5} {'annotate':>8} {'legacy ms':>10} {'components ms':>14} {'speedup':>8}")
+    for name, mask in scene_masks(args.width, args.height).items():
+        percentage = cv2.countNonZero(mask) / mask.size * 100
+        regions = cv2.connectedComponentsWithStats(mask, connectivity=8)[0] - 1
+        canvas = mask_frame(mask)
+        for annotate in (False, True):
+            legacy_ms, legacy = timed(
+                lambda: legacy_extract(mask, percentage, canvas.copy() if annotate else None), args.repeat)
+            components_ms, boxes = timed(
+                lambda: components_extract(detector, mask, percentage, canvas.copy() if annotate else None),
+                args.repeat)
+            print(f"{name:<19} {regions:>8} {len(boxes):>5} {str(annotate):>8} {legacy_ms:>10.1f} "
+                  f"{components_ms:>14.1f} {legacy_ms / components_ms:>7.1f}x")
+
+    print(f"\n{'scene':<19} {'annotate':>8} {'detect_fire_heuristic ms':>25}")
+    for name, mask in scene_masks(args.width, args.height).items():
+        frame = mask_frame(mask)
+        for annotate in (False, True):
+            ms, _ = timed(lambda: detector.detect_fire_heuristic(FrameContext.from_bgr(frame), annotate=annotate),
+                          args.repeat)
+            print(f"{name:<19} {str(annotate):>8} {ms:>25.1f}")
+
+
+if __name__ == "__main__":
+    main()
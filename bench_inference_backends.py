@@ -0,0 +1,115 @@
+"""
+Benchmark of the fire detection inference backends on the same images
+Each backend runs in its own process so that its memory footprint (runtime + model)
+is measured in isolation. Backends whose runtime is not installed are skipped.
+
+Usage:
+    python bench_inference_backends.py --pt yolov8n.pt --onnx yolov8n.onnx [--images dir] [--runs 20] [--threads 4]
+
+Export the ONNX model once with: yolo export model=yolov8n.pt format=onnx
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+
+
+def load_images(directory, count=8, size=(1280, 720)):
+    """RGB images from a directory, or synthetic frames if none is given"""
+    images = []
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            img = cv2.imread(os.path.join(directory, name))
+            if img is not None:
+                images.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    if not images:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8) for _ in range(count)]
+    return images
+
+
+def rss_mb():
+    """Current resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(name, model_path, threads, images, runs, queue):
+    from gestion_camera.inference_backends import create_backend
+    baseline = rss_mb()
+    try:
+        start = time.perf_counter()
+        backend = create_backend(name, model_path, threads)
+        load_s = time.perf_counter() - start
+    except ImportError as exc:
+        queue.put({'backend': name, 'skipped': f"runtime not installed ({exc})"})
+        return
+    except Exception as exc:
+        queue.put({'backend': name, 'skipped': str(exc)})
+        return
+
+    backend.predict(images[:1])  # warm-up
+    latencies = []
+    for _ in range(runs):
+        for img in images:
+            start = time.perf_counter()
+            backend.predict([img])
+            latencies.append((time.perf_counter() - start) * 1000)
+    queue.put({
+        'backend': name,
+        'load_s': load_s,
+        'mean_ms': float(np.mean(latencies)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'fps': 1000 / float(np.mean(latencies)),
+        'rss_mb': rss_mb() - baseline,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pt', default='yolov8n.pt', help="Model for the ultralytics backend")
+    parser.add_argument('--onnx', default='yolov8n.onnx', help="Exported model for the onnxruntime and opencv backends")
+    parser.add_argument('--images', help="Directory of test images (synthetic frames if omitted)")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--threads', type=int, help="Intra-op threads per backend")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    models = {'ultralytics': args.pt, 'onnxruntime': args.onnx, 'opencv': args.onnx}
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for name, model_path in models.items():
+        queue = context.Queue()
+        process = context.Process(target=run_backend, args=(name, model_path, args.threads, images, args.runs, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+
+    print(f"{len(images)} images x {args.runs} runs, threads={args.threads or 'default'}\n")
+    print(f"{'backend':<12} {'load s':>7} {'mean ms':>8} {'p95 ms':>8} {'img/s':>7} {'RSS MB':>7}")
+    for r in results:
+        if 'skipped' in r:
+            print(f"{r['backend']:<12} skipped: {r['skipped']}")
+            continue
+        print(f"{r['backend']:<12} {r['load_s']:>7.2f} {r['mean_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['fps']:>7.1f} {r['rss_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Savings of motion gating on recorded clips
+Replays each clip frame by frame (optionally subsampled) through the fire detection
+pipeline, without gating and with each MotionGate method, and reports:
+- mean time per frame (gate + detection) and speedup
+- frames analyzed whole, skipped (matching the background) and analyzed on a
+  changed region only
+- agreement of the per-frame fire/no-fire outcome with the ungated pipeline, and the
+  delay (frames) of the first fire detection
+
+Usage:
+    python bench_motion_gate.py [clip.mp4 ...] [--fps 5] [--analysis-max-side 640]
+
+Without clips, a synthetic quiet-camera clip is generated (static scene with sensor
+noise, a person walking by, then a flickering flame).
+"""
+import argparse
+import os
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+
+from gestion_camera.fire_detection_service import get_fire_detector
+from gestion_camera.frame_context import FrameContext
+from gestion_camera.motion_gate import MotionGate, MotionGatedDetector
+
+
+def synthetic_clip(seconds=60, fps=10, size=(1280, 720), seed=0):
+    """Quiet 1280x720 scene: a walker at 15-25 s, a flickering flame from 40 s"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    background = np.zeros((height, width, 3), np.uint8)
+    background[:] = (70, 80, 90)
+    cv2.rectangle(background, (100, 400), (500, 700), (40, 60, 60), -1)
+    cv2.rectangle(background, (800, 200), (1200, 650), (110, 100, 95), -1)
+    for index in range(seconds * fps):
+        t = index / fps
+        frame = background.copy()
+        if 15 <= t < 25:
+            x = int((t - 15) / 10 * (width - 120))
+            cv2.rectangle(frame, (x, 300), (x + 80, 560), (60, 50, 140), -1)
+        if t >= 40:
+            radius = int(rng.uniform(18, 34))
+            cv2.ellipse(frame, (950, 560), (radius, int(radius * 1.8)), 0, 0, 360,
+                        (0, int(rng.uniform(90, 200)), 255), -1)
+        noise = rng.integers(-3, 4, frame.shape, dtype=np.int16)
+        yield np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def clip_frames(path, fps):
+    capture = cv2.VideoCapture(path)
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, int(round(source_fps / fps))) if fps else 1
+    index = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            if index % step == 0:
+                yield frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def run(frames, method, analysis_max_side):
+    """Per-frame outcomes and timings of the pipeline with the given gate method (None = ungated)"""
+    detector = get_fire_detector()
+    gated = MotionGatedDetector(method, detector=detector) if method else None
+    outcomes, times = [], []
+    counts = {'full': 0, 'skipped': 0, 'region': 0}
+    for frame in frames:
+        start = time.perf_counter()
+        context = FrameContext.from_bgr(frame)
+        if gated is not None:
+            result, mode = gated.detect(context, analysis_max_side=analysis_max_side, annotate=False)
+        else:
+            result, mode = detector.detect_fire_in_image(context, analysis_max_side=analysis_max_side, annotate=False), 'full'
+        counts[mode] += 1
+        times.append((time.perf_counter() - start) * 1000)
+        outcomes.append(bool(result['fire_detected'] or result['smoke_detected']))
+    return outcomes, times, counts
+
+
+def first_true(values):
+    return next((index for index, value in enumerate(values) if value), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clips', nargs='*')
+    parser.add_argument('--fps', type=float, default=5.0, help="Frames per second sampled from each clip")
+    parser.add_argument('--analysis-max-side', type=int)
+    args = parser.parse_args()
+
+    detector = get_fire_detector()
+    detector.load_model()
+
+    sources = {path: (lambda path=path: clip_frames(path, args.fps)) for path in args.clips}
+    if not sources:
+        sources['synthetic quiet camera'] = lambda: synthetic_clip(fps=int(args.fps))
+
+    for name, frames in sources.items():
+        frames = list(frames())
+        print(f"\n{name}: {len(frames)} frames")
+        print(f"{'gate':<9} {'ms/frame':>9} {'speedup':>8} {'full':>6} {'skipped':>8} {'region':>7} {'agree':>7} {'1st fire':>9}")
+        baseline, baseline_times, _ = run(frames, None, args.analysis_max_side)
+        baseline_ms = float(np.mean(baseline_times))
+        for method in (None,) + MotionGate.METHODS:
+            outcomes, times, counts = (baseline, baseline_times, {'full': len(frames), 'skipped': 0, 'region': 0}) if method is None \
+                else run(frames, method, args.analysis_max_side)
+            mean_ms = float(np.mean(times))
+            agree = np.mean(np.array(outcomes) == np.array(baseline)) * 100
+            first = first_true(outcomes)
+            print(f"{method or 'none':<9} {mean_ms:>9.2f} {baseline_ms / mean_ms:>7.2f}x "
+                  f"{counts['full'] / len(frames):>5.0%} {counts['skipped'] / len(frames):>7.0%} {counts['region'] / len(frames):>6.0%} "
+                  f"{agree:>6.1f}% {'-' if first is None else first:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark of the ORB extraction profiles used for equipment recognition
+Reports, per profile: descriptor memory per 10k equipment items, extraction time,
+match latency against the whole gallery and top-1 accuracy on transformed queries
+
+Usage:
+    python bench_orb_profiles.py [--images media/equipements] [--synthetic 40]
+"""
+import argparse
+import os
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from gestion_dequipement.descriptors import ORB_PROFILES, pack_descriptors, unpack_descriptors
+from gestion_dequipement.views import ImageHashMixin
+
+
+def synthetic_gallery(count, size=(800, 600), seed=0):
+    """Random textured scenes (shapes + text) standing in for equipment photos"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(count):
+        img = np.full((size[1], size[0], 3), rng.integers(0, 80), np.uint8)
+        for _ in range(25):
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            x, y = int(rng.integers(0, size[0])), int(rng.integers(0, size[1]))
+            if rng.random() < 0.5:
+                cv2.rectangle(img, (x, y), (x + int(rng.integers(20, 200)), y + int(rng.integers(20, 200))), color, -1)
+            else:
+                cv2.circle(img, (x, y), int(rng.integers(10, 90)), color, int(rng.integers(-1, 6)))
+        cv2.putText(img, f"EQ-{i:03d}", (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 4)
+        images.append(Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
+    return images
+
+
+def load_images(directory):
+    images = []
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            try:
+                with Image.open(os.path.join(directory, name)) as im:
+                    images.append(im.convert('RGB'))
+            except Exception:
+                continue
+    return images
+
+
+def transformed_query(img):
+    """Rotated, downscaled and darkened copy: what a camera would see"""
+    query = img.rotate(15, expand=True, resample=Image.BILINEAR)
+    query = query.resize((int(query.width * 0.7), int(query.height * 0.7)), Image.BILINEAR)
+    return query.point(lambda p: int(p * 0.85))
+
+
+def bench_profile(matcher, profile, gallery, queries):
+    start = time.perf_counter()
+    packed = [pack_descriptors(matcher._orb_descriptors(img, profile)) for img in gallery]
+    extract_ms = (time.perf_counter() - start) * 1000 / len(gallery)
+
+    # Zero-copy views over the packed buffers, as loaded from the database
+    references = [unpack_descriptors(buf) for buf in packed]
+    bytes_per_item = sum(len(buf) for buf in packed) / len(packed)
+
+    correct = 0
+    match_times = []
+    for expected, query in enumerate(queries):
+        des = matcher._orb_descriptors(query, profile)
+        start = time.perf_counter()
+        scores = [matcher._orb_descriptor_score(des, ref) for ref in references]
+        match_times.append((time.perf_counter() - start) * 1000)
+        if scores and int(np.argmax(scores)) == expected and max(scores) > 0:
+            correct += 1
+
+    return {
+        'profile': profile,
+        'mb_per_10k': bytes_per_item * 10000 / 1e6,
+        'extract_ms': extract_ms,
+        'match_ms': float(np.mean(match_times)),
+        'accuracy': correct / len(queries),
+    }
+
+
+def bar(value, maximum, width=30):
+    filled = int(round(width * value / maximum)) if maximum else 0
+    return '#' * filled + '.' * (width - filled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default=os.path.join('media', 'equipements'))
+    parser.add_argument('--synthetic', type=int, default=40)
+    args = parser.parse_args()
+
+    gallery = load_images(args.images) + synthetic_gallery(args.synthetic)
+    if not gallery:
+        raise SystemExit("No images to benchmark")
+    queries = [transformed_query(img) for img in gallery]
+    matcher = ImageHashMixin()
+
+    print(f"Gallery: {len(gallery)} images, {len(queries)} transformed queries\n")
+    results = [bench_profile(matcher, profile, gallery, queries) for profile in ORB_PROFILES]
+
+    print(f"{'profile':<10} {'MB/10k':>8} {'extract ms':>11} {'match ms':>9} {'top-1':>7}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['mb_per_10k']:>8.1f} {r['extract_ms']:>11.1f} {r['match_ms']:>9.1f} {r['accuracy']:>7.1%}")
+
+    for key, label in (('mb_per_10k', 'Memory per 10k items (MB)'),
+                       ('match_ms', 'Match latency vs. gallery (ms)'),
+                       ('accuracy', 'Top-1 accuracy')):
+        print(f"\n{label}")
+        maximum = max(r[key] for r in results)
+        for r in results:
+            print(f"  {r['profile']:<10} {bar(r[key], maximum)} {r[key]:.3g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Camera
+from .models import Camera, DetectionEvent, DetectionJob
 
 
 @admin.register(Camera)
@@ -7,3 +7,19 @@ class CameraAdmin(admin.ModelAdmin):
     list_display = ("id_camera", "name", "zone", "ip_address", "resolution", "status", "date_ajout")
     list_filter = ("status", "zone", "date_ajout")
     search_fields = ("name", "zone", "ip_address")
+
+
+@admin.register(DetectionEvent)
+class DetectionEventAdmin(admin.ModelAdmin):
+    list_display = ("timestamp", "camera", "kind", "confidence", "count", "source")
+    list_filter = ("kind", "source", "timestamp")
+    list_select_related = ("camera",)
+    date_hierarchy = "timestamp"
+
+
+@admin.register(DetectionJob)
+class DetectionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "camera", "created_by", "created_at", "finished_at", "expires_at")
+    list_filter = ("status", "created_at")
+    list_select_related = ("camera", "created_by")
+    date_hierarchy = "created_at"
@@ -0,0 +1,277 @@
+"""
+Batch fire detection over image sets (incident review, archived footage)
+Frames come from a zip archive, a multi-image upload or a directory. Decoding and
+analysis run in a pool of worker processes; results are yielded as each frame
+finishes, and a BatchSummary gathers the first frame with fire and the confidence
+timeline.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from PIL import UnidentifiedImageError
+
+from CyberCobra.compute_resources import compute_threads
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+
+class BatchInputError(ValueError):
+    """The uploaded archive or image set cannot be processed"""
+
+
+def is_image_name(name):
+    base = os.path.basename(name)
+    # Skip hidden files and the resource forks macOS adds to archives
+    return base.lower().endswith(IMAGE_EXTENSIONS) and not base.startswith('.') and '__MACOSX/' not in name
+
+
+def batch_limits():
+    return (
+        getattr(settings, 'BATCH_DETECTION_MAX_FRAMES', 5000),
+        getattr(settings, 'BATCH_DETECTION_MAX_IMAGE_BYTES', 50 * 1024 * 1024),
+    )
+
+
+def archive_frames(archive):
+    """
+    (name, loader) pairs of the images of a zip archive (path or file object), sorted
+    by name; loaders read one entry each, so the archive is never held in memory.
+    Raises BatchInputError on an invalid archive or one over the limits
+    (BATCH_DETECTION_MAX_FRAMES, BATCH_DETECTION_MAX_IMAGE_BYTES uncompressed per image).
+    """
+    try:
+        zip_file = zipfile.ZipFile(archive)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise BatchInputError(f"Invalid zip archive: {e}")
+    max_frames, max_bytes = batch_limits()
+    entries = sorted(
+        (info for info in zip_file.infolist() if not info.is_dir() and is_image_name(info.filename)),
+        key=lambda info: info.filename,
+    )
+    if len(entries) > max_frames:
+        raise BatchInputError(f"Too many images in the archive ({len(entries)}, at most {max_frames})")
+    oversized = next((info for info in entries if info.file_size > max_bytes), None)
+    if oversized is not None:
+        raise BatchInputError(f"{oversized.filename} is larger than {max_bytes} bytes")
+    lock = threading.Lock()
+
+    def loader(info):
+        def load():
+            with lock:
+                return zip_file.read(info)
+        return load
+
+    return [(info.filename, loader(info)) for info in entries]
+
+
+def upload_frames(files):
+    """(name, loader) pairs of uploaded image files, in upload order"""
+    max_frames, max_bytes = batch_limits()
+    if len(files) > max_frames:
+        raise BatchInputError(f"Too many images ({len(files)}, at most {max_frames})")
+    oversized = next((f for f in files if f.size > max_bytes), None)
+    if oversized is not None:
+        raise BatchInputError(f"{oversized.name} is larger than {max_bytes} bytes")
+    return [(f.name, f.read) for f in files]
+
+
+def directory_frames(path, recursive=False):
+    """(relative path, loader) pairs of the images of a directory, sorted by path"""
+    if not os.path.isdir(path):
+        raise BatchInputError(f"{path} is not a directory")
+    names = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        names.extend(os.path.relpath(os.path.join(root, name), path) for name in files if is_image_name(name))
+        if not recursive:
+            break
+
+    def loader(name):
+        def load():
+            with open(os.path.join(path, name), 'rb') as handle:
+                return handle.read()
+        return load
+
+    return [(name, loader(name)) for name in sorted(names)]
+
+
+def _init_worker(settings_module):
+    # Spawned workers start from a fresh interpreter: set Django up, one thread each
+    # (the pool already uses one process per core)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    from CyberCobra.compute_resources import configure_compute
+    configure_compute(threads=1)
+    from .fire_detection_service import get_fire_detector
+    get_fire_detector().load_model()
+
+
+def analyze_frame(index, name, image_bytes, options):
+    """Detection result of one encoded frame, as a JSON-serializable dict (runs in a pool worker)"""
+    from .fire_detection_service import alert_level, get_fire_detector
+
+    start = time.perf_counter()
+    frame = {'index': index, 'frame': name}
+    try:
+        result = get_fire_detector().detect_fire_in_image(image_bytes, annotate=False, **options)
+    except UnidentifiedImageError:
+        frame['error'] = "Not a readable image"
+        return frame
+    except Exception as e:
+        frame['error'] = str(e)
+        return frame
+    frame.update({
+        'fire_detected': result['fire_detected'],
+        'smoke_detected': result['smoke_detected'],
+        'confidence': result['confidence'],
+        'max_confidence': max((d['confidence'] for d in result['detections']), default=0.0),
+        'detections': result['detections'],
+        'alert_level': alert_level(result),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+    })
+    return frame
+
+
+_batch_pool = None
+_batch_pool_pid = None
+_batch_pool_lock = threading.Lock()
+
+
+def batch_processes():
+    """Pool processes: BATCH_DETECTION_PROCESSES, at most the compute budget of this process"""
+    budget = compute_threads()
+    return min(getattr(settings, 'BATCH_DETECTION_PROCESSES', None) or budget, budget)
+
+
+def create_batch_pool(processes):
+    """
+    Pool of `processes` detection processes. Workers are spawned, not forked: forking
+    a threaded server with OpenCV thread pools running is unsafe.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings'),),
+    )
+
+
+def get_batch_pool():
+    """
+    Process-wide pool of batch_processes() processes, started on first use. With several
+    server workers, each one has its own pool within its share of the cores
+    """
+    global _batch_pool, _batch_pool_pid
+    if _batch_pool is None or _batch_pool_pid != os.getpid():
+        with _batch_pool_lock:
+            if _batch_pool is None or _batch_pool_pid != os.getpid():
+                _batch_pool = create_batch_pool(batch_processes())
+                _batch_pool_pid = os.getpid()
+    return _batch_pool
+
+
+def reset_batch_pool():
+    """Drop the pool (after a worker crash: a broken pool rejects every new frame)"""
+    global _batch_pool
+    with _batch_pool_lock:
+        pool, _batch_pool = _batch_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class BatchSummary:
+    """Totals of a batch, updated with each frame result"""
+
+    FIELDS = ('index', 'frame', 'fire_detected', 'alert_level', 'max_confidence', 'error')
+
+    def __init__(self, total):
+        self.total = total
+        self.frames = []
+        self.started = time.perf_counter()
+
+    def add(self, frame):
+        # Boxes are not kept: only what the summary reports
+        self.frames.append({key: frame[key] for key in self.FIELDS if key in frame})
+
+    def as_dict(self):
+        analyzed = sorted((f for f in self.frames if 'error' not in f), key=lambda f: f['index'])
+        alerts = [f for f in analyzed if f['alert_level'] != 'NORMAL']
+        fire = [f for f in analyzed if f['fire_detected']]
+        peak = max(analyzed, key=lambda f: f['max_confidence'], default=None)
+        elapsed = time.perf_counter() - self.started
+        return {
+            'frames': self.total,
+            'analyzed': len(analyzed),
+            'errors': len(self.frames) - len(analyzed),
+            'alerts': len(alerts),
+            'first_fire': {'index': fire[0]['index'], 'frame': fire[0]['frame']} if fire else None,
+            'first_alert': {'index': alerts[0]['index'], 'frame': alerts[0]['frame']} if alerts else None,
+            'max_confidence': {
+                'index': peak['index'], 'frame': peak['frame'], 'confidence': peak['max_confidence'],
+            } if peak is not None and peak['max_confidence'] > 0 else None,
+            # [index, highest detection confidence of the frame] in frame order
+            'timeline': [[f['index'], round(f['max_confidence'], 4)] for f in analyzed],
+            'elapsed_s': round(elapsed, 3),
+            'fps': round(len(self.frames) / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+def detect_batch(frames, options=None, pool=None, summary=None, max_pending=None):
+    """
+    Analyze (name, loader) frames in the process pool and yield each frame result as
+    soon as it is ready (completion order; `index` gives the position in `frames`).
+    At most `max_pending` frames (default two per process) are read and in flight, so
+    memory stays bounded however large the batch. `options` are passed to
+    detect_fire_in_image; results are added to `summary` (a BatchSummary) when given.
+    Raises BrokenProcessPool if a worker process dies (the pool is then replaced).
+    """
+    if pool is None:
+        pool = get_batch_pool()
+        max_pending = max_pending or 2 * batch_processes()
+    max_pending = max_pending or 2
+    options = options or {}
+    pending = set()
+    remaining = iter(enumerate(frames))
+    exhausted = False
+
+    def report(frame):
+        if summary is not None:
+            summary.add(frame)
+        return frame
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                item = next(remaining, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, (name, load) = item
+                try:
+                    data = load()
+                except Exception as e:
+                    yield report({'index': index, 'frame': name, 'error': f"Could not read the image: {e}"})
+                    continue
+                pending.add(pool.submit(analyze_frame, index, name, data, options))
+            if not pending:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield report(future.result())
+    except BrokenProcessPool:
+        if pool is _batch_pool:
+            reset_batch_pool()
+        raise
+    finally:
+        # Client gone or batch interrupted: drop what has not started
+        for future in pending:
+            future.cancel()
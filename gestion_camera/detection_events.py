@@ -0,0 +1,242 @@
+"""
+Detection event store
+Positive fire/smoke detections are kept as DetectionEvent rows for history and trend
+analysis. Requests and ingestion workers hand events to an in-process buffer, written
+with one bulk_create every DETECTION_EVENTS_BATCH_SIZE events or
+DETECTION_EVENTS_FLUSH_MS milliseconds, so detection never waits for the database.
+"""
+
+import atexit
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+
+
+def event_kind(result):
+    """DetectionEvent kind of a detection result, or None when nothing was detected"""
+    from .models import DetectionEvent
+
+    if result['fire_detected'] and result['smoke_detected']:
+        return DetectionEvent.Kind.FIRE_AND_SMOKE
+    if result['fire_detected']:
+        return DetectionEvent.Kind.FIRE
+    if result['smoke_detected']:
+        return DetectionEvent.Kind.SMOKE
+    return None
+
+
+def compact_boxes(detections):
+    """Detections as [x1, y1, x2, y2, confidence, class] rows (integer pixels, 3-digit confidence)"""
+    return [
+        [*(int(round(v)) for v in detection['bbox']), round(float(detection['confidence']), 3), detection['class']]
+        for detection in detections
+    ]
+
+
+def event_from_result(result, camera=None, source='', snapshot='', timestamp=None):
+    """Unsaved DetectionEvent of a detection result, or None when nothing was detected"""
+    from .models import DetectionEvent
+
+    kind = event_kind(result)
+    if kind is None:
+        return None
+    return DetectionEvent(
+        camera=camera,
+        timestamp=timestamp or timezone.now(),
+        kind=kind,
+        confidence=float(result['confidence']),
+        boxes=compact_boxes(result['detections']),
+        snapshot=snapshot,
+        source=source,
+    )
+
+
+def save_snapshot(image_bytes, extension):
+    """Store an annotated image under media/detections/AAAA/MM/JJ/ and return its storage name"""
+    return default_storage.save(
+        f"detections/{timezone.now():%Y/%m/%d}/{uuid.uuid4().hex}.{extension}",
+        ContentFile(image_bytes)
+    )
+
+
+def delete_snapshots(names):
+    """
+    Delete the snapshot files of deleted events, except those a detection job still
+    serves as its annotated image (the job deletes it when it expires).
+    Returns the number of files deleted.
+    """
+    from .models import DetectionJob
+
+    names = {name for name in names if name}
+    if not names:
+        return 0
+    names -= set(DetectionJob.objects.filter(annotated_image__in=names).values_list('annotated_image', flat=True))
+    deleted = 0
+    for name in names:
+        try:
+            default_storage.delete(name)
+            deleted += 1
+        except OSError as e:
+            print(f"⚠️ Could not delete snapshot {name}: {e}")
+    return deleted
+
+
+class DetectionEventWriter:
+    """
+    Buffer of unsaved DetectionEvents written by a background thread:
+    - `add()` never touches the database; the thread flushes with one bulk_create when
+      `batch_size` events are buffered or the oldest one waited `flush_interval` seconds
+    - at most `max_buffered` events are held (the oldest are dropped and counted when the
+      database falls behind); when a batch fails (e.g. its camera was deleted before the
+      flush) its events are retried one by one and only those that fail again are dropped
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, max_buffered=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.stats = {'buffered': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'flushes': 0}
+        self._buffer = deque()
+        self._oldest = None
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='detection-events', daemon=True)
+        self._thread.start()
+
+    def add(self, event):
+        if event is None:
+            return
+        with self._condition:
+            if len(self._buffer) >= self.max_buffered:
+                self._buffer.popleft()
+                self.stats['dropped'] += 1
+            first = not self._buffer
+            if first:
+                self._oldest = time.monotonic()
+            self._buffer.append(event)
+            self.stats['buffered'] += 1
+            # Wake the thread to start the flush timer, or to write a full batch
+            if first or len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+    def _take(self):
+        with self._condition:
+            batch = list(self._buffer)
+            self._buffer.clear()
+            self._oldest = None
+            return batch
+
+    def flush(self):
+        """Write everything buffered now (in the calling thread); returns the number of events written"""
+        from .models import DetectionEvent
+
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            try:
+                DetectionEvent.objects.bulk_create(batch, batch_size=self.batch_size)
+                written = len(batch)
+            except Exception as e:
+                print(f"⚠️ Could not store {len(batch)} detection events ({e}), retrying one by one")
+                written = self._write_one_by_one(batch)
+            self.stats['written'] += written
+            self.stats['flushes'] += 1
+            return written
+
+    def _write_one_by_one(self, batch):
+        """Insert events separately so one bad row does not cost the whole batch"""
+        from .models import DetectionEvent
+
+        written, errors = 0, []
+        for event in batch:
+            # The failed bulk insert may have assigned ids that were rolled back
+            event.pk = None
+            try:
+                DetectionEvent.objects.bulk_create([event])
+                written += 1
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            self.stats['failed'] += len(errors)
+            print(f"⚠️ Could not store {len(errors)} detection events: {errors[0]}")
+        return written
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._buffer) >= self.batch_size:
+                        break
+                    if self._oldest is not None:
+                        remaining = self._oldest + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                closed = self._closed
+            self.flush()
+            # The thread keeps its own database connection between batches
+            close_old_connections()
+            if closed:
+                return
+
+    def close(self, timeout=5.0):
+        """Flush what is left and stop the writer thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+
+_event_writer = None
+_event_writer_pid = None
+_event_writer_lock = threading.Lock()
+
+
+def get_event_writer():
+    """
+    Return the process-wide DetectionEventWriter, created on first call (and again in
+    forked children, which do not inherit the writer thread)
+    """
+    global _event_writer, _event_writer_pid
+    if _event_writer is None or _event_writer_pid != os.getpid():
+        with _event_writer_lock:
+            if _event_writer is None or _event_writer_pid != os.getpid():
+                _event_writer = DetectionEventWriter(
+                    batch_size=getattr(settings, 'DETECTION_EVENTS_BATCH_SIZE', 100),
+                    flush_interval=getattr(settings, 'DETECTION_EVENTS_FLUSH_MS', 1000) / 1000,
+                )
+                _event_writer_pid = os.getpid()
+                atexit.register(_event_writer.close)
+    return _event_writer
+
+
+def record_detection(result, camera=None, source='', snapshot=''):
+    """Buffer the event of a positive detection result (no-op when DETECTION_EVENTS_ENABLED is False)"""
+    if not getattr(settings, 'DETECTION_EVENTS_ENABLED', True):
+        return None
+    event = event_from_result(result, camera=camera, source=source, snapshot=snapshot)
+    if event is not None:
+        get_event_writer().add(event)
+    return event
+
+
+def close_event_writer():
+    """Flush and stop the writer of this process, if any (processes ending with os._exit skip atexit)"""
+    global _event_writer
+    with _event_writer_lock:
+        writer = _event_writer if _event_writer_pid == os.getpid() else None
+        _event_writer = None
+    if writer is not None:
+        writer.close()
@@ -0,0 +1,245 @@
+"""
+Asynchronous fire detection jobs
+A job is a DetectionJob row plus the image, handed to the job queue of the process that
+received it: DETECTION_JOBS_WORKERS threads take jobs in order and run them under
+heavy_job(), like the synchronous endpoints. At most DETECTION_JOBS_MAX_QUEUED images
+wait per process; beyond that submissions are refused (QueueFull, HTTP 429). Job state
+lives in the database, so any process can answer a poll or cancel a job; jobs expire
+DETECTION_JOBS_RESULT_TTL seconds after they finish.
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+
+from CyberCobra.compute_resources import ComputeBusy, heavy_job
+
+from .detection_events import event_from_result, get_event_writer, save_snapshot
+from .fire_detection_service import alert_level, alert_message, get_fire_detector
+from .models import DetectionJob
+
+
+# Seconds between two reads of a job polled from another process
+POLL_INTERVAL = 0.25
+
+
+class QueueFull(Exception):
+    """The job queue of this process is full"""
+
+
+def job_settings():
+    return {
+        'workers': getattr(settings, 'DETECTION_JOBS_WORKERS', 2),
+        'max_queued': getattr(settings, 'DETECTION_JOBS_MAX_QUEUED', 16),
+        'queue_timeout': getattr(settings, 'DETECTION_JOBS_QUEUE_TIMEOUT', 120.0),
+        'result_ttl': getattr(settings, 'DETECTION_JOBS_RESULT_TTL', 600.0),
+    }
+
+
+def delete_job_image(image, in_event):
+    """Delete the annotated image of a job, unless its DetectionEvent owns it (`in_event`)"""
+    if not image or in_event:
+        return
+    try:
+        default_storage.delete(image)
+    except OSError:
+        pass
+
+
+def purge_expired_jobs(limit=100):
+    """Delete up to `limit` expired jobs and their annotated images; returns the number deleted"""
+    expired = list(
+        DetectionJob.objects.filter(expires_at__lt=timezone.now())
+        .values_list('pk', 'annotated_image', 'image_in_event')[:limit]
+    )
+    for _, image, in_event in expired:
+        delete_job_image(image, in_event)
+    if expired:
+        DetectionJob.objects.filter(pk__in=[pk for pk, _, _ in expired]).delete()
+    return len(expired)
+
+
+class DetectionJobQueue:
+    """Bounded queue of detection jobs of this process and the threads running them"""
+
+    def __init__(self, workers=2, max_queued=16, queue_timeout=120.0, result_ttl=600.0):
+        self.queue_timeout = queue_timeout
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._events = {}  # job id -> Event set when the job finishes
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'detection-job-{index}', daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job, image_data, options):
+        """Queue `job` (a saved DetectionJob); raises QueueFull when the queue is full"""
+        with self._lock:
+            self._events[job.pk] = threading.Event()
+        try:
+            self._queue.put_nowait((job.pk, image_data, options))
+        except queue.Full:
+            with self._lock:
+                self._events.pop(job.pk, None)
+            raise QueueFull(f"Detection queue full ({self._queue.maxsize} jobs waiting), retry later")
+
+    def event(self, job_id):
+        """Event set when the job finishes, if it runs in this process"""
+        with self._lock:
+            return self._events.get(job_id)
+
+    def queued(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            job_id, image_data, options = self._queue.get()
+            try:
+                self._execute(job_id, image_data, options)
+            except Exception as e:
+                print(f"⚠️ Detection job {job_id} failed: {e}")
+            finally:
+                with self._lock:
+                    event = self._events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+                close_old_connections()
+
+    def _finish(self, job_id, **fields):
+        """Record the outcome unless the job was cancelled meanwhile; returns True if recorded"""
+        now = timezone.now()
+        return bool(DetectionJob.objects.filter(pk=job_id, status=DetectionJob.Status.RUNNING).update(
+            finished_at=now, expires_at=now + timedelta(seconds=self.result_ttl), **fields
+        ))
+
+    def _execute(self, job_id, image_data, options):
+        now = timezone.now()
+        # A job cancelled while queued is not started
+        if not DetectionJob.objects.filter(pk=job_id, status=DetectionJob.Status.QUEUED).update(
+            status=DetectionJob.Status.RUNNING, started_at=now
+        ):
+            return
+        job = DetectionJob.objects.select_related('camera').get(pk=job_id)
+        if (now - job.created_at).total_seconds() > self.queue_timeout:
+            self._finish(job_id, status=DetectionJob.Status.FAILED, error="Timed out in the queue")
+            return
+
+        image_format, content_type, extension = options.pop('image_format', ('JPEG', 'image/jpeg', 'jpg'))
+        fire_detector = get_fire_detector()
+        try:
+            with heavy_job():
+                result = fire_detector.detect_fire_in_image(image_data, **options)
+        except ComputeBusy as e:
+            self._finish(job_id, status=DetectionJob.Status.FAILED, error=str(e))
+            return
+        except Exception as e:
+            self._finish(job_id, status=DetectionJob.Status.FAILED, error=f"Fire detection failed: {e}")
+            return
+
+        snapshot = ''
+        if result['annotated_image'] is not None:
+            snapshot = save_snapshot(fire_detector.encode_image(result['annotated_image'], image_format), extension)
+        payload = {
+            'success': True,
+            'fire_detected': result['fire_detected'],
+            'smoke_detected': result['smoke_detected'],
+            'confidence': result['confidence'],
+            'detections': result['detections'],
+            'alert_level': alert_level(result),
+            'message': alert_message(result),
+            'annotated_image_type': content_type if snapshot else None,
+        }
+        # Ownership of the image is decided here, with the event that will reference it
+        event = None
+        if getattr(settings, 'DETECTION_EVENTS_ENABLED', True):
+            event = event_from_result(result, camera=job.camera, source='job', snapshot=snapshot)
+        if self._finish(job_id, status=DetectionJob.Status.DONE, result=payload, annotated_image=snapshot,
+                        image_in_event=event is not None):
+            get_event_writer().add(event)
+        else:
+            delete_job_image(snapshot, False)
+
+
+_job_queue = None
+_job_queue_pid = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the job queue of this process, created on first call (and again in forked children)"""
+    global _job_queue, _job_queue_pid
+    if _job_queue is None or _job_queue_pid != os.getpid():
+        with _job_queue_lock:
+            if _job_queue is None or _job_queue_pid != os.getpid():
+                _job_queue = DetectionJobQueue(**job_settings())
+                _job_queue_pid = os.getpid()
+    return _job_queue
+
+
+def submit_job(image_data, options, camera=None, user=None):
+    """
+    Create a DetectionJob and queue it in this process; returns the job.
+    `options` are passed to detect_fire_in_image, plus 'image_format' (PIL format,
+    content type, extension) for the annotated image. Raises QueueFull when the queue is full.
+    """
+    purge_expired_jobs()
+    config = job_settings()
+    job_queue = get_job_queue()
+    job = DetectionJob.objects.create(
+        camera=camera,
+        created_by=user,
+        # Replaced by finish time + TTL; a job lost with its process still expires
+        expires_at=timezone.now() + timedelta(seconds=config['queue_timeout'] + config['result_ttl']),
+    )
+    try:
+        job_queue.submit(job, image_data, options)
+    except QueueFull:
+        job.delete()
+        raise
+    return job
+
+
+def wait_for_job(job, timeout):
+    """
+    Long poll: reload `job` until it finishes or `timeout` seconds pass; returns it.
+    A job running in this process is awaited on its event; others are read every
+    POLL_INTERVAL seconds. Raises DetectionJob.DoesNotExist if it is deleted meanwhile.
+    """
+    deadline = time.monotonic() + timeout
+    event = get_job_queue().event(job.pk)
+    while not job.finished:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if event is not None:
+            # Still re-read now and then: the job can be cancelled from another process
+            event.wait(min(remaining, 1.0))
+        else:
+            time.sleep(min(remaining, POLL_INTERVAL))
+        job.refresh_from_db()
+    return job
+
+
+def cancel_job(job):
+    """
+    Cancel a queued or running job (a running detection completes but its result is
+    dropped); a finished job is deleted with its result. Returns True if it was cancelled.
+    """
+    cancelled = DetectionJob.objects.filter(
+        pk=job.pk, status__in=[DetectionJob.Status.QUEUED, DetectionJob.Status.RUNNING]
+    ).update(status=DetectionJob.Status.CANCELLED, finished_at=timezone.now(),
+             expires_at=timezone.now() + timedelta(seconds=job_settings()['result_ttl']))
+    if not cancelled:
+        delete_job_image(job.annotated_image, job.image_in_event)
+        job.delete()
+    return bool(cancelled)
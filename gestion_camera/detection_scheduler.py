@@ -0,0 +1,265 @@
+"""
+Detection scheduling across many cameras
+Shares a fixed number of detection workers between cameras: weighted fair share by
+camera priority (zone criticality, recent alerts), adaptive per-camera sampling
+intervals, and bounded memory under overload (frames are shed, never queued).
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class CameraSchedule:
+    """Scheduling state of one camera"""
+
+    def __init__(self, camera_id, priority, status):
+        self.camera_id = camera_id
+        self.priority = priority
+        self.status = status
+        self.vtime = 0.0  # analysis time received, divided by priority
+        self.pending = None  # latest offered job, at most one per camera
+        self.busy = False
+        self.closed = False
+        self.next_due = 0.0
+        self.idle_factor = 1.0
+        self.boost_until = None
+        self.stats = {
+            'offered': 0,
+            'analyzed': 0,
+            'detections': 0,
+            'shed_superseded': 0,
+            'shed_stale': 0,
+        }
+
+
+class DetectionJob:
+    def __init__(self, camera_id, frame, captured_at, is_valid=None):
+        self.camera_id = camera_id
+        self.frame = frame
+        self.captured_at = captured_at
+        self.is_valid = is_valid
+        self.started_at = None
+
+
+class DetectionScheduler:
+    """
+    Decides which camera frames the detection workers analyze.
+
+    - each camera is sampled every `base_interval / priority` seconds; the interval
+      drops to `boost_interval` for `boost_duration` seconds after a detection, grows
+      by `idle_backoff` per negative analysis (up to `max_idle_factor` times) and is
+      `status_intervals[status]` for MAINTENANCE/OFFLINE cameras
+    - grabbers ask `wants_frame()` before decoding and `offer()` the frame when due;
+      a camera keeps only its latest frame (older ones are shed as superseded)
+    - workers `acquire()` the pending frame of the camera with the smallest virtual
+      time (analysis seconds received / priority), so capacity is shared by priority
+    - frames older than `max_frame_age` when a worker becomes free are shed as stale
+    Every method takes an optional `now` (seconds, `clock` by default) for simulations.
+    """
+
+    def __init__(self, base_interval=0.5, boost_interval=0.1, boost_duration=60.0,
+                 idle_backoff=1.2, max_idle_factor=4.0, max_frame_age=2.0,
+                 status_intervals=None, clock=time.monotonic):
+        self.base_interval = base_interval
+        self.boost_interval = boost_interval
+        self.boost_duration = boost_duration
+        self.idle_backoff = idle_backoff
+        self.max_idle_factor = max_idle_factor
+        self.max_frame_age = max_frame_age
+        self.status_intervals = status_intervals if status_intervals is not None else {
+            'MAINTENANCE': 30.0,
+            'OFFLINE': 60.0,
+        }
+        self.clock = clock
+        self.cameras = {}
+        self._condition = threading.Condition()
+
+    # Cameras
+
+    def register(self, camera_id, priority=1.0, status='RECORDING', now=None):
+        now = self.clock() if now is None else now
+        with self._condition:
+            schedule = CameraSchedule(camera_id, max(priority, 0.01), status)
+            # Start at the current minimum so a new camera cannot monopolize the workers
+            schedule.vtime = min((c.vtime for c in self.cameras.values() if not c.closed), default=0.0)
+            schedule.next_due = now
+            self.cameras[camera_id] = schedule
+        return schedule
+
+    def update(self, camera_id, priority=None, status=None):
+        with self._condition:
+            schedule = self.cameras[camera_id]
+            if priority is not None:
+                schedule.priority = max(priority, 0.01)
+            if status is not None and status != schedule.status:
+                schedule.status = status
+                schedule.next_due = 0.0
+
+    def close(self, camera_id):
+        """The camera's grabber stopped: drop its pending frame"""
+        with self._condition:
+            schedule = self.cameras[camera_id]
+            schedule.closed = True
+            schedule.pending = None
+            self._condition.notify_all()
+
+    @property
+    def all_closed(self):
+        return all(schedule.closed for schedule in self.cameras.values())
+
+    def interval(self, schedule, now):
+        """Current sampling interval of a camera"""
+        if schedule.status in self.status_intervals:
+            return self.status_intervals[schedule.status]
+        if schedule.boost_until is not None and now < schedule.boost_until:
+            return self.boost_interval
+        return self.base_interval / schedule.priority * schedule.idle_factor
+
+    # Grabber side
+
+    def wants_frame(self, camera_id, now=None):
+        """True when the camera is due for analysis (otherwise the frame need not be decoded)"""
+        now = self.clock() if now is None else now
+        schedule = self.cameras[camera_id]
+        return not schedule.closed and now >= schedule.next_due
+
+    def offer(self, camera_id, frame, captured_at, is_valid=None, now=None):
+        """Submit a decoded frame; returns False if the camera was not due"""
+        now = self.clock() if now is None else now
+        with self._condition:
+            schedule = self.cameras[camera_id]
+            if schedule.closed or now < schedule.next_due:
+                return False
+            schedule.stats['offered'] += 1
+            if schedule.pending is not None:
+                schedule.stats['shed_superseded'] += 1
+            schedule.pending = DetectionJob(camera_id, frame, captured_at, is_valid)
+            schedule.next_due = now + self.interval(schedule, now)
+            self._condition.notify()
+            return True
+
+    # Worker side
+
+    def _pick(self, now):
+        best = None
+        for schedule in self.cameras.values():
+            job = schedule.pending
+            if job is None or schedule.busy:
+                continue
+            if now - job.captured_at > self.max_frame_age:
+                schedule.pending = None
+                schedule.stats['shed_stale'] += 1
+                continue
+            if best is None or (schedule.vtime, job.captured_at) < (best.vtime, best.pending.captured_at):
+                best = schedule
+        return best
+
+    def acquire(self, timeout=None, now=None):
+        """
+        Next job for a worker, or None if none became available within `timeout` seconds.
+        With an explicit `now` (simulation) it never waits.
+        """
+        with self._condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                current = self.clock() if now is None else now
+                schedule = self._pick(current)
+                if schedule is not None:
+                    job, schedule.pending = schedule.pending, None
+                    schedule.busy = True
+                    job.started_at = current
+                    return job
+                if now is not None or self.all_closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def complete(self, job, detected, now=None):
+        """Account the analysis time of a job and adapt the camera's sampling interval"""
+        now = self.clock() if now is None else now
+        with self._condition:
+            schedule = self.cameras[job.camera_id]
+            schedule.busy = False
+            schedule.vtime += max(now - job.started_at, 1e-4) / schedule.priority
+            schedule.stats['analyzed'] += 1
+            if detected:
+                schedule.stats['detections'] += 1
+                schedule.boost_until = now + self.boost_duration
+                schedule.idle_factor = 1.0
+            else:
+                schedule.idle_factor = min(schedule.idle_factor * self.idle_backoff, self.max_idle_factor)
+            # A sooner due time (e.g. boost) applies immediately
+            schedule.next_due = min(schedule.next_due, job.started_at + self.interval(schedule, now))
+            self._condition.notify()
+
+    def snapshot(self, camera_id, now=None):
+        now = self.clock() if now is None else now
+        schedule = self.cameras[camera_id]
+        return {
+            'priority': round(schedule.priority, 2),
+            'interval_s': round(self.interval(schedule, now), 3),
+            **schedule.stats,
+        }
+
+
+class SchedulerHandoff:
+    """Grabber-side handoff of a camera feeding a shared DetectionScheduler"""
+
+    def __init__(self, scheduler, camera_id):
+        self.scheduler = scheduler
+        self.camera_id = camera_id
+
+    def wants_frame(self, now):
+        return self.scheduler.wants_frame(self.camera_id, now)
+
+    def put(self, frame, captured_at):
+        self.scheduler.offer(self.camera_id, frame, captured_at)
+
+    def close(self):
+        self.scheduler.close(self.camera_id)
+
+    @property
+    def closed(self):
+        return self.scheduler.cameras[self.camera_id].closed
+
+    @property
+    def dropped(self):
+        stats = self.scheduler.cameras[self.camera_id].stats
+        return stats['shed_superseded'] + stats['shed_stale']
+
+
+def camera_priorities(cameras):
+    """
+    Priority of each camera (id -> weight), from the criticality of its zone:
+    DETECTION_ZONE_TYPE_WEIGHTS[zone.zone_type] (default 1.0), halved for inactive
+    zones, doubled when the zone has unresolved high/critical alerts from the last hour.
+    """
+    from zones_app.models import Zone, ZoneAlert
+
+    weights = getattr(settings, 'DETECTION_ZONE_TYPE_WEIGHTS', {})
+    zones = {zone.name.lower(): zone for zone in Zone.objects.all()}
+    alerted = set(
+        ZoneAlert.objects.filter(
+            is_resolved=False,
+            severity__in=('high', 'critical'),
+            detected_at__gte=timezone.now() - timedelta(hours=1),
+        ).values_list('zone_id', flat=True)
+    )
+    priorities = {}
+    for camera in cameras:
+        zone = zones.get(camera.zone.lower())
+        priority = 1.0
+        if zone is not None:
+            priority = float(weights.get(zone.zone_type, 1.0))
+            if zone.status == 'inactive':
+                priority *= 0.5
+            if zone.id in alerted:
+                priority *= 2.0
+        priorities[camera.id_camera] = priority
+    return priorities
@@ -0,0 +1,113 @@
+"""
+Per-camera detection zones
+Regions of interest and exclusion zones are polygons in normalized coordinates
+([[x, y], ...] with 0 <= x, y <= 1), stored on the Camera. They are compiled into a
+bitmask per analysis resolution; compiled masks are cached by a hash of the polygons,
+so editing a camera's polygons never reuses a stale mask.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+MASK_CACHE_SIZE = 64
+
+_mask_cache = OrderedDict()  # (zones key, height, width) -> CompiledZones
+_mask_cache_lock = threading.Lock()
+
+
+def normalize_polygons(value):
+    """
+    Validate a list of polygons and return it as lists of [x, y] floats.
+    Raises ValueError when a polygon has fewer than 3 points or a coordinate is outside [0, 1].
+    """
+    if value in (None, ''):
+        return []
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("Expected a list of polygons")
+    polygons = []
+    for polygon in value:
+        if not isinstance(polygon, (list, tuple)) or len(polygon) < 3:
+            raise ValueError("A polygon needs at least 3 [x, y] points")
+        points = []
+        for point in polygon:
+            if not isinstance(point, (list, tuple)) or len(point) != 2:
+                raise ValueError("Points must be [x, y] pairs")
+            try:
+                x, y = float(point[0]), float(point[1])
+            except (TypeError, ValueError):
+                raise ValueError("Point coordinates must be numbers")
+            if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0):
+                raise ValueError("Point coordinates are normalized: 0 <= x, y <= 1")
+            points.append([x, y])
+        polygons.append(points)
+    return polygons
+
+
+class CompiledZones:
+    """
+    Zones rasterized at one resolution: `mask` (uint8 0/255, full frame) and `bounds`
+    (x1, y1, x2, y2), the bounding box of the monitored pixels, or None if none is left
+    """
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.mask.flags.writeable = False
+        points = cv2.findNonZero(mask)
+        if points is None:
+            self.bounds = None
+        else:
+            x, y, w, h = cv2.boundingRect(points)
+            self.bounds = (x, y, x + w, y + h)
+
+
+class DetectionZones:
+    """Regions of interest (empty = whole frame) minus exclusion zones, in normalized coordinates"""
+
+    def __init__(self, rois=None, exclusions=None):
+        self.rois = normalize_polygons(rois)
+        self.exclusions = normalize_polygons(exclusions)
+        canonical = json.dumps([self.rois, self.exclusions], separators=(',', ':'))
+        self.key = hashlib.sha1(canonical.encode()).hexdigest()
+
+    def __bool__(self):
+        return bool(self.rois or self.exclusions)
+
+    def _pixels(self, polygon, height, width):
+        return np.round(np.array(polygon) * (width - 1, height - 1)).astype(np.int32)
+
+    def compile(self, height, width):
+        """CompiledZones at (height, width), rasterized once per resolution and cached"""
+        key = (self.key, height, width)
+        with _mask_cache_lock:
+            compiled = _mask_cache.get(key)
+            if compiled is not None:
+                _mask_cache.move_to_end(key)
+                return compiled
+        if self.rois:
+            mask = np.zeros((height, width), np.uint8)
+            cv2.fillPoly(mask, [self._pixels(p, height, width) for p in self.rois], 255)
+        else:
+            mask = np.full((height, width), 255, np.uint8)
+        if self.exclusions:
+            cv2.fillPoly(mask, [self._pixels(p, height, width) for p in self.exclusions], 0)
+        compiled = CompiledZones(mask)
+        with _mask_cache_lock:
+            _mask_cache[key] = compiled
+            while len(_mask_cache) > MASK_CACHE_SIZE:
+                _mask_cache.popitem(last=False)
+        return compiled
+
+    def contains(self, x, y):
+        """True if the normalized point (x, y) is monitored"""
+        def inside(polygons):
+            return any(
+                cv2.pointPolygonTest(np.array(polygon, np.float32), (float(x), float(y)), False) >= 0
+                for polygon in polygons
+            )
+        return (not self.rois or inside(self.rois)) and not inside(self.exclusions)
@@ -1,6 +1,7 @@
 """
 Fire Detection Service using YOLOv8 AI Model
 This service provides real-time fire and smoke detection capabilities
+The model runs through a pluggable inference backend (see inference_backends.py)
 """
 
 import cv2
@@ -8,46 +9,205 @@ import numpy as np
 from PIL import Image
 import io
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-    print("WARNING: ultralytics not installed. Fire detection will use fallback method.")
+from django.conf import settings
+
+from CyberCobra.compute_resources import compute_threads
+
+from .frame_context import FrameContext
+from .inference_backends import DEFAULT_IOU_THRESHOLD, create_backend, nms
+from .inference_scheduler import BatchingInferenceScheduler
+
+
+# Fire color ranges in HSV (OpenCV scale: H 0-180, S and V 0-255) - MORE SENSITIVE
+# Override with FIRE_DETECTION_HSV_RANGES (at most 8 ranges)
+FIRE_HSV_RANGES = [
+    # Red flames (low hue) - lower saturation threshold for dimmer fires
+    ((0, 50, 100), (10, 255, 255)),
+    # Red flames (high hue wrap-around)
+    ((170, 50, 100), (180, 255, 255)),
+    # Orange flames
+    ((10, 50, 100), (25, 255, 255)),
+    # Yellow flames (very bright)
+    ((25, 50, 150), (35, 255, 255)),
+    # White-hot flames (low saturation, high value)
+    ((0, 0, 200), (180, 50, 255)),
+]
+
+
+# Smallest fire region kept by the heuristic, in pixels at full resolution
+MIN_FIRE_AREA = 50
+# Most fire regions reported per frame, largest first (FIRE_DETECTION_MAX_DETECTIONS)
+MAX_FIRE_DETECTIONS = 100
+
+# Tiled detection defaults (FIRE_DETECTION_TILE_SIZE / FIRE_DETECTION_TILE_OVERLAP)
+DEFAULT_TILE_SIZE = 640
+DEFAULT_TILE_OVERLAP = 0.2
+# Kernel of the morphological opening and closing that clean the heuristic fire mask
+FIRE_MASK_KERNEL_SIZE = 3
+# Extra pixels around heuristic tiles so the morphology sees the same neighbours as on the whole
+# frame: the opening and the closing are two erosions/dilations each, reaching k // 2 px apiece
+TILE_MORPHOLOGY_MARGIN = 2 * 2 * (FIRE_MASK_KERNEL_SIZE // 2)
+
+FIRE_KEYWORDS = ['fire', 'flame', 'burning']
+SMOKE_KEYWORDS = ['smoke', 'fog', 'haze']
+
+
+def build_fire_color_lut(ranges):
+    """
+    Build the per-channel lookup tables of the fire color classifier.
+    Bit i of table[c][value] is set when `value` lies in range i on channel c, so a pixel
+    is fire-colored iff the AND of its H, S and V lookups is non-zero: exactly the OR of
+    the cv2.inRange masks of all ranges, in one table lookup per channel.
+    """
+    if len(ranges) > 8:
+        raise ValueError("At most 8 fire color ranges are supported")
+    values = np.arange(256)
+    tables = np.zeros((3, 256), dtype=np.uint8)
+    for bit, (lower, upper) in enumerate(ranges):
+        for channel in range(3):
+            inside = (values >= lower[channel]) & (values <= upper[channel])
+            tables[channel] |= (inside.astype(np.uint8) << bit)
+    return tuple(np.ascontiguousarray(table) for table in tables)
+
+
+def tile_grid(bounds, tile_size, overlap=0.0):
+    """
+    Tiles (x1, y1, x2, y2) of at most `tile_size` px covering `bounds` (x1, y1, x2, y2),
+    evenly spread so neighbours overlap by at least `overlap` (fraction of the tile size)
+    """
+    def spans(start, end):
+        length = end - start
+        if length <= tile_size:
+            return [(start, end)]
+        stride = tile_size * (1 - overlap)
+        count = int(np.ceil((length - tile_size) / stride)) + 1
+        return [(int(p), int(p) + tile_size) for p in np.linspace(start, end - tile_size, count).round()]
+
+    x1, y1, x2, y2 = bounds
+    return [(tx1, ty1, tx2, ty2) for ty1, ty2 in spans(y1, y2) for tx1, tx2 in spans(x1, x2)]
 
 
 class FireDetectionService:
     """
     Advanced Fire Detection Service using YOLOv8 for object detection
     Falls back to color-based heuristic if YOLO is unavailable
+
+    The model is loaded lazily on first use so that importing this module
+    (URLconf, migrations, management commands) stays cheap.
     """
     
     def __init__(self):
         self.model = None
         self.model_loaded = False
-        
-        if YOLO_AVAILABLE:
+        self.scheduler = None
+        self.fire_hsv_ranges = getattr(settings, 'FIRE_DETECTION_HSV_RANGES', FIRE_HSV_RANGES)
+        self._fire_color_lut = build_fire_color_lut(self.fire_hsv_ranges)
+        self._model_attempted = False
+        self._model_lock = threading.Lock()
+        self.max_detections = getattr(settings, 'FIRE_DETECTION_MAX_DETECTIONS', MAX_FIRE_DETECTIONS)
+        self.tile_size = getattr(settings, 'FIRE_DETECTION_TILE_SIZE', DEFAULT_TILE_SIZE)
+        self.tile_overlap = getattr(settings, 'FIRE_DETECTION_TILE_OVERLAP', DEFAULT_TILE_OVERLAP)
+        self._tile_pool = None
+
+    def load_model(self):
+        """
+        Load the YOLO model once (thread-safe) through the configured inference backend.
+        Returns True if the model is available, False if the heuristic must be used.
+        """
+        if self._model_attempted:
+            return self.model_loaded
+        with self._model_lock:
+            if self._model_attempted:
+                return self.model_loaded
             try:
-                # Try to load a pre-trained YOLO model
-                # YOLOv8n is the fastest, YOLOv8x is the most accurate
-                self.model = YOLO('yolov8n.pt')  # Nano model for speed
+                # YOLOv8n (default) is the fastest, YOLOv8x is the most accurate
+                self.model = create_backend()
                 self.model_loaded = True
-                print("✅ YOLOv8 model loaded successfully")
+                # Micro-batching of concurrent requests (threaded workers only)
+                max_batch_size = getattr(settings, 'FIRE_DETECTION_MAX_BATCH_SIZE', 1)
+                if max_batch_size > 1:
+                    self.scheduler = BatchingInferenceScheduler(
+                        self.model,
+                        max_batch_size=max_batch_size,
+                        max_wait_ms=getattr(settings, 'FIRE_DETECTION_MAX_BATCH_WAIT_MS', 10.0),
+                    )
+                print(f"✅ YOLOv8 model loaded successfully ({self.model.name} backend)")
+            except ImportError as e:
+                print(f"WARNING: inference runtime not installed ({e}). Fire detection will use fallback method.")
             except Exception as e:
                 print(f"⚠️ Could not load YOLO model: {e}")
                 print("Will use heuristic detection method")
-        
-    def detect_fire_in_image(self, image_data, confidence_threshold=0.3):
+            self._model_attempted = True
+        return self.model_loaded
+
+    def warmup(self):
+        """
+        Load the model and run one dummy inference so the first real request
+        does not pay for model loading and runtime initialization.
+        """
+        dummy = Image.new('RGB', (640, 480))
+        self.detect_fire_heuristic(dummy)
+        if self.load_model():
+            try:
+                self.predict(np.zeros((480, 640, 3), dtype=np.uint8))
+            except Exception as e:
+                print(f"⚠️ YOLO warm-up inference failed: {e}")
+        return self.model_loaded
+
+    def predict(self, img_array, confidence_threshold=0.25):
+        """Run the model on one RGB image, through the batching scheduler when enabled"""
+        if self.scheduler is not None:
+            return self.scheduler.predict(img_array, confidence_threshold)
+        return self.model.predict([img_array], conf_threshold=confidence_threshold)[0]
+
+    def predict_many(self, images, confidence_threshold=0.25, batch_size=8):
+        """
+        Run the model on several RGB images (tiles): all submitted at once to the batching
+        scheduler when enabled, so they share its batches and its single inference thread
+        with concurrent requests; otherwise in backend batches of `batch_size`
+        """
+        if self.scheduler is not None:
+            futures = [self.scheduler.submit(image, confidence_threshold) for image in images]
+            return [future.result() for future in futures]
+        outputs = []
+        for start in range(0, len(images), batch_size):
+            outputs.extend(self.model.predict(images[start:start + batch_size], conf_threshold=confidence_threshold))
+        return outputs
+
+    @property
+    def tile_pool(self):
+        """Threads running the OpenCV work of heuristic tiles (FIRE_DETECTION_TILE_WORKERS, default the process share of the cores)"""
+        if self._tile_pool is None:
+            with self._model_lock:
+                if self._tile_pool is None:
+                    workers = getattr(settings, 'FIRE_DETECTION_TILE_WORKERS', None) or compute_threads()
+                    self._tile_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fire-tiles')
+        return self._tile_pool
+
+    def detect_fire_in_image(self, image_data, confidence_threshold=0.3, analysis_max_side=None,
+                             annotate=True, annotation_max_side=None, region=None, tiled=False, zones=None):
         """
         Detect fire and smoke in an image
         Uses color-based heuristic detection (more reliable for flames)
         Falls back to YOLOv8 if available for additional validation
         
         Args:
-            image_data: Image file data (bytes, PIL Image, or file path)
+            image_data: Image file data (bytes, PIL Image, file path or FrameContext)
             confidence_threshold: Minimum confidence for detection (0.0 to 1.0)
+            analysis_max_side: Longest side (px) the image is downscaled to before analysis;
+                boxes are returned in original image coordinates (None = full resolution)
+            annotate: Draw the detections; when False no annotated image is rendered
+            annotation_max_side: Longest side (px) of the annotated image (None = full resolution)
+            region: (x1, y1, x2, y2) part of the image analyzed by the heuristic and the model
+                (None = whole image)
+            tiled: Analyze overlapping full-resolution tiles (high-resolution cameras: small fires
+                survive); `analysis_max_side` is then ignored
+            zones: DetectionZones (camera ROIs and exclusions): pixels outside are not analyzed
+                and model boxes centered outside are dropped
             
         Returns:
             dict: {
@@ -55,117 +215,209 @@ class FireDetectionService:
                 'smoke_detected': bool,
                 'detections': list of detection objects,
                 'confidence': float,
-                'annotated_image': PIL Image with bounding boxes
+                'annotated_image': PIL Image with bounding boxes (None if not annotated)
             }
         """
         
+        # Decoded once, shared by every detection stage
+        frame = FrameContext.wrap(image_data)
+        
         # PRIMARY: Use heuristic method (more reliable for fire detection)
-        heuristic_result = self.detect_fire_heuristic(image_data)
+        if tiled:
+            heuristic_result = self.detect_fire_heuristic_tiled(frame, annotate, annotation_max_side, region, zones)
+        else:
+            heuristic_result = self.detect_fire_heuristic(
+                frame, analysis_max_side, annotate, annotation_max_side, region, zones
+            )
         
         # If fire detected by heuristic, return immediately
         if heuristic_result['fire_detected']:
             return heuristic_result
         
-        # SECONDARY: Try YOLO if no fire detected by heuristic
-        # Load image
-        if isinstance(image_data, bytes):
-            image = Image.open(io.BytesIO(image_data))
-        elif isinstance(image_data, str):
-            image = Image.open(image_data)
+        # SECONDARY: Try YOLO if no fire detected by heuristic (on the same region)
+        if tiled:
+            model_result = self.detect_fire_model_tiled(
+                frame, confidence_threshold, annotate, annotation_max_side, zones=zones, region=region
+            )
         else:
-            image = image_data
+            model_result = self.detect_fire_model(
+                frame, confidence_threshold, analysis_max_side, annotate, annotation_max_side, zones, region
+            )
+        
+        # If YOLO found nothing (or failed) and heuristic found nothing, return heuristic result
+        if model_result is None or not (model_result['fire_detected'] or model_result['smoke_detected']):
+            return heuristic_result
+            
+        return model_result
+
+    def detect_fire_model(self, image_data, confidence_threshold=0.3, analysis_max_side=None,
+                          annotate=True, annotation_max_side=None, zones=None, region=None):
+        """
+        Detect fire and smoke with the YOLO model only.
+        With `region` (x1, y1, x2, y2 in original coordinates) the model only sees that crop.
+        Returns the same dict as detect_fire_in_image, or None if the model is
+        unavailable or inference failed.
+        """
+        if not (self.load_model() and self.model):
+            return None
+        frame = FrameContext.wrap(image_data)
+        
+        try:
+            # Run YOLOv8 inference on the analysis resolution, boxes mapped back to the original
+            analysis_array, scale = frame.analysis('rgb', analysis_max_side)
+            offset_x = offset_y = 0
+            if region is not None:
+                height, width = analysis_array.shape[:2]
+                offset_x, offset_y, x2, y2 = self.analysis_bounds(height, width, [v * scale for v in region])
+                analysis_array = analysis_array[offset_y:y2, offset_x:x2]
+            model_detections = self.predict(analysis_array, confidence_threshold)
+            if scale != 1.0 or region is not None:
+                for detection in model_detections:
+                    x1, y1, x2, y2 = detection['bbox']
+                    detection['bbox'] = [(x1 + offset_x) / scale, (y1 + offset_y) / scale,
+                                         (x2 + offset_x) / scale, (y2 + offset_y) / scale]
+            return self._model_result(frame, model_detections, annotate, annotation_max_side, zones)
+        except Exception as e:
+            print(f"Error in YOLO detection: {e}")
+            return None
+
+    def detect_fire_model_tiled(self, image_data, confidence_threshold=0.3, annotate=True,
+                                annotation_max_side=None, iou_threshold=DEFAULT_IOU_THRESHOLD, zones=None,
+                                region=None):
+        """
+        Detect fire and smoke with the YOLO model on overlapping full-resolution tiles plus
+        one downscaled view of the whole frame (fires larger than the tile overlap), run in
+        batches of FIRE_DETECTION_TILE_BATCH_SIZE (or through the batching scheduler, see
+        predict_many). Boxes of all tiles are merged by per-class NMS.
+        With `region` (x1, y1, x2, y2) only that part of the frame is tiled, and the
+        downscaled view is the one of the region.
+        Returns the same dict as detect_fire_model, or None if the model is unavailable.
+        """
+        if not (self.load_model() and self.model):
+            return None
+        frame = FrameContext.wrap(image_data)
+        
+        try:
+            rgb = frame.rgb
+            height, width = rgb.shape[:2]
+            if region is None:
+                bounds = (0, 0, width, height)
+                overview, overview_scale = frame.analysis('rgb', self.tile_size)
+            else:
+                bounds = self.analysis_bounds(height, width, region)
+                bx1, by1, bx2, by2 = bounds
+                crop = rgb[by1:by2, bx1:bx2]
+                overview_scale = min(1.0, self.tile_size / max(crop.shape[:2]))
+                overview = cv2.resize(crop, None, fx=overview_scale, fy=overview_scale, interpolation=cv2.INTER_AREA)
+            tiles = tile_grid(bounds, self.tile_size, self.tile_overlap)
+            images = [rgb[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+            offsets = [(x1, y1, 1.0) for x1, y1, _, _ in tiles]
+            if len(tiles) > 1 or region is None:
+                images.append(overview)
+                offsets.append((bounds[0], bounds[1], overview_scale))
             
-        # Convert PIL to numpy array for OpenCV
-        img_array = np.array(image)
-        if len(img_array.shape) == 2:  # Grayscale
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
-        elif img_array.shape[2] == 4:  # RGBA
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2RGB)
+            outputs = self.predict_many(
+                images, confidence_threshold, getattr(settings, 'FIRE_DETECTION_TILE_BATCH_SIZE', 8)
+            )
+            candidates = []
+            for (offset_x, offset_y, scale), detections in zip(offsets, outputs):
+                for detection in detections:
+                    x1, y1, x2, y2 = (v / scale for v in detection['bbox'])
+                    # Objects smaller than the overlap fit whole in a tile, seen there at full resolution
+                    if scale != 1.0 and max(x2 - x1, y2 - y1) <= self.tile_size * self.tile_overlap:
+                        continue
+                    detection['bbox'] = [x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y]
+                    candidates.append(detection)
             
+            # Cross-tile NMS, per class: boxes of different classes are shifted apart
+            class_ids = {name: index for index, name in enumerate(sorted({d['class'] for d in candidates}))}
+            shift = float(max(height, width) + 1)
+            boxes = [[v + class_ids[d['class']] * shift for v in d['bbox']] for d in candidates]
+            keep = nms(boxes, [d['confidence'] for d in candidates], iou_threshold)
+            model_detections = [candidates[i] for i in sorted(keep, key=lambda i: -candidates[i]['confidence'])]
+            return self._model_result(frame, model_detections, annotate, annotation_max_side, zones)
+        except Exception as e:
+            print(f"Error in tiled YOLO detection: {e}")
+            return None
+
+    def _model_result(self, frame, model_detections, annotate, annotation_max_side, zones=None):
+        """
+        Keep the fire/smoke detections of the model (boxes in original coordinates) centered
+        inside the detection zones, and draw them
+        """
         fire_detected = False
         smoke_detected = False
         detections = []
         max_confidence = 0.0
-        annotated_image = image.copy()
         
-        if self.model_loaded and self.model:
-            try:
-                # Run YOLOv8 inference
-                results = self.model(img_array, conf=confidence_threshold)
-                
-                # Process results
-                for result in results:
-                    boxes = result.boxes
-                    for box in boxes:
-                        # Get box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf = float(box.conf[0].cpu().numpy())
-                        cls = int(box.cls[0].cpu().numpy())
-                        class_name = result.names[cls].lower()
-                        
-                        # Check for fire/smoke related classes
-                        fire_keywords = ['fire', 'flame', 'burning']
-                        smoke_keywords = ['smoke', 'fog', 'haze']
-                        
-                        is_fire = any(keyword in class_name for keyword in fire_keywords)
-                        is_smoke = any(keyword in class_name for keyword in smoke_keywords)
-                        
-                        if is_fire:
-                            fire_detected = True
-                            max_confidence = max(max_confidence, conf)
-                            color = (255, 0, 0)  # Red for fire
-                        elif is_smoke:
-                            smoke_detected = True
-                            max_confidence = max(max_confidence, conf)
-                            color = (128, 128, 128)  # Gray for smoke
-                        else:
-                            continue
-                            
-                        detections.append({
-                            'class': class_name,
-                            'confidence': conf,
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)]
-                        })
-                        
-                        # Draw bounding box
-                        img_array = cv2.rectangle(
-                            img_array,
-                            (int(x1), int(y1)),
-                            (int(x2), int(y2)),
-                            color,
-                            3
-                        )
-                        
-                        # Add label
-                        label = f"{class_name}: {conf:.2f}"
-                        (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-                        img_array = cv2.rectangle(
-                            img_array,
-                            (int(x1), int(y1) - 20),
-                            (int(x1) + w, int(y1)),
-                            color,
-                            -1
-                        )
-                        img_array = cv2.putText(
-                            img_array,
-                            label,
-                            (int(x1), int(y1) - 5),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6,
-                            (255, 255, 255),
-                            2
-                        )
-                
-                annotated_image = Image.fromarray(img_array)
+        # Draw on a copy at the annotation resolution: the frame arrays are shared between stages
+        img_array = None
+        if annotate:
+            annotation_array, annotation_scale = frame.analysis('rgb', annotation_max_side)
+            img_array = annotation_array.copy()
+        
+        # Process results
+        for detection in model_detections:
+            x1, y1, x2, y2 = detection['bbox']
+            conf = detection['confidence']
+            class_name = detection['class']
+            
+            # Check for fire/smoke related classes
+            is_fire = any(keyword in class_name for keyword in FIRE_KEYWORDS)
+            is_smoke = any(keyword in class_name for keyword in SMOKE_KEYWORDS)
+            
+            if is_fire:
+                color = (255, 0, 0)  # Red for fire
+            elif is_smoke:
+                color = (128, 128, 128)  # Gray for smoke
+            else:
+                continue
+            if zones:
+                height, width = frame.shape
+                if not zones.contains((x1 + x2) / 2 / width, (y1 + y2) / 2 / height):
+                    continue
                 
-            except Exception as e:
-                print(f"Error in YOLO detection: {e}")
-                # Already checked heuristic, return those results
-                return heuristic_result
+            if is_fire:
+                fire_detected = True
+                max_confidence = max(max_confidence, conf)
+            else:
+                smoke_detected = True
+                max_confidence = max(max_confidence, conf)
+            detections.append(detection)
+            if img_array is None:
+                continue
+            x1, y1, x2, y2 = (v * annotation_scale for v in (x1, y1, x2, y2))
+            
+            # Draw bounding box
+            img_array = cv2.rectangle(
+                img_array,
+                (int(x1), int(y1)),
+                (int(x2), int(y2)),
+                color,
+                3
+            )
+            
+            # Add label
+            label = f"{class_name}: {conf:.2f}"
+            (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            img_array = cv2.rectangle(
+                img_array,
+                (int(x1), int(y1) - 20),
+                (int(x1) + w, int(y1)),
+                color,
+                -1
+            )
+            img_array = cv2.putText(
+                img_array,
+                label,
+                (int(x1), int(y1) - 5),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.6,
+                (255, 255, 255),
+                2
+            )
         
-        # If YOLO found nothing and heuristic found nothing, return heuristic result
-        if not fire_detected and not smoke_detected:
-            return heuristic_result
+        annotated_image = Image.fromarray(img_array) if img_array is not None else None
             
         return {
             'fire_detected': fire_detected,
@@ -175,105 +427,159 @@ class FireDetectionService:
             'annotated_image': annotated_image
         }
     
-    def detect_fire_heuristic(self, image_data):
+    def fire_color_mask(self, hsv):
+        """
+        Mask (0/255) of the pixels of an HSV image inside any of the fire color ranges.
+        Equivalent to OR-ing one cv2.inRange mask per range, with a single table
+        lookup per channel instead of one full pass per range.
+        """
+        lut_h, lut_s, lut_v = self._fire_color_lut
+        h, s, v = cv2.split(hsv)
+        matches = cv2.bitwise_and(cv2.LUT(h, lut_h), cv2.LUT(s, lut_s))
+        matches = cv2.bitwise_and(matches, cv2.LUT(v, lut_v))
+        return cv2.compare(matches, 0, cv2.CMP_GT)
+
+    def detect_fire_heuristic(self, image_data, analysis_max_side=None, annotate=True, annotation_max_side=None,
+                              region=None, zones=None):
         """
         Fallback fire detection using color-based heuristic method
+        `image_data` can be bytes, a file path, a PIL Image or a FrameContext
         Detects fire by analyzing HSV color space for fire-like colors
         Enhanced sensitivity for detecting flames, candles, and small fires
+
+        With `analysis_max_side`, masking, morphology and region extraction run on a downscaled
+        copy: area thresholds scale with it and boxes are mapped back to the original.
+        With `annotate=False` nothing is drawn and 'annotated_image' is None.
+        With `region` (x1, y1, x2, y2 in original coordinates) only that part of the frame
+        is converted and analyzed; the fire percentage stays relative to the whole frame.
+        With `zones` (DetectionZones) the analysis is cropped to the bounding box of the
+        monitored pixels and the fire mask is cleared outside them.
         """
         
-        # Load image
-        if isinstance(image_data, bytes):
-            image = Image.open(io.BytesIO(image_data))
-        elif isinstance(image_data, str):
-            image = Image.open(image_data)
-        else:
-            image = image_data
+        # Decoded frame (shared with the other stages when given a FrameContext)
+        frame = FrameContext.wrap(image_data)
             
-        # Convert to OpenCV format
-        img_array = np.array(image)
-        if len(img_array.shape) == 2:
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
-        elif img_array.shape[2] == 4:
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
+        # HSV color space for better color detection, at the analysis resolution
+        # (cost drops with the square of the scale)
+        offset = (0, 0)
+        if region is None and not zones:
+            hsv, scale = frame.analysis('hsv', analysis_max_side)
+            total_pixels = hsv.shape[0] * hsv.shape[1]
+            fire_mask = self.clean_fire_mask(hsv)
         else:
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            
-        # Convert to HSV color space for better color detection
-        hsv = cv2.cvtColor(img_array, cv2.COLOR_BGR2HSV)
+            bgr, scale = frame.analysis('bgr', analysis_max_side)
+            height, width = bgr.shape[:2]
+            total_pixels = height * width
+            compiled = zones.compile(height, width) if zones else None
+            if region is not None:
+                region = [v * scale for v in region]
+            bounds = self.analysis_bounds(height, width, region, compiled)
+            if bounds is None:
+                fire_mask = np.zeros((1, 1), np.uint8)
+            else:
+                x1, y1, x2, y2 = bounds
+                offset = (x1, y1)
+                fire_mask = self.clean_fire_mask(cv2.cvtColor(bgr[y1:y2, x1:x2], cv2.COLOR_BGR2HSV))
+                if compiled is not None:
+                    fire_mask = cv2.bitwise_and(fire_mask, compiled.mask[y1:y2, x1:x2])
         
-        # Also convert to LAB for luminosity analysis (bright flames)
-        lab = cv2.cvtColor(img_array, cv2.COLOR_BGR2LAB)
-        
-        # Define fire color ranges in HSV - MORE SENSITIVE
-        # Red flames (low hue)
-        lower_fire1 = np.array([0, 50, 100])      # Lower saturation threshold for dimmer fires
-        upper_fire1 = np.array([10, 255, 255])
-        
-        # Red flames (high hue wrap-around)
-        lower_fire2 = np.array([170, 50, 100])
-        upper_fire2 = np.array([180, 255, 255])
-        
-        # Orange flames
-        lower_fire3 = np.array([10, 50, 100])
-        upper_fire3 = np.array([25, 255, 255])
-        
-        # Yellow flames (very bright)
-        lower_fire4 = np.array([25, 50, 150])
-        upper_fire4 = np.array([35, 255, 255])
-        
-        # White-hot flames (low saturation, high value)
-        lower_fire5 = np.array([0, 0, 200])
-        upper_fire5 = np.array([180, 50, 255])
-        
-        # Create masks for all fire colors
-        mask1 = cv2.inRange(hsv, lower_fire1, upper_fire1)
-        mask2 = cv2.inRange(hsv, lower_fire2, upper_fire2)
-        mask3 = cv2.inRange(hsv, lower_fire3, upper_fire3)
-        mask4 = cv2.inRange(hsv, lower_fire4, upper_fire4)
-        mask5 = cv2.inRange(hsv, lower_fire5, upper_fire5)
-        
-        # Combine all masks
-        fire_mask = cv2.bitwise_or(mask1, mask2)
-        fire_mask = cv2.bitwise_or(fire_mask, mask3)
-        fire_mask = cv2.bitwise_or(fire_mask, mask4)
-        fire_mask = cv2.bitwise_or(fire_mask, mask5)
-        
-        # Apply morphological operations to reduce noise
-        kernel = np.ones((3, 3), np.uint8)
+        return self._heuristic_result(frame, fire_mask, total_pixels, scale, offset, annotate, annotation_max_side)
+
+    @staticmethod
+    def analysis_bounds(height, width, region=None, compiled=None):
+        """
+        Part (x1, y1, x2, y2) of a height x width analysis frame to analyze: `region`
+        (analysis coordinates) intersected with the bounds of the compiled zones.
+        None when nothing is left.
+        """
+        x1, y1, x2, y2 = 0, 0, width, height
+        if region is not None:
+            x1, y1, x2, y2 = (int(round(v)) for v in region)
+            x1, y1 = min(max(x1, 0), width - 1), min(max(y1, 0), height - 1)
+            x2, y2 = min(max(x2, x1 + 1), width), min(max(y2, y1 + 1), height)
+        if compiled is not None:
+            if compiled.bounds is None:
+                return None
+            zx1, zy1, zx2, zy2 = compiled.bounds
+            x1, y1, x2, y2 = max(x1, zx1), max(y1, zy1), min(x2, zx2), min(y2, zy2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def clean_fire_mask(self, hsv):
+        """Fire color mask of an HSV image, with morphological operations to reduce noise"""
+        fire_mask = self.fire_color_mask(hsv)
+        kernel = np.ones((FIRE_MASK_KERNEL_SIZE, FIRE_MASK_KERNEL_SIZE), np.uint8)
         fire_mask = cv2.morphologyEx(fire_mask, cv2.MORPH_OPEN, kernel)
-        fire_mask = cv2.morphologyEx(fire_mask, cv2.MORPH_CLOSE, kernel)
+        return cv2.morphologyEx(fire_mask, cv2.MORPH_CLOSE, kernel)
+
+    def detect_fire_heuristic_tiled(self, image_data, annotate=True, annotation_max_side=None, region=None,
+                                    zones=None):
+        """
+        Color heuristic at full resolution, with the color conversion and morphology of each
+        tile run in parallel on `tile_pool` (OpenCV releases the GIL). Tiles are padded so the
+        stitched mask, and therefore the result, equals detect_fire_heuristic at full resolution.
+        """
+        frame = FrameContext.wrap(image_data)
+        bgr = frame.bgr
+        height, width = bgr.shape[:2]
+        compiled = zones.compile(height, width) if zones else None
+        bounds = self.analysis_bounds(height, width, region, compiled)
+        if bounds is None:
+            return self._heuristic_result(
+                frame, np.zeros((1, 1), np.uint8), height * width, 1.0, (0, 0), annotate, annotation_max_side
+            )
+        bx1, by1, bx2, by2 = bounds
+        margin = TILE_MORPHOLOGY_MARGIN
         
+        def tile_mask(tile):
+            x1, y1, x2, y2 = tile
+            px1, py1 = max(x1 - margin, bx1), max(y1 - margin, by1)
+            px2, py2 = min(x2 + margin, bx2), min(y2 + margin, by2)
+            mask = self.clean_fire_mask(cv2.cvtColor(bgr[py1:py2, px1:px2], cv2.COLOR_BGR2HSV))
+            mask = mask[y1 - py1:y2 - py1, x1 - px1:x2 - px1]
+            if compiled is not None:
+                mask = cv2.bitwise_and(mask, compiled.mask[y1:y2, x1:x2])
+            return mask
+        
+        # Connected components need the whole mask: tiles only split the per-pixel work
+        tiles = tile_grid(bounds, self.tile_size)
+        fire_mask = np.empty((by2 - by1, bx2 - bx1), np.uint8)
+        for (x1, y1, x2, y2), mask in zip(tiles, self.tile_pool.map(tile_mask, tiles)):
+            fire_mask[y1 - by1:y2 - by1, x1 - bx1:x2 - bx1] = mask
+        return self._heuristic_result(frame, fire_mask, height * width, 1.0, (bx1, by1), annotate, annotation_max_side)
+
+    def _heuristic_result(self, frame, fire_mask, total_pixels, scale, offset, annotate, annotation_max_side):
+        """
+        Detections of a fire mask at analysis `scale`, whose top-left corner is at `offset`
+        in the analysis frame; `total_pixels` is the size of the whole analysis frame
+        """
         # Calculate fire pixel percentage
-        total_pixels = fire_mask.shape[0] * fire_mask.shape[1]
         fire_pixels = cv2.countNonZero(fire_mask)
         fire_percentage = (fire_pixels / total_pixels) * 100
         
         # More sensitive threshold - detect even small flames
         fire_detected = fire_percentage > 0.5  # Lowered from 2% to 0.5% for better sensitivity
         
-        # Find contours for bounding boxes
-        contours, _ = cv2.findContours(fire_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        detections = []
-        annotated_img = img_array.copy()
+        boxes, confidences = self.extract_fire_regions(fire_mask, fire_percentage, scale, offset)
+        detections = [
+            {
+                'class': 'fire',
+                'confidence': float(confidence),
+                'bbox': [float(x), float(y), float(x + w), float(y + h)]
+            }
+            for (x, y, w, h), confidence in zip(boxes.tolist(), confidences.tolist())
+        ]
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 50:  # Much lower threshold (was 500) - detect even small flames like candles
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                # Calculate confidence based on area and brightness
-                area_score = min(area / 1000, 1.0)
-                percentage_score = min(fire_percentage / 5, 1.0)
-                confidence = max(area_score, percentage_score)
-                confidence = min(confidence, 0.99)
-                
-                detections.append({
-                    'class': 'fire',
-                    'confidence': confidence,
-                    'bbox': [float(x), float(y), float(x + w), float(y + h)]
-                })
+        # Draw only the kept boxes, on a copy at the annotation resolution: the frame arrays are shared between stages
+        annotated_image = None
+        if annotate:
+            annotation_array, annotation_scale = frame.analysis('bgr', annotation_max_side)
+            annotated_img = annotation_array.copy()
+            for (x, y, w, h), confidence in zip(boxes.tolist(), confidences.tolist()):
+                if annotation_scale != 1.0:
+                    x, y = int(x * annotation_scale), int(y * annotation_scale)
+                    w, h = int(round(w * annotation_scale)), int(round(h * annotation_scale))
                 
                 # Draw bounding box - thicker and more visible
                 color = (0, 0, 255)  # Red in BGR
@@ -300,10 +606,8 @@ class FireDetectionService:
                     (255, 255, 255),
                     2
                 )
-        
-        # Convert back to RGB for PIL
-        annotated_img = cv2.cvtColor(annotated_img, cv2.COLOR_BGR2RGB)
-        annotated_image = Image.fromarray(annotated_img)
+            # Convert back to RGB for PIL
+            annotated_image = Image.fromarray(cv2.cvtColor(annotated_img, cv2.COLOR_BGR2RGB))
         
         return {
             'fire_detected': fire_detected,
@@ -312,14 +616,82 @@ class FireDetectionService:
             'confidence': fire_percentage / 100,
             'annotated_image': annotated_image
         }
+
+    def extract_fire_regions(self, fire_mask, fire_percentage, scale=1.0, offset=(0, 0)):
+        """
+        Fire regions of a mask, largest first: 8-connected components of more than
+        MIN_FIRE_AREA full-resolution pixels, at most FIRE_DETECTION_MAX_DETECTIONS of them.
+        Filtering, confidences and box mapping are vectorized over all components, so noisy
+        masks with thousands of blobs cost one labelling pass (BBDT algorithm).
+        Returns (boxes, confidences): int array of (x, y, w, h) in original coordinates and
+        float array of confidences.
+        """
+        # Label only the bounding box of the fire pixels (usually a small part of the frame)
+        crop_x, crop_y, crop_w, crop_h = cv2.boundingRect(fire_mask)
+        if crop_w == 0:
+            return np.empty((0, 4), int), np.empty(0)
+        _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+            fire_mask[crop_y:crop_y + crop_h, crop_x:crop_x + crop_w], 8, cv2.CV_32S, cv2.CCL_GRANA
+        )
+        stats = stats[1:]  # label 0 is the background
+        # Area in full-resolution pixels, so thresholds keep their meaning
+        areas = stats[:, cv2.CC_STAT_AREA] / (scale * scale)
+        kept = np.flatnonzero(areas > MIN_FIRE_AREA)  # detect even small flames like candles
+        kept = kept[np.argsort(-areas[kept], kind='stable')[:self.max_detections]]
+        
+        boxes = stats[kept, :4].copy()  # left, top, width, height
+        boxes[:, 0] += offset[0] + crop_x
+        boxes[:, 1] += offset[1] + crop_y
+        if scale != 1.0:
+            boxes[:, :2] = (boxes[:, :2] / scale).astype(int)
+            boxes[:, 2:] = np.round(boxes[:, 2:] / scale)
+        
+        # Confidence based on area and on the fire share of the frame
+        confidences = np.maximum(np.minimum(areas[kept] / 1000, 1.0), min(fire_percentage / 5, 1.0))
+        return boxes, np.minimum(confidences, 0.99)
     
-    def image_to_base64(self, image):
-        """Convert PIL Image to base64 string"""
+    def encode_image(self, image, image_format="JPEG"):
+        """Encode a PIL Image to JPEG or WebP bytes"""
         buffered = io.BytesIO()
-        image.save(buffered, format="JPEG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        image.save(buffered, format=image_format)
+        return buffered.getvalue()
+
+    def image_to_base64(self, image, image_format="JPEG"):
+        """Convert PIL Image to base64 string"""
+        img_str = base64.b64encode(self.encode_image(image, image_format)).decode()
         return img_str
 
 
-# Global instance
-fire_detector = FireDetectionService()
+def alert_level(result):
+    """Alert level of a detection result: CRITICAL (fire and smoke), HIGH or NORMAL"""
+    if result['fire_detected'] and result['smoke_detected']:
+        return 'CRITICAL'
+    if result['fire_detected'] or result['smoke_detected']:
+        return 'HIGH'
+    return 'NORMAL'
+
+
+def alert_message(result):
+    """Human-readable summary of a detection result"""
+    if result['fire_detected'] or result['smoke_detected']:
+        detected_items = []
+        if result['fire_detected']:
+            detected_items.append('🔥 FIRE')
+        if result['smoke_detected']:
+            detected_items.append('💨 SMOKE')
+        return f"⚠️ ALERT: {' and '.join(detected_items)} detected! Confidence: {result['confidence']:.1%}"
+    return "✅ No fire or smoke detected. Environment is safe."
+
+
+_fire_detector = None
+_fire_detector_lock = threading.Lock()
+
+
+def get_fire_detector():
+    """Return the process-wide FireDetectionService, created on first call"""
+    global _fire_detector
+    if _fire_detector is None:
+        with _fire_detector_lock:
+            if _fire_detector is None:
+                _fire_detector = FireDetectionService()
+    return _fire_detector
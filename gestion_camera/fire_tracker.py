@@ -0,0 +1,198 @@
+"""
+Temporal smoothing of per-camera fire verdicts
+Single-frame verdicts flicker: flames change shape, a reflection passes, the heuristic
+misses a frame. A FireTracker follows the detected boxes of one camera from frame to
+frame (IoU matching) and keeps an exponential moving confidence per box. A camera
+enters the fire (or smoke) state when its best smoothed confidence reaches
+`enter_threshold` and only leaves it below `clear_threshold`: alerts and events are
+emitted on these transitions, not on every positive frame.
+"""
+
+import math
+
+from django.conf import settings
+
+from .fire_detection_service import FIRE_KEYWORDS, SMOKE_KEYWORDS
+
+
+LABELS = ('fire', 'smoke')
+
+
+def detection_label(class_name):
+    """'fire' or 'smoke' for a detection class (model classes such as 'flame' or 'haze'), else None"""
+    if any(keyword in class_name for keyword in FIRE_KEYWORDS):
+        return 'fire'
+    if any(keyword in class_name for keyword in SMOKE_KEYWORDS):
+        return 'smoke'
+    return None
+
+
+def box_iou(a, b):
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    """A box followed across frames and its smoothed confidence"""
+
+    def __init__(self, label, bbox, score, seen_at):
+        self.label = label
+        self.bbox = list(bbox)
+        self.score = score
+        self.seen_at = seen_at
+        self.hits = 1
+
+    def as_detection(self):
+        return {'class': self.label, 'confidence': round(self.score, 4), 'bbox': self.bbox}
+
+
+class FireTracker:
+    """
+    Fire and smoke state of one camera.
+
+    - each detection is matched to the track of the same label (fire or smoke) it overlaps most
+      (IoU >= `iou_threshold`, greedy); unmatched detections start new tracks
+    - track confidences are exponential moving averages with time constant
+      `time_constant` seconds (alpha = 1 - exp(-dt / time_constant), so irregular
+      sampling weighs frames by the time they cover); a track not seen in a frame
+      decays towards 0 and is dropped when unseen for `max_age` seconds (default three
+      time constants: its confidence is then below 5% of what it was)
+    - at most `max_tracks` tracks are kept (the most confident, then the most recent),
+      and only the `max_tracks` most confident detections of a frame are matched, which
+      bounds the matching to max_tracks x max_tracks overlaps per frame
+    - the score of a class is the best confidence of its tracks; the class becomes
+      active at `enter_threshold` and inactive below `clear_threshold`
+    - `frame_interval` is the dt assumed for the first frame
+    """
+
+    def __init__(self, enter_threshold=0.35, clear_threshold=0.1, time_constant=4.0, iou_threshold=0.3,
+                 max_age=None, frame_interval=0.5, max_tracks=64):
+        if clear_threshold > enter_threshold:
+            raise ValueError("clear_threshold must not exceed enter_threshold")
+        self.enter_threshold = enter_threshold
+        self.clear_threshold = clear_threshold
+        self.time_constant = time_constant
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age if max_age is not None else 3 * time_constant
+        self.frame_interval = frame_interval
+        self.max_tracks = max_tracks
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, frame_interval=0.5):
+        return cls(
+            enter_threshold=getattr(settings, 'FIRE_TRACKER_ENTER_THRESHOLD', 0.35),
+            clear_threshold=getattr(settings, 'FIRE_TRACKER_CLEAR_THRESHOLD', 0.1),
+            time_constant=getattr(settings, 'FIRE_TRACKER_TIME_CONSTANT', 4.0),
+            iou_threshold=getattr(settings, 'FIRE_TRACKER_IOU_THRESHOLD', 0.3),
+            frame_interval=frame_interval,
+            max_tracks=getattr(settings, 'FIRE_TRACKER_MAX_TRACKS', 64),
+        )
+
+    def reset(self):
+        """Forget every track and leave both states (e.g. after a camera move)"""
+        self.tracks = []
+        self.active = {label: False for label in LABELS}
+        self._last_update = None
+
+    def score(self, label):
+        return max((track.score for track in self.tracks if track.label == label), default=0.0)
+
+    def _alpha(self, now):
+        dt = self.frame_interval if self._last_update is None else max(now - self._last_update, 0.0)
+        self._last_update = now
+        return 1.0 - math.exp(-dt / self.time_constant) if self.time_constant > 0 else 1.0
+
+    def _match(self, detections):
+        """(track, detection) pairs by decreasing IoU, and the unmatched detections"""
+        pairs = sorted(
+            (
+                (box_iou(track.bbox, detection['bbox']), t, d)
+                for t, track in enumerate(self.tracks)
+                for d, detection in enumerate(detections)
+                if track.label == detection['label']
+            ),
+            reverse=True,
+        )
+        used_tracks, used_detections, matches = set(), set(), []
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in used_tracks or d in used_detections:
+                continue
+            used_tracks.add(t)
+            used_detections.add(d)
+            matches.append((self.tracks[t], detections[d]))
+        unmatched = [detection for d, detection in enumerate(detections) if d not in used_detections]
+        return matches, unmatched
+
+    def update(self, detections, now):
+        """
+        Feed the detections of the frame captured at `now` (monotonic seconds).
+        Returns the transitions it caused: [{'label', 'state': 'start' | 'clear', 'score'}].
+        """
+        alpha = self._alpha(now)
+        detections = [
+            {'label': label, 'bbox': d['bbox'], 'confidence': d['confidence']}
+            for d in detections
+            for label in (detection_label(d['class']),)
+            if label is not None
+        ]
+        if len(detections) > self.max_tracks:
+            detections = sorted(detections, key=lambda d: d['confidence'], reverse=True)[:self.max_tracks]
+        matches, unmatched = self._match(detections)
+        matched = set()
+        for track, detection in matches:
+            track.score += alpha * (float(detection['confidence']) - track.score)
+            track.bbox = list(detection['bbox'])
+            track.seen_at = now
+            track.hits += 1
+            matched.add(id(track))
+        for track in self.tracks:
+            if id(track) not in matched:
+                track.score *= 1.0 - alpha
+        self.tracks = [track for track in self.tracks if now - track.seen_at <= self.max_age]
+        self.tracks.extend(
+            Track(detection['label'], detection['bbox'], alpha * float(detection['confidence']), now)
+            for detection in unmatched
+        )
+        if len(self.tracks) > self.max_tracks:
+            # Drop the weakest tracks (the oldest among equals)
+            self.tracks.sort(key=lambda track: (track.score, track.seen_at), reverse=True)
+            del self.tracks[self.max_tracks:]
+
+        transitions = []
+        for label in LABELS:
+            score = self.score(label)
+            if not self.active[label] and score >= self.enter_threshold:
+                self.active[label] = True
+                transitions.append({'label': label, 'state': 'start', 'score': score})
+            elif self.active[label] and score < self.clear_threshold:
+                self.active[label] = False
+                transitions.append({'label': label, 'state': 'clear', 'score': score})
+        return transitions
+
+    def verdict(self):
+        """Smoothed verdict of the camera, in the shape of a detection result"""
+        active = [label for label in LABELS if self.active[label]]
+        return {
+            'fire_detected': self.active['fire'],
+            'smoke_detected': self.active['smoke'],
+            'confidence': max((self.score(label) for label in active), default=0.0),
+            'detections': [track.as_detection() for track in self.tracks if track.label in active],
+        }
+
+    def snapshot(self):
+        return {
+            'fire_active': self.active['fire'],
+            'smoke_active': self.active['smoke'],
+            'fire_score': round(self.score('fire'), 3),
+            'smoke_score': round(self.score('smoke'), 3),
+            'tracks': len(self.tracks),
+        }
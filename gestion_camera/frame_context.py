@@ -0,0 +1,108 @@
+"""
+Decoded frame shared by every detection stage of one request
+The image is decoded once; RGB/BGR/HSV arrays and downscaled analysis copies are
+derived lazily and cached, so stages never decode or convert the same frame twice
+"""
+
+import io
+from functools import cached_property
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def downscale_for_analysis(img_array, max_side=None):
+    """
+    Downscale an image so its longest side is at most `max_side` (area interpolation).
+    Returns (image, scale); scale is 1.0 when no resizing was needed.
+    """
+    h, w = img_array.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return img_array, 1.0
+    scale = max_side / max(h, w)
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(img_array, size, interpolation=cv2.INTER_AREA), scale
+
+
+class FrameContext:
+    """
+    One frame and its cached representations.
+
+    Built from encoded bytes, a file path or a PIL image (`FrameContext(image_data)`),
+    or from a decoded BGR array (`FrameContext.from_bgr(frame)`, e.g. video frames).
+    Arrays handed out are shared: stages must copy before drawing on them.
+    """
+
+    COLORSPACES = ('bgr', 'rgb', 'hsv')
+
+    def __init__(self, image_data):
+        self.image_data = image_data
+        self._analysis = {}  # (colorspace, max_side) -> (array, scale)
+
+    @classmethod
+    def wrap(cls, image_data):
+        """Return `image_data` if it already is a FrameContext, else a new one"""
+        return image_data if isinstance(image_data, cls) else cls(image_data)
+
+    @classmethod
+    def from_bgr(cls, frame):
+        context = cls(None)
+        context.__dict__['bgr'] = frame
+        return context
+
+    @cached_property
+    def pil(self):
+        """Decoded PIL image"""
+        if self.image_data is None:
+            return Image.fromarray(self.rgb)
+        if isinstance(self.image_data, bytes):
+            return Image.open(io.BytesIO(self.image_data))
+        if isinstance(self.image_data, str):
+            return Image.open(self.image_data)
+        return self.image_data
+
+    @cached_property
+    def rgb(self):
+        if 'bgr' in self.__dict__:
+            return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+        image = self.pil
+        if image.mode != 'RGB':
+            # Grayscale, RGBA, palette... (alpha is dropped)
+            image = image.convert('RGB')
+        return np.asarray(image)
+
+    @cached_property
+    def bgr(self):
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR)
+
+    @cached_property
+    def hsv(self):
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+
+    @property
+    def shape(self):
+        """(height, width) of the full-resolution frame"""
+        if 'bgr' in self.__dict__ or 'rgb' in self.__dict__:
+            return (self.bgr if 'bgr' in self.__dict__ else self.rgb).shape[:2]
+        return self.pil.height, self.pil.width
+
+    def analysis(self, colorspace='bgr', max_side=None):
+        """
+        Frame in `colorspace` downscaled to at most `max_side` pixels on its longest side.
+        Returns (array, scale) with scale = analysis size / original size.
+        """
+        if colorspace not in self.COLORSPACES:
+            raise ValueError(f"Unknown colorspace '{colorspace}'")
+        key = (colorspace, max_side)
+        if key not in self._analysis:
+            if colorspace == 'bgr':
+                self._analysis[key] = downscale_for_analysis(self.bgr, max_side)
+            else:
+                bgr, scale = self.analysis('bgr', max_side)
+                if scale == 1.0:
+                    self._analysis[key] = (getattr(self, colorspace), 1.0)
+                else:
+                    code = cv2.COLOR_BGR2RGB if colorspace == 'rgb' else cv2.COLOR_BGR2HSV
+                    self._analysis[key] = (cv2.cvtColor(bgr, code), scale)
+        return self._analysis[key]
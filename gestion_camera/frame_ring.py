@@ -0,0 +1,222 @@
+"""
+Shared-memory frame ring buffer between camera grabbers and detection processes
+Fixed-size frame slots in one `multiprocessing.shared_memory` block: the grabber
+writes decoded frames in place, detectors read them as NumPy views without any
+copy or pickling. When readers fall behind, the oldest frames are overwritten.
+"""
+
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+
+_untracked_lock = threading.Lock()
+
+
+class SharedFrameRing:
+    """
+    Single-writer, multi-reader ring of `slots` frames of one fixed shape.
+
+    Every slot carries a sequence number used as a seqlock: it is odd while the
+    writer fills the slot and equals 2 * (frame_number + 1) once frame `frame_number`
+    is complete. A reader checks it before using a view and again afterwards
+    (`FrameView.valid()`): if the slot was rewritten meanwhile the read was torn and
+    must be discarded. The writer never waits for readers.
+
+    Layout: header (int64 x 8) | slot sequence numbers (int64 x slots)
+            | capture timestamps (float64 x slots) | frames (uint8, 64-byte aligned)
+    """
+
+    MAGIC = 0x52494E47  # "RING"
+    HEADER_FIELDS = 8
+    H_MAGIC, H_SLOTS, H_HEIGHT, H_WIDTH, H_CHANNELS, H_COMMITTED, H_CLOSED = range(7)
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+        buf = shm.buf
+        self._header = np.ndarray((self.HEADER_FIELDS,), np.int64, buf, 0)
+        if self._header[self.H_MAGIC] != self.MAGIC:
+            raise ValueError(f"Shared memory block '{shm.name}' is not a frame ring")
+        slots = int(self._header[self.H_SLOTS])
+        self.slots = slots
+        self.frame_shape = tuple(int(v) for v in self._header[self.H_HEIGHT:self.H_CHANNELS + 1])
+        seq_offset, stamp_offset, data_offset, _ = self._layout(slots, self.frame_shape)
+        self._seqs = np.ndarray((slots,), np.int64, buf, seq_offset)
+        self._stamps = np.ndarray((slots,), np.float64, buf, stamp_offset)
+        self._frames = np.ndarray((slots, *self.frame_shape), np.uint8, buf, data_offset)
+
+    @classmethod
+    def _layout(cls, slots, frame_shape):
+        seq_offset = cls.HEADER_FIELDS * 8
+        stamp_offset = seq_offset + slots * 8
+        data_offset = -(-(stamp_offset + slots * 8) // 64) * 64
+        size = data_offset + slots * int(np.prod(frame_shape))
+        return seq_offset, stamp_offset, data_offset, size
+
+    @classmethod
+    def create(cls, frame_shape, slots=4, name=None):
+        """Allocate a ring for frames of `frame_shape` (height, width[, channels])"""
+        if len(frame_shape) == 2:
+            frame_shape = (*frame_shape, 1)
+        if slots < 2:
+            raise ValueError("A frame ring needs at least 2 slots")
+        size = cls._layout(slots, frame_shape)[3]
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((cls.HEADER_FIELDS,), np.int64, shm.buf, 0)
+        header[:] = 0
+        header[cls.H_SLOTS] = slots
+        header[cls.H_HEIGHT:cls.H_CHANNELS + 1] = frame_shape
+        header[cls.H_MAGIC] = cls.MAGIC
+        ring = cls(shm, owner=True)
+        ring._seqs[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        """Open an existing ring by name (raises FileNotFoundError if it does not exist)"""
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Only the creator may unlink the block: readers must not register it with the
+            # resource tracker, which would remove it when they exit (bpo-39959)
+            with _untracked_lock:
+                register = resource_tracker.register
+                resource_tracker.register = lambda name, rtype: None
+                try:
+                    shm = shared_memory.SharedMemory(name=name)
+                finally:
+                    resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    # Writer
+
+    def write(self, frame, captured_at=None):
+        """Copy one frame into the next slot (overwriting the oldest); returns its frame number"""
+        with self.writing(captured_at) as slot:
+            np.copyto(slot, frame.reshape(self.frame_shape), casting='no')
+        return self.frames_written - 1
+
+    def writing(self, captured_at=None):
+        """
+        Context manager yielding the next slot as a writable view, e.g. to decode into it
+        directly (`capture.retrieve(slot)`). The frame is published when the block exits.
+        """
+        return _SlotWriter(self, captured_at)
+
+    def close_stream(self):
+        """Tell readers no more frames will be written"""
+        self._header[self.H_CLOSED] = 1
+
+    # Readers
+
+    @property
+    def frames_written(self):
+        return int(self._header[self.H_COMMITTED])
+
+    @property
+    def closed(self):
+        return bool(self._header[self.H_CLOSED])
+
+    def read(self, frame_number):
+        """
+        Zero-copy view of frame `frame_number`, or None if it is not written yet,
+        being written or already overwritten.
+        """
+        if frame_number < 0:
+            return None
+        slot = frame_number % self.slots
+        expected = 2 * (frame_number + 1)
+        if self._seqs[slot] != expected:
+            return None
+        captured_at = float(self._stamps[slot])
+        view = FrameView(self, frame_number, slot, self._frames[slot], captured_at)
+        # The timestamp must belong to the same write
+        return view if view.valid() else None
+
+    def read_latest(self):
+        """View of the most recent complete frame, or None if nothing was written"""
+        while True:
+            latest = self.frames_written - 1
+            if latest < 0:
+                return None
+            view = self.read(latest)
+            if view is not None:
+                return view
+            if self.frames_written - 1 == latest:
+                return None
+
+    def read_next(self, after):
+        """
+        View of the oldest frame still available after frame number `after`, or None.
+        Frames overwritten before they could be read are skipped.
+        """
+        while True:
+            written = self.frames_written
+            if written - 1 <= after:
+                return None
+            oldest = max(after + 1, written - self.slots + 1)
+            view = self.read(oldest)
+            if view is not None:
+                return view
+            # Overwritten while we looked: move on to what remains
+
+    def release(self):
+        """Detach from the block (and free it when called by the creator)"""
+        # Views into the block must be dropped before it can be closed
+        self._header = self._seqs = self._stamps = self._frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _SlotWriter:
+    def __init__(self, ring, captured_at):
+        self.ring = ring
+        self.captured_at = captured_at
+
+    def __enter__(self):
+        ring = self.ring
+        self.frame_number = ring.frames_written
+        self.slot = self.frame_number % ring.slots
+        # Odd: readers holding a view of the previous frame will see it as torn
+        ring._seqs[self.slot] = 2 * self.frame_number + 1
+        return ring._frames[self.slot]
+
+    def __exit__(self, exc_type, exc, tb):
+        ring = self.ring
+        if exc_type is not None:
+            # Leave the slot marked as being written: it is never published
+            return False
+        ring._stamps[self.slot] = time.monotonic() if self.captured_at is None else self.captured_at
+        ring._seqs[self.slot] = 2 * (self.frame_number + 1)
+        ring._header[ring.H_COMMITTED] = self.frame_number + 1
+        return False
+
+
+class FrameView:
+    """
+    Read-only view of one frame in a ring. The pixels may be overwritten at any time:
+    results computed from `array` are only trustworthy if `valid()` is still True afterwards.
+    """
+
+    def __init__(self, ring, frame_number, slot, array, captured_at):
+        self.ring = ring
+        self.frame_number = frame_number
+        self.slot = slot
+        self.array = array.view()
+        self.array.flags.writeable = False
+        self.captured_at = captured_at
+
+    def valid(self):
+        """True if the slot still holds this frame (the read was not torn)"""
+        return self.ring._seqs[self.slot] == 2 * (self.frame_number + 1)
+
+    def copy(self):
+        """Private copy of the pixels, or None if the frame was overwritten during the copy"""
+        array = self.array.copy()
+        return array if self.valid() else None
@@ -0,0 +1,186 @@
+"""
+Camera health probes
+Every camera's `ip_address` is probed concurrently with asyncio: a TCP connect to its
+stream port, or an HTTP HEAD request. At most `concurrency` probes are in flight and
+each attempt is bounded by `timeout`, so thousands of cameras are checked in a few
+seconds. Unreachable RECORDING cameras become OFFLINE and reachable OFFLINE cameras
+RECORDING again; MAINTENANCE is left to operators.
+"""
+
+import asyncio
+import math
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .streams import DEFAULT_STREAM_URL_TEMPLATE
+
+
+PROBE_METHODS = ('tcp', 'http')
+SCHEME_PORTS = {'rtsp': 554, 'rtsps': 322, 'http': 80, 'https': 443}
+
+
+class ProbeError(Exception):
+    """The camera answered, but not as expected"""
+
+
+def probe_settings():
+    return {
+        'method': getattr(settings, 'CAMERA_HEALTH_METHOD', 'tcp'),
+        'port': getattr(settings, 'CAMERA_HEALTH_PORT', None),
+        'timeout': getattr(settings, 'CAMERA_HEALTH_TIMEOUT', 2.0),
+        'concurrency': getattr(settings, 'CAMERA_HEALTH_CONCURRENCY', 256),
+        'retries': getattr(settings, 'CAMERA_HEALTH_RETRIES', 1),
+        'path': getattr(settings, 'CAMERA_HEALTH_HTTP_PATH', '/'),
+    }
+
+
+def stream_port():
+    """Port of the camera streams (CAMERA_STREAM_URL_TEMPLATE), 554 when it names none"""
+    template = getattr(settings, 'CAMERA_STREAM_URL_TEMPLATE', DEFAULT_STREAM_URL_TEMPLATE)
+    url = urlsplit(template.format(ip='camera', id=0))
+    return url.port or SCHEME_PORTS.get(url.scheme, 554)
+
+
+async def tcp_probe(host, port):
+    _, writer = await asyncio.open_connection(host, port)
+    # Reset rather than close: no TIME_WAIT socket left per probed camera
+    writer.transport.abort()
+    return None
+
+
+async def http_probe(host, port, path='/'):
+    """HTTP status code of a HEAD request (any status: the camera's web server is up)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        authority = f"[{host}]" if ':' in host else host
+        writer.write(f"HEAD {path} HTTP/1.0\r\nHost: {authority}:{port}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await reader.readline()
+    finally:
+        writer.transport.abort()
+    parts = status_line.split()
+    if len(parts) < 2 or not parts[0].startswith(b'HTTP/') or not parts[1].isdigit():
+        raise ProbeError(f"Not an HTTP response: {status_line[:40]!r}")
+    return int(parts[1])
+
+
+def probe_error(exc):
+    if isinstance(exc, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(exc, ConnectionRefusedError):
+        return 'refused'
+    return str(exc) or type(exc).__name__
+
+
+async def probe_target(key, host, port, semaphore, method='tcp', timeout=2.0, retries=1, path='/'):
+    """
+    Probe one host, retrying `retries` times before declaring it down. Returns
+    {'key', 'host', 'port', 'ok', 'latency_ms', 'attempts', 'error', 'http_status'};
+    latency is the one of the last attempt.
+    """
+    result = {'key': key, 'host': host, 'port': port, 'ok': False, 'latency_ms': None,
+              'attempts': 0, 'error': None, 'http_status': None}
+    async with semaphore:
+        for _ in range(retries + 1):
+            result['attempts'] += 1
+            start = time.perf_counter()
+            try:
+                probe = http_probe(host, port, path) if method == 'http' else tcp_probe(host, port)
+                result['http_status'] = await asyncio.wait_for(probe, timeout)
+                result.update(ok=True, error=None)
+            except (OSError, asyncio.TimeoutError, ProbeError) as e:
+                result['error'] = probe_error(e)
+            result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            if result['ok']:
+                break
+    return result
+
+
+async def probe_targets(targets, method='tcp', timeout=2.0, concurrency=256, retries=1, path='/'):
+    """Probe (key, host, port) targets, at most `concurrency` at once; results in target order"""
+    if method not in PROBE_METHODS:
+        raise ValueError(f"Unknown probe method '{method}'")
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    return await asyncio.gather(*(
+        probe_target(key, host, port, semaphore, method, timeout, retries, path)
+        for key, host, port in targets
+    ))
+
+
+def run_probes(targets, **options):
+    """probe_targets() from synchronous code (management command, background loop)"""
+    return asyncio.run(probe_targets(targets, **options))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def probe_summary(results, elapsed=None):
+    """Up/down counts, error breakdown and latency distribution of the successful probes"""
+    latencies = sorted(result['latency_ms'] for result in results if result['ok'])
+    summary = {
+        'probed': len(results),
+        'up': len(latencies),
+        'down': len(results) - len(latencies),
+        'errors': dict(Counter(result['error'] for result in results if not result['ok'])),
+        'retried': sum(1 for result in results if result['attempts'] > 1),
+        'p50_ms': percentile(latencies, 0.50),
+        'p90_ms': percentile(latencies, 0.90),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else None,
+    }
+    if elapsed is not None:
+        summary['elapsed_s'] = round(elapsed, 3)
+        summary['probes_per_s'] = round(len(results) / elapsed, 1) if elapsed > 0 else None
+    return summary
+
+
+def camera_targets(cameras, port=None):
+    """(id_camera, ip, port) of each camera; `port` defaults to the stream port"""
+    port = port or stream_port()
+    return [(camera.id_camera, str(camera.ip_address), port) for camera in cameras]
+
+
+def status_changes(cameras, results):
+    """{camera id: new status} implied by the probe results (MAINTENANCE is never changed)"""
+    from .models import Camera
+
+    reachable = {result['key']: result['ok'] for result in results}
+    changes = {}
+    for camera in cameras:
+        ok = reachable.get(camera.id_camera)
+        if ok is True and camera.status == Camera.Status.OFFLINE:
+            changes[camera.id_camera] = Camera.Status.RECORDING
+        elif ok is False and camera.status == Camera.Status.RECORDING:
+            changes[camera.id_camera] = Camera.Status.OFFLINE
+    return changes
+
+
+def apply_status_changes(changes):
+    """
+    Write the status changes in one transaction: one UPDATE per direction, each only
+    applied where the status is still the one probed (a camera put in MAINTENANCE
+    meanwhile keeps it). Bumps date_modification. Returns the number of rows updated.
+    """
+    from .models import Camera
+
+    Status = Camera.Status
+    now = timezone.now()
+    updated = 0
+    with transaction.atomic():
+        for previous, new in ((Status.OFFLINE, Status.RECORDING), (Status.RECORDING, Status.OFFLINE)):
+            ids = [pk for pk, status in changes.items() if status == new]
+            if ids:
+                updated += Camera.objects.filter(pk__in=ids, status=previous).update(
+                    status=new, date_modification=now
+                )
+    return updated
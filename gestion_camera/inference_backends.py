@@ -0,0 +1,238 @@
+"""
+Inference backends for the fire/smoke detection model
+All backends take RGB images and return detections in the same format:
+    {'class': str, 'confidence': float, 'bbox': [x1, y1, x2, y2]}  (original image pixels)
+
+- ultralytics: the original YOLO .pt model through PyTorch
+- onnxruntime: an exported .onnx model through ONNX Runtime (CPU)
+- opencv: an exported .onnx model through cv2.dnn (no extra dependency)
+
+The exported-model backends share the YOLOv8 pre- and post-processing below
+(letterbox, box decoding, NMS, class mapping).
+"""
+
+import ast
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from CyberCobra.compute_resources import compute_threads
+
+
+DEFAULT_BACKEND = 'ultralytics'
+DEFAULT_MODEL_PATHS = {
+    'ultralytics': 'yolov8n.pt',
+    'onnxruntime': 'yolov8n.onnx',
+    'opencv': 'yolov8n.onnx',
+}
+DEFAULT_INPUT_SIZE = 640
+DEFAULT_IOU_THRESHOLD = 0.45
+
+
+# --- Shared pre/post-processing ---
+
+def letterbox(image, new_size=DEFAULT_INPUT_SIZE, color=(114, 114, 114)):
+    """
+    Resize keeping the aspect ratio and pad to a square `new_size` image.
+    Returns (padded_image, ratio, (pad_x, pad_y)) to map boxes back.
+    """
+    h, w = image.shape[:2]
+    ratio = min(new_size / h, new_size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (new_size - new_w) / 2, (new_size - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, ratio, (left, top)
+
+
+def to_blob(images, size=DEFAULT_INPUT_SIZE):
+    """Letterbox RGB images into one NCHW float32 batch scaled to [0, 1]"""
+    letterboxed = [letterbox(img, size) for img in images]
+    blob = np.stack([lb[0] for lb in letterboxed]).transpose(0, 3, 1, 2)
+    blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+    return blob, [(lb[1], lb[2]) for lb in letterboxed]
+
+
+def nms(boxes, scores, iou_threshold=DEFAULT_IOU_THRESHOLD):
+    """Non-maximum suppression over [x1, y1, x2, y2] boxes; returns kept indices"""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=int)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    xywh = np.column_stack([boxes[:, 0], boxes[:, 1], boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]])
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), np.asarray(scores, dtype=np.float32).tolist(), 0.0, iou_threshold)
+    return np.asarray(keep, dtype=int).reshape(-1)
+
+
+def postprocess_yolov8(output, ratio, pad, class_names, conf_threshold, iou_threshold=DEFAULT_IOU_THRESHOLD):
+    """
+    Decode one YOLOv8 output tensor of shape (4 + num_classes, num_anchors):
+    cx, cy, w, h followed by per-class scores.
+    """
+    predictions = np.asarray(output, dtype=np.float32).T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    confidences = class_scores[np.arange(len(class_ids)), class_ids]
+    selected = confidences >= conf_threshold
+    if not selected.any():
+        return []
+    predictions, class_ids, confidences = predictions[selected], class_ids[selected], confidences[selected]
+
+    cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+    boxes = np.column_stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+    # Undo the letterbox
+    boxes -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+    boxes /= ratio
+
+    # Per-class NMS: offset boxes by class so different classes never overlap
+    offsets = class_ids[:, None].astype(np.float32) * 4096.0
+    keep = nms(boxes + offsets, confidences, iou_threshold)
+    return [
+        {
+            'class': class_name(class_names, int(class_ids[i])),
+            'confidence': float(confidences[i]),
+            'bbox': [float(v) for v in boxes[i]],
+        }
+        for i in keep
+    ]
+
+
+def class_name(class_names, class_id):
+    """Map a class id to its lower-case name"""
+    if isinstance(class_names, dict):
+        name = class_names.get(class_id)
+    else:
+        name = class_names[class_id] if class_id < len(class_names) else None
+    return str(name if name is not None else class_id).lower()
+
+
+def configured_class_names():
+    """Class names for models without embedded metadata (FIRE_DETECTION_CLASS_NAMES)"""
+    return getattr(settings, 'FIRE_DETECTION_CLASS_NAMES', ['fire', 'smoke'])
+
+
+# --- Backends ---
+
+class InferenceBackend:
+    """Base class: load a model once, then run `predict` on batches of RGB images"""
+
+    name = None
+
+    def __init__(self, model_path, threads=None):
+        self.model_path = model_path
+        self.threads = threads
+
+    def predict(self, images, conf_threshold=0.25):
+        """Return one list of detections per input image"""
+        raise NotImplementedError
+
+
+class UltralyticsBackend(InferenceBackend):
+    name = 'ultralytics'
+
+    def __init__(self, model_path, threads=None):
+        super().__init__(model_path, threads)
+        from ultralytics import YOLO
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = YOLO(model_path)
+
+    def predict(self, images, conf_threshold=0.25):
+        # Ultralytics expects BGR NumPy arrays
+        bgr_images = [cv2.cvtColor(img, cv2.COLOR_RGB2BGR) for img in images]
+        results = self.model(bgr_images, conf=conf_threshold, verbose=False)
+        batch = []
+        for result in results:
+            detections = []
+            for box in result.boxes:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                detections.append({
+                    'class': class_name(result.names, int(box.cls[0].cpu().numpy())),
+                    'confidence': float(box.conf[0].cpu().numpy()),
+                    'bbox': [float(x1), float(y1), float(x2), float(y2)],
+                })
+            batch.append(detections)
+        return batch
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = 'onnxruntime'
+
+    def __init__(self, model_path, threads=None):
+        super().__init__(model_path, threads)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, size = model_input.shape[0], model_input.shape[2]
+        self.input_size = size if isinstance(size, int) else DEFAULT_INPUT_SIZE
+        # Models exported with a fixed batch of 1 are run image by image
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+
+        # Ultralytics stores the class names in the ONNX metadata
+        names = self.session.get_modelmeta().custom_metadata_map.get('names')
+        self.class_names = ast.literal_eval(names) if names else configured_class_names()
+
+    def predict(self, images, conf_threshold=0.25):
+        if self.fixed_batch == 1 and len(images) > 1:
+            return [self.predict([img], conf_threshold)[0] for img in images]
+        blob, transforms = to_blob(images, self.input_size)
+        outputs = self.session.run(None, {self.input_name: blob})[0]
+        return [
+            postprocess_yolov8(output, ratio, pad, self.class_names, conf_threshold)
+            for output, (ratio, pad) in zip(outputs, transforms)
+        ]
+
+
+class OpenCVDnnBackend(InferenceBackend):
+    name = 'opencv'
+
+    def __init__(self, model_path, threads=None, input_size=DEFAULT_INPUT_SIZE):
+        super().__init__(model_path, threads)
+        if threads:
+            cv2.setNumThreads(threads)
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.input_size = input_size
+        self.class_names = configured_class_names()
+
+    def predict(self, images, conf_threshold=0.25):
+        # cv2.dnn keeps the batch size the model was exported with (usually 1)
+        batch = []
+        for img in images:
+            blob, [(ratio, pad)] = to_blob([img], self.input_size)
+            self.net.setInput(blob)
+            output = self.net.forward()[0]
+            batch.append(postprocess_yolov8(output, ratio, pad, self.class_names, conf_threshold))
+        return batch
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenCVDnnBackend.name: OpenCVDnnBackend,
+}
+
+
+def create_backend(name=None, model_path=None, threads=None):
+    """
+    Build the configured backend (FIRE_DETECTION_BACKEND, FIRE_DETECTION_MODEL_PATH,
+    FIRE_DETECTION_THREADS, default the process share of the cores). Raises ImportError if its runtime is not installed.
+    """
+    name = name or getattr(settings, 'FIRE_DETECTION_BACKEND', DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}' (expected one of {', '.join(BACKENDS)})")
+    model_path = model_path or getattr(settings, 'FIRE_DETECTION_MODEL_PATH', None) or DEFAULT_MODEL_PATHS[name]
+    if threads is None:
+        threads = getattr(settings, 'FIRE_DETECTION_THREADS', None) or compute_threads()
+    return BACKENDS[name](model_path, threads=threads)
@@ -0,0 +1,99 @@
+"""
+Dynamic micro-batching of concurrent inference requests
+Requests submitted from several threads are queued and run through the backend
+as one batch, bounded by a maximum batch size and a maximum wait
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchingInferenceScheduler:
+    """
+    Groups concurrent `predict` calls into backend batches.
+
+    The first queued request opens a batch; the worker then waits at most
+    `max_wait_ms` for more requests (or until `max_batch_size` is reached)
+    and runs them in a single backend call. Each caller gets its own result.
+    """
+
+    def __init__(self, backend, max_batch_size=8, max_wait_ms=10.0):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._closed = False
+        self.stats = {'batches': 0, 'requests': 0}
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._worker.start()
+
+    def submit(self, image, conf_threshold=0.25):
+        """Queue one RGB image; returns a Future resolving to its list of detections"""
+        if self._closed:
+            raise RuntimeError("Inference scheduler is closed")
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((image, conf_threshold, future))
+        return future
+
+    def predict(self, image, conf_threshold=0.25, timeout=None):
+        """Blocking helper: submit and wait for the detections"""
+        return self.submit(image, conf_threshold).result(timeout=timeout)
+
+    def close(self):
+        """Stop the worker once the queued requests are processed"""
+        self._closed = True
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back for the main loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            # Skip requests whose caller already gave up
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            # One backend call at the lowest threshold, then filter per caller
+            min_conf = min(item[1] for item in batch)
+            try:
+                results = self.backend.predict([item[0] for item in batch], conf_threshold=min_conf)
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.stats['batches'] += 1
+            self.stats['requests'] += len(batch)
+            for (_, conf_threshold, future), detections in zip(batch, results):
+                future.set_result([d for d in detections if d['confidence'] >= conf_threshold])
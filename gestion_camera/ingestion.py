@@ -0,0 +1,566 @@
+"""
+Frame ingestion from surveillance cameras
+One grabber thread per camera pulls frames from its RTSP/HTTP feed (or a local video
+file), samples them at a fixed rate and hands the latest one to a detection thread
+running the fire detection pipeline. Feeds are reopened with exponential backoff.
+Detection can also run in a separate process per camera, fed through a shared-memory
+frame ring, or on a pool of workers shared by all cameras through a DetectionScheduler.
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+from django.conf import settings
+from django.db import connection
+
+from zones_app.models import Zone, ZoneAlert
+from .detection_events import close_event_writer, record_detection
+from .detection_scheduler import SchedulerHandoff
+from .fire_detection_service import get_fire_detector
+from .fire_tracker import FireTracker
+from .frame_context import FrameContext
+from .frame_ring import SharedFrameRing
+from .motion_gate import MotionGatedDetector
+from .streams import camera_stream_url, is_file_source, open_video_source
+
+
+class LatestFrameSlot:
+    """
+    Single-frame handoff between a grabber and its detector.
+    A frame that was not consumed before the next one arrives is dropped, so the
+    detector always works on the most recent frame and never accumulates lag.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self.dropped = 0
+        self.closed = False
+
+    def wants_frame(self, now):
+        return True
+
+    def put(self, frame, captured_at):
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = (frame, captured_at, None)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Return (frame, captured_at, is_valid), or None if nothing arrived within `timeout`
+        seconds. `is_valid` is None: frames handed over here are never overwritten.
+        """
+        with self._condition:
+            if self._item is None:
+                self._condition.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        """Called by the grabber when no more frames will come"""
+        self.closed = True
+
+
+class RingFrameHandoff:
+    """
+    Latest-frame handoff through a SharedFrameRing, usable across processes.
+    The grabber side creates the ring from the shape of its first frame; the detector
+    side attaches to it by name and reads zero-copy views of the most recent frame.
+    """
+
+    POLL_INTERVAL = 0.005
+
+    def __init__(self, name, slots=4, ring=None):
+        self.name = name
+        self.slots = slots
+        self.ring = ring
+        self.dropped = 0
+        self._last_read = -1
+
+    @classmethod
+    def attach(cls, name, stop_event, poll=0.1):
+        """Reader side: wait for the grabber to create the ring; None if stopped first"""
+        while not stop_event.is_set():
+            try:
+                return cls(name, ring=SharedFrameRing.attach(name))
+            except (FileNotFoundError, ValueError):
+                # Not created (or not initialized) yet
+                stop_event.wait(poll)
+        return None
+
+    def wants_frame(self, now):
+        return True
+
+    def put(self, frame, captured_at):
+        if self.ring is None:
+            self.ring = SharedFrameRing.create(frame.shape, self.slots, name=self.name)
+        height, width = self.ring.frame_shape[:2]
+        if frame.shape[:2] != (height, width):
+            # The feed changed resolution after a reconnect
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        self.ring.write(frame, captured_at)
+
+    def get(self, timeout=None):
+        """Return (view, captured_at, is_valid) for a frame newer than the last one read, or None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            view = self.ring.read_latest()
+            if view is not None and view.frame_number > self._last_read:
+                self.dropped += view.frame_number - self._last_read - 1
+                self._last_read = view.frame_number
+                return view.array, view.captured_at, view.valid
+            if self.ring.closed or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close_stream()
+
+    @property
+    def closed(self):
+        return self.ring is not None and self.ring.closed
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.release()
+            self.ring = None
+
+
+class RateMeter:
+    """Events per second over a sliding window"""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self._events = deque()
+
+    def tick(self, now):
+        self._events.append(now)
+        cutoff = now - self.window
+        while self._events and self._events[0] < cutoff:
+            self._events.popleft()
+
+    def rate(self, now):
+        events = [t for t in self._events if t >= now - self.window]
+        if len(events) < 2:
+            return 0.0
+        return (len(events) - 1) / max(now - events[0], 1e-6)
+
+
+class CameraIngestionWorker:
+    """
+    Ingests one camera: a grabber thread and a detection thread sharing a LatestFrameSlot.
+
+    - the grabber reads every frame (grab() only demuxes) so the feed never buffers up,
+      and decodes `sample_fps` frames per second, or the frames a DetectionScheduler
+      asks for when the handoff is a SchedulerHandoff
+    - local files are replayed at their native frame rate, as a stand-in for a live feed
+    - on a read error the source is reopened after 1, 2, 4... seconds (up to `max_backoff`)
+    - the detector runs fire detection on the latest sampled frame; a FireTracker smooths
+      the verdicts (FIRE_TRACKER_ENABLED) so that a DetectionEvent and a ZoneAlert for the
+      camera's zone are only emitted when fire or smoke starts, not for every positive
+      frame; alerts are raised at most once per `alert_cooldown` seconds
+    - with `motion_gate` ('average' or 'mog2'), frames matching the background reuse the
+      last full analysis and only the changed region of the others is analyzed
+    """
+
+    # Counters updated by the detection side (reported back by detector processes)
+    DETECTION_STATS = ('frames_processed', 'motion_skipped', 'torn_frames', 'detections', 'alerts', 'transitions',
+                       'fire_state', 'lag_ms', 'max_lag_ms')
+
+    def __init__(self, camera, source=None, sample_fps=2.0, confidence_threshold=0.3,
+                 alert_cooldown=60.0, initial_backoff=1.0, max_backoff=30.0, loop=False,
+                 on_detection=None, handoff=None, motion_gate=None):
+        self.camera = camera
+        self.zones = camera.detection_zones
+        self.source = source if source is not None else camera_stream_url(camera)
+        self.sample_fps = sample_fps
+        self.confidence_threshold = confidence_threshold
+        self.alert_cooldown = alert_cooldown
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.loop = loop
+        self.on_detection = on_detection
+        self.motion_gate = MotionGatedDetector(motion_gate) if motion_gate else None
+        self.tracker = None
+        if getattr(settings, 'FIRE_TRACKER_ENABLED', True):
+            self.tracker = FireTracker.from_settings(frame_interval=1.0 / sample_fps)
+
+        self.handoff = handoff if handoff is not None else LatestFrameSlot()
+        self.zone = Zone.objects.filter(name__iexact=camera.zone).first()
+        self._last_alert = None
+        self._threads = []
+        self._detector_process = None
+        self.remote_stats = {}  # counters reported by the detector process
+        self._grab_meter = RateMeter()
+        self._processed_meter = RateMeter()
+        self.stats = {
+            'connected': False,
+            'frames_grabbed': 0,
+            'frames_sampled': 0,
+            'frames_processed': 0,
+            'motion_skipped': 0,
+            'frames_dropped': 0,
+            'reconnects': 0,
+            'torn_frames': 0,
+            'detections': 0,
+            'alerts': 0,
+            'transitions': 0,
+            'fire_state': None,
+            'lag_ms': None,
+            'max_lag_ms': None,
+            'last_error': None,
+        }
+
+    # Grabber
+
+    def _open(self, stop_event):
+        """Open the source, retrying with exponential backoff; None if stopped meanwhile"""
+        backoff = self.initial_backoff
+        while not stop_event.is_set():
+            try:
+                capture = open_video_source(self.source)
+                self.stats['connected'] = True
+                self.stats['last_error'] = None
+                return capture
+            except IOError as exc:
+                self.stats['last_error'] = str(exc)
+                print(f"⚠️ {self.camera.name}: {exc}, retrying in {backoff:.0f}s")
+                stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        return None
+
+    def grab_loop(self, stop_event, max_frames=None):
+        """Read the source until `stop_event` is set, `max_frames` frames were sampled or a file ends"""
+        replay = is_file_source(self.source)
+        interval = 1.0 / self.sample_fps
+        # A scheduler paces the camera itself (down to its boost interval after a detection)
+        paced = not isinstance(self.handoff, SchedulerHandoff)
+        try:
+            while not stop_event.is_set():
+                capture = self._open(stop_event)
+                if capture is None:
+                    return
+                source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+                started = time.monotonic()
+                frame_index = 0
+                next_sample = started
+                try:
+                    while not stop_event.is_set():
+                        if replay:
+                            # Pace the file like a live feed
+                            delay = started + frame_index / source_fps - time.monotonic()
+                            if delay > 0:
+                                time.sleep(delay)
+                        if not capture.grab():
+                            break
+                        frame_index += 1
+                        now = time.monotonic()
+                        self.stats['frames_grabbed'] += 1
+                        self._grab_meter.tick(now)
+                        if (paced and now < next_sample) or not self.handoff.wants_frame(now):
+                            continue
+                        next_sample = max(next_sample + interval, now)
+                        ok, frame = capture.retrieve()
+                        if not ok or frame is None:
+                            continue
+                        self.stats['frames_sampled'] += 1
+                        self.handoff.put(frame, now)
+                        if max_frames is not None and self.stats['frames_sampled'] >= max_frames:
+                            return
+                finally:
+                    capture.release()
+                    self.stats['connected'] = False
+
+                if replay and not self.loop:
+                    return
+                if not stop_event.is_set():
+                    # Live feed interrupted (or file looping): reconnect
+                    self.stats['reconnects'] += 1
+                    if not replay:
+                        self.stats['last_error'] = "Stream interrupted"
+                        stop_event.wait(self.initial_backoff)
+        finally:
+            self.handoff.close()
+
+    # Detector
+
+    def process_frame(self, frame, captured_at, is_valid=None):
+        """
+        Run fire detection on one sampled BGR frame.
+        `is_valid` (shared-memory views) is checked once detection is done: if the frame
+        was overwritten meanwhile the result is discarded and None is returned.
+        Frames the motion gate skips return the background result without raising a new alert.
+        """
+        options = {
+            'confidence_threshold': self.confidence_threshold,
+            'analysis_max_side': self.camera.analysis_max_side or getattr(settings, 'FIRE_DETECTION_ANALYSIS_MAX_SIDE', None),
+            'annotate': False,
+            'tiled': self.camera.tiled_detection,
+            'zones': self.zones,
+        }
+        skipped = False
+        if self.motion_gate is not None:
+            result, mode = self.motion_gate.detect(FrameContext.from_bgr(frame), **options)
+            skipped = mode == 'skipped'
+        else:
+            result = get_fire_detector().detect_fire_in_image(FrameContext.from_bgr(frame), **options)
+        if is_valid is not None and not is_valid():
+            self.stats['torn_frames'] += 1
+            return None
+        now = time.monotonic()
+        lag_ms = (now - captured_at) * 1000
+        self.stats['frames_processed'] += 1
+        self.stats['lag_ms'] = round(lag_ms, 1)
+        self.stats['max_lag_ms'] = round(max(lag_ms, self.stats['max_lag_ms'] or 0.0), 1)
+        self._processed_meter.tick(now)
+        if skipped:
+            self.stats['motion_skipped'] += 1
+        elif result['fire_detected'] or result['smoke_detected']:
+            self.stats['detections'] += 1
+            if self.tracker is None:
+                self.report_detection(result)
+        if self.tracker is not None:
+            # Skipped frames too: the unchanged scene keeps its last result
+            self.track(result, captured_at)
+        return result
+
+    def track(self, result, captured_at):
+        """Feed the tracker; report the smoothed verdict when fire or smoke starts"""
+        transitions = self.tracker.update(result['detections'], captured_at)
+        self.stats['fire_state'] = self.tracker.snapshot()
+        if not transitions:
+            return
+        self.stats['transitions'] += len(transitions)
+        for transition in transitions:
+            icon, verb = ('🔥', 'started') if transition['state'] == 'start' else ('✅', 'cleared')
+            print(f"{icon} {self.camera.name}: {transition['label']} {verb} "
+                  f"(smoothed confidence {transition['score']:.0%})")
+        if any(transition['state'] == 'start' for transition in transitions):
+            self.report_detection(self.tracker.verdict())
+
+    def report_detection(self, result):
+        record_detection(result, camera=self.camera, source='ingestion')
+        if self.on_detection is not None:
+            self.on_detection(self.camera, result)
+        self.raise_alert(result)
+
+    def raise_alert(self, result):
+        """Create a ZoneAlert for the camera's zone, at most once per cooldown"""
+        if self.zone is None:
+            print(f"⚠️ No zone named '{self.camera.zone}' for camera {self.camera.name}, alert not raised")
+            return None
+        now = time.monotonic()
+        if self._last_alert is not None and now - self._last_alert < self.alert_cooldown:
+            return None
+        self._last_alert = now
+        self.stats['alerts'] += 1
+        detected = ' et '.join(
+            label for label, flag in (('feu', result['fire_detected']), ('fumée', result['smoke_detected'])) if flag
+        )
+        return ZoneAlert.objects.create(
+            zone=self.zone,
+            severity='critical' if result['fire_detected'] and result['smoke_detected'] else 'high',
+            message=(
+                f"Détection {detected} sur la caméra {self.camera.name} "
+                f"(confiance {result['confidence']:.0%})"
+            ),
+        )
+
+    def detect_loop(self, stop_event, report=None, report_interval=1.0):
+        """
+        Process the latest sampled frame until stopped and the grabber is done.
+        `report` (detector processes) is called with the detection counters every
+        `report_interval` seconds and on exit.
+        """
+        next_report = time.monotonic() + report_interval
+        try:
+            while not stop_event.is_set():
+                item = self.handoff.get(timeout=0.5)
+                if item is None:
+                    if self.handoff.closed:
+                        return
+                    continue
+                try:
+                    self.process_frame(*item)
+                except Exception as exc:
+                    self.stats['last_error'] = f"Detection failed: {exc}"
+                    print(f"❌ {self.camera.name}: detection failed: {exc}")
+                finally:
+                    item = None  # do not keep a view of the ring alive
+                if report is not None and time.monotonic() >= next_report:
+                    report(self.detection_stats())
+                    next_report += report_interval
+        finally:
+            if report is not None:
+                report(self.detection_stats())
+            connection.close()
+
+    # Lifecycle
+
+    def update_camera(self, camera):
+        """Pick up edited detection settings (analysis resolution, ROIs and exclusion zones)"""
+        self.camera = camera
+        self.zones = camera.detection_zones
+
+    def start_detector_process(self, stop_event, stats_queue, context):
+        """
+        Run detection in a child process reading frames from a shared-memory ring.
+        Must be called before any grabber thread is started (the child is forked).
+        """
+        name = f"cc_ring_{os.getpid()}_{self.camera.id_camera}"
+        self.handoff = RingFrameHandoff(name)
+        options = {
+            'source': self.source,
+            'confidence_threshold': self.confidence_threshold,
+            'alert_cooldown': self.alert_cooldown,
+            'motion_gate': self.motion_gate.method if self.motion_gate is not None else None,
+        }
+        self._detector_process = context.Process(
+            target=run_detector_process,
+            args=(self.camera.id_camera, name, options, stop_event, stats_queue),
+            name=f'detect-{self.camera.id_camera}',
+            daemon=True,
+        )
+        self._detector_process.start()
+
+    def start(self, stop_event, max_frames=None):
+        self._threads = [
+            threading.Thread(target=self.grab_loop, args=(stop_event, max_frames),
+                             name=f'grab-{self.camera.id_camera}', daemon=True),
+        ]
+        # Scheduled cameras are analyzed by the shared workers of scheduled_detect_loop
+        if self._detector_process is None and not isinstance(self.handoff, SchedulerHandoff):
+            self._threads.append(
+                threading.Thread(target=self.detect_loop, args=(stop_event,),
+                                 name=f'detect-{self.camera.id_camera}', daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def is_alive(self):
+        if self._detector_process is not None and self._detector_process.is_alive():
+            return True
+        return any(thread.is_alive() for thread in self._threads)
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+        if self._detector_process is not None:
+            self._detector_process.join(timeout)
+
+    def release(self):
+        """Free the shared-memory ring (once the detector process is gone)"""
+        if isinstance(self.handoff, RingFrameHandoff):
+            self.handoff.release()
+
+    def detection_stats(self):
+        """Counters owned by the detection side"""
+        now = time.monotonic()
+        return {
+            'camera': self.camera.id_camera,
+            'processed_fps': round(self._processed_meter.rate(now), 2),
+            'frames_dropped': self.handoff.dropped,
+            **{key: self.stats[key] for key in self.DETECTION_STATS},
+        }
+
+    def snapshot(self):
+        """Current counters and rates of the camera, JSON-serializable"""
+        now = time.monotonic()
+        snapshot = {
+            'camera': self.camera.id_camera,
+            'name': self.camera.name,
+            'source': self.source,
+            'grab_fps': round(self._grab_meter.rate(now), 2),
+            **self.stats,
+            **self.detection_stats(),
+        }
+        if self._detector_process is not None:
+            snapshot.update(self.remote_stats)
+            snapshot['detector_pid'] = self._detector_process.pid
+        if isinstance(self.handoff, SchedulerHandoff):
+            snapshot['schedule'] = self.handoff.scheduler.snapshot(self.camera.id_camera, now)
+        return snapshot
+
+
+def scheduled_detect_loop(scheduler, workers_by_camera, stop_event):
+    """Shared detection worker: analyze the frames chosen by the scheduler until every camera stopped"""
+    try:
+        while not stop_event.is_set():
+            job = scheduler.acquire(timeout=0.5)
+            if job is None:
+                if scheduler.all_closed:
+                    return
+                continue
+            worker = workers_by_camera[job.camera_id]
+            result = None
+            try:
+                result = worker.process_frame(job.frame, job.captured_at, job.is_valid)
+            except Exception as exc:
+                worker.stats['last_error'] = f"Detection failed: {exc}"
+                print(f"❌ {worker.camera.name}: detection failed: {exc}")
+            finally:
+                detected = bool(result and (result['fire_detected'] or result['smoke_detected']))
+                scheduler.complete(job, detected)
+    finally:
+        connection.close()
+
+
+def run_detector_process(camera_id, ring_name, options, stop_event, stats_queue):
+    """Entry point of a detector process: detect on the frames of one camera's ring"""
+    from .models import Camera
+
+    handoff = None
+    try:
+        camera = Camera.objects.get(pk=camera_id)
+        handoff = RingFrameHandoff.attach(ring_name, stop_event)
+        if handoff is None:
+            return
+        worker = CameraIngestionWorker(camera, handoff=handoff, **options)
+        worker.detect_loop(stop_event, report=stats_queue.put)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_event_writer()
+        if handoff is not None:
+            handoff.release()
+
+
+def detector_process_context():
+    """Detector processes are forked: they inherit the configured Django settings and apps"""
+    return multiprocessing.get_context('fork')
+
+
+def ingestion_stats_path():
+    return str(getattr(settings, 'CAMERA_INGESTION_STATS_FILE', os.path.join(settings.BASE_DIR, 'ingestion_stats.json')))
+
+
+def write_ingestion_stats(workers, path=None):
+    """Atomically write the snapshot of every worker (read by the ingestion stats endpoint)"""
+    path = path or ingestion_stats_path()
+    data = {
+        'updated_at': time.time(),
+        'pid': os.getpid(),
+        'cameras': [worker.snapshot() for worker in workers],
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+    return data
+
+
+def read_ingestion_stats(path=None):
+    """Last stats written by the ingestion process, or None if it never ran"""
+    try:
+        with open(path or ingestion_stats_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
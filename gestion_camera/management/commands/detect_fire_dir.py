@@ -0,0 +1,84 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_camera.batch_detection import (
+    BatchInputError,
+    BatchSummary,
+    batch_processes,
+    create_batch_pool,
+    detect_batch,
+    directory_frames,
+)
+from gestion_camera.models import Camera
+
+
+class Command(BaseCommand):
+    help = (
+        "Run fire detection on every image of a directory (incident review, exported footage) "
+        "in a pool of processes. Per-frame results are written as NDJSON to --output; frames "
+        "raising an alert and the summary are printed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--recursive', action='store_true', help="Include sub-directories")
+        parser.add_argument('--processes', type=int,
+                            help="Detection processes (default: BATCH_DETECTION_PROCESSES, else the "
+                                 "process share of the cores, like the API batch pool)")
+        parser.add_argument('--output', help="NDJSON file receiving one result per frame, then the summary")
+        parser.add_argument('--camera', type=int, help="Camera whose zones and analysis settings apply")
+        parser.add_argument('--analysis-max-side', type=int)
+        parser.add_argument('--tiled', action='store_true', help="Analyze full-resolution tiles")
+
+    def handle(self, *args, **options):
+        try:
+            frames = directory_frames(options['directory'], options['recursive'])
+        except BatchInputError as e:
+            raise CommandError(str(e))
+        if not frames:
+            raise CommandError(f"No image found in {options['directory']}")
+
+        camera = None
+        if options['camera'] is not None:
+            camera = Camera.objects.filter(pk=options['camera']).first()
+            if camera is None:
+                raise CommandError(f"Camera {options['camera']} does not exist")
+        detect_options = {
+            'analysis_max_side': options['analysis_max_side'] or (camera.analysis_max_side if camera else None),
+            'tiled': options['tiled'] or (camera is not None and camera.tiled_detection),
+            'zones': camera.detection_zones if camera is not None else None,
+        }
+
+        processes = max(1, options['processes'] or batch_processes())
+        self.stdout.write(f"Analyzing {len(frames)} images with {processes} processes...")
+        summary = BatchSummary(len(frames))
+        output = open(options['output'], 'w') if options['output'] else None
+        pool = create_batch_pool(processes)
+        try:
+            for done, frame in enumerate(detect_batch(frames, detect_options, pool, summary, 2 * processes), 1):
+                if output is not None:
+                    output.write(json.dumps({'type': 'frame', **frame}) + '\n')
+                if 'error' in frame:
+                    self.stderr.write(f"⚠️ {frame['frame']}: {frame['error']}")
+                elif frame['alert_level'] != 'NORMAL':
+                    self.stdout.write(f"🔥 {frame['frame']}: {frame['alert_level']} "
+                                      f"(confidence {frame['max_confidence']:.0%})")
+                if done % 100 == 0:
+                    self.stdout.write(f"{done}/{len(frames)} images analyzed")
+        finally:
+            pool.shutdown(cancel_futures=True)
+            result = summary.as_dict()
+            if output is not None:
+                output.write(json.dumps({'type': 'summary', **result}) + '\n')
+                output.close()
+
+        first_fire = result['first_fire']
+        peak = result['max_confidence']
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['analyzed']} images analyzed in {result['elapsed_s']:.1f}s ({result['fps']} images/s), "
+            f"{result['alerts']} alerts, {result['errors']} errors"
+        ))
+        self.stdout.write(f"First fire: {first_fire['frame'] if first_fire else 'none'}")
+        if peak:
+            self.stdout.write(f"Highest confidence: {peak['confidence']:.0%} ({peak['frame']})")
@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from gestion_camera.detection_scheduler import DetectionScheduler, SchedulerHandoff, camera_priorities
+from gestion_camera.ingestion import (
+    CameraIngestionWorker,
+    detector_process_context,
+    ingestion_stats_path,
+    scheduled_detect_loop,
+    write_ingestion_stats,
+)
+from gestion_camera.models import Camera
+from gestion_camera.motion_gate import MotionGate
+
+
+class Command(BaseCommand):
+    help = "Pull frames from the RECORDING cameras and run fire detection on them"
+
+    REFRESH_INTERVAL = 30.0
+
+    def add_arguments(self, parser):
+        parser.add_argument('camera_ids', nargs='*', type=int,
+                            help="IDs of the cameras to ingest (default: every RECORDING camera, every camera with --detection-workers)")
+        parser.add_argument('--source', help="Local video file or stream URL used instead of every camera feed (testing)")
+        parser.add_argument('--loop', action='store_true', help="Replay --source files endlessly")
+        parser.add_argument('--fps', type=float, default=2.0, help="Frames sampled per second and per camera (without --detection-workers)")
+        parser.add_argument('--confidence', type=float, default=0.3, help="Minimum model confidence")
+        parser.add_argument('--motion-gate', choices=MotionGate.METHODS,
+                            default=getattr(settings, 'CAMERA_MOTION_GATE', None),
+                            help="Skip unchanged frames and analyze only changed regions (default CAMERA_MOTION_GATE)")
+        parser.add_argument('--max-frames', type=int, help="Stop after this many sampled frames per camera")
+        parser.add_argument('--stats-file', help="Where per-camera stats are written (default CAMERA_INGESTION_STATS_FILE)")
+        parser.add_argument('--stats-interval', type=float, default=5.0, help="Seconds between stats updates")
+        parser.add_argument('--detector-processes', action='store_true',
+                            help="Run detection in one process per camera, fed through shared-memory frame rings")
+        parser.add_argument('--detection-workers', type=int,
+                            help="Share this many detection threads between all cameras, scheduled by priority "
+                                 "(MAINTENANCE/OFFLINE cameras are sampled rarely instead of skipped)")
+        parser.add_argument('--base-interval', type=float, default=0.5,
+                            help="Seconds between analyses of a priority-1 camera (--detection-workers)")
+
+    def handle(self, *args, **options):
+        scheduled = bool(options['detection_workers'])
+        if scheduled and options['detector_processes']:
+            raise CommandError("--detection-workers and --detector-processes are exclusive")
+
+        cameras = Camera.objects.all() if scheduled else Camera.objects.filter(status=Camera.Status.RECORDING)
+        if options['camera_ids']:
+            cameras = cameras.filter(pk__in=options['camera_ids'])
+        cameras = list(cameras)
+        if not cameras:
+            raise CommandError("No camera to ingest" if scheduled else "No RECORDING camera to ingest")
+
+        scheduler = None
+        if scheduled:
+            scheduler = DetectionScheduler(base_interval=options['base_interval'])
+            priorities = camera_priorities(cameras)
+            for camera in cameras:
+                scheduler.register(camera.id_camera, priorities[camera.id_camera], camera.status)
+
+        workers = [
+            CameraIngestionWorker(
+                camera,
+                source=options['source'],
+                sample_fps=options['fps'],
+                confidence_threshold=options['confidence'],
+                loop=options['loop'],
+                motion_gate=options['motion_gate'],
+                handoff=SchedulerHandoff(scheduler, camera.id_camera) if scheduled else None,
+            )
+            for camera in cameras
+        ]
+        stats_file = options['stats_file'] or ingestion_stats_path()
+
+        stats_queue = None
+        if options['detector_processes']:
+            context = detector_process_context()
+            stop_event = context.Event()
+            stats_queue = context.Queue()
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            for worker in workers:
+                worker.start_detector_process(stop_event, stats_queue, context)
+        else:
+            stop_event = threading.Event()
+
+        for worker in workers:
+            rate = "scheduled" if scheduled else f"at {worker.sample_fps} fps"
+            self.stdout.write(f"{worker.camera.name}: ingesting {worker.source} {rate}")
+            worker.start(stop_event, options['max_frames'])
+
+        workers_by_camera = {worker.camera.id_camera: worker for worker in workers}
+        detection_threads = []
+        if scheduled:
+            detection_threads = [
+                threading.Thread(target=scheduled_detect_loop, args=(scheduler, workers_by_camera, stop_event),
+                                 name=f'detect-{index}', daemon=True)
+                for index in range(options['detection_workers'])
+            ]
+            for thread in detection_threads:
+                thread.start()
+
+        next_stats = time.monotonic() + options['stats_interval']
+        next_refresh = time.monotonic() + self.REFRESH_INTERVAL
+        try:
+            while any(worker.is_alive() for worker in workers) or any(t.is_alive() for t in detection_threads):
+                time.sleep(0.2)
+                self._drain_stats(stats_queue, workers_by_camera)
+                if time.monotonic() >= next_stats:
+                    write_ingestion_stats(workers, stats_file)
+                    next_stats += options['stats_interval']
+                if time.monotonic() >= next_refresh:
+                    self._refresh_cameras(scheduler, workers_by_camera)
+                    next_refresh += self.REFRESH_INTERVAL
+        except KeyboardInterrupt:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+            for thread in detection_threads:
+                thread.join()
+        finally:
+            self._drain_stats(stats_queue, workers_by_camera)
+            for worker in workers:
+                worker.release()
+
+        for camera_stats in write_ingestion_stats(workers, stats_file)['cameras']:
+            self.stdout.write(self.style.SUCCESS(f"{camera_stats['name']}: {camera_stats}"))
+
+    def _refresh_cameras(self, scheduler, workers_by_camera):
+        """
+        Pick up edited detection settings and, when scheduled, camera status changes and
+        new zone alerts (detector processes keep the settings they were started with)
+        """
+        cameras = list(Camera.objects.filter(pk__in=list(workers_by_camera)))
+        for camera in cameras:
+            workers_by_camera[camera.id_camera].update_camera(camera)
+        if scheduler is not None:
+            priorities = camera_priorities(cameras)
+            for camera in cameras:
+                scheduler.update(camera.id_camera, priorities[camera.id_camera], camera.status)
+
+    def _drain_stats(self, stats_queue, workers_by_camera):
+        """Merge the counters reported by detector processes"""
+        if stats_queue is None:
+            return
+        while True:
+            try:
+                stats = stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            workers_by_camera[stats['camera']].remote_stats = stats
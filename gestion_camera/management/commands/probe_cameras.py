@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from gestion_camera.health_probe import (
+    PROBE_METHODS,
+    apply_status_changes,
+    camera_targets,
+    probe_settings,
+    probe_summary,
+    run_probes,
+    status_changes,
+)
+from gestion_camera.models import Camera
+
+
+class Command(BaseCommand):
+    help = (
+        "Probe every camera (TCP connect to its stream port, or HTTP HEAD) concurrently and "
+        "update the statuses that changed: unreachable RECORDING cameras become OFFLINE, "
+        "reachable OFFLINE cameras RECORDING. MAINTENANCE cameras are probed but never changed. "
+        "With --interval, probes again every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        defaults = probe_settings()
+        parser.add_argument('camera_ids', nargs='*', type=int, help="Cameras to probe (default: all)")
+        parser.add_argument('--method', choices=PROBE_METHODS, default=defaults['method'])
+        parser.add_argument('--port', type=int, default=defaults['port'],
+                            help="Port probed (default: the port of CAMERA_STREAM_URL_TEMPLATE)")
+        parser.add_argument('--path', default=defaults['path'], help="Path of the HTTP HEAD request")
+        parser.add_argument('--timeout', type=float, default=defaults['timeout'], help="Seconds per attempt")
+        parser.add_argument('--concurrency', type=int, default=defaults['concurrency'], help="Probes in flight")
+        parser.add_argument('--retries', type=int, default=defaults['retries'],
+                            help="Attempts after a failure before a camera counts as down")
+        parser.add_argument('--interval', type=float, help="Probe again every INTERVAL seconds until interrupted")
+        parser.add_argument('--dry-run', action='store_true', help="Report the changes without writing them")
+        parser.add_argument('--show-down', action='store_true', help="List the unreachable cameras")
+
+    def handle(self, *args, **options):
+        if options['timeout'] <= 0 or options['concurrency'] < 1 or options['retries'] < 0:
+            raise CommandError("--timeout and --concurrency must be positive, --retries at least 0")
+        try:
+            while True:
+                started = time.monotonic()
+                self.probe_once(options)
+                if not options['interval']:
+                    return
+                close_old_connections()
+                time.sleep(max(0.0, started + options['interval'] - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+
+    def probe_once(self, options):
+        cameras = Camera.objects.only('id_camera', 'name', 'ip_address', 'status')
+        if options['camera_ids']:
+            cameras = cameras.filter(pk__in=options['camera_ids'])
+        cameras = list(cameras)
+        if not cameras:
+            raise CommandError("No camera to probe")
+
+        started = time.perf_counter()
+        results = run_probes(
+            camera_targets(cameras, options['port']),
+            method=options['method'],
+            timeout=options['timeout'],
+            concurrency=options['concurrency'],
+            retries=options['retries'],
+            path=options['path'],
+        )
+        summary = probe_summary(results, time.perf_counter() - started)
+        changes = status_changes(cameras, results)
+        updated = 0 if options['dry_run'] else apply_status_changes(changes)
+
+        if options['show_down']:
+            names = {camera.id_camera: camera.name for camera in cameras}
+            for result in results:
+                if not result['ok']:
+                    self.stdout.write(f"❌ {names[result['key']]} ({result['host']}:{result['port']}): {result['error']}")
+        latency = (
+            f"latency p50 {summary['p50_ms']} ms, p90 {summary['p90_ms']} ms, "
+            f"p99 {summary['p99_ms']} ms, max {summary['max_ms']} ms"
+            if summary['up'] else "no camera reachable"
+        )
+        self.stdout.write(
+            f"{summary['probed']} cameras probed in {summary['elapsed_s']:.2f}s "
+            f"({summary['probes_per_s']} probes/s): {summary['up']} up, {summary['down']} down "
+            f"{summary['errors'] or ''}"
+        )
+        self.stdout.write(latency)
+        verb = "would change" if options['dry_run'] else "changed"
+        to_offline = sum(1 for status in changes.values() if status == Camera.Status.OFFLINE)
+        self.stdout.write(self.style.SUCCESS(
+            f"Statuses {verb}: {to_offline} to OFFLINE, {len(changes) - to_offline} to RECORDING"
+            + ("" if options['dry_run'] else f" ({updated} rows updated)")
+        ))
@@ -0,0 +1,121 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from gestion_camera.detection_events import delete_snapshots
+from gestion_camera.models import DetectionEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the detection event retention: delete events older than --delete-after days and "
+        "downsample those older than --downsample-after days to one event per camera, kind and "
+        "--bucket-seconds. Works in small chunks (one short transaction each) so writers are never "
+        "blocked for long. The snapshot files of deleted and merged events are removed after each chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-after', type=float,
+                            default=getattr(settings, 'DETECTION_EVENTS_RETENTION_DAYS', 90),
+                            help="Days events are kept (default DETECTION_EVENTS_RETENTION_DAYS)")
+        parser.add_argument('--downsample-after', type=float,
+                            default=getattr(settings, 'DETECTION_EVENTS_DOWNSAMPLE_DAYS', 7),
+                            help="Days after which events are downsampled (default DETECTION_EVENTS_DOWNSAMPLE_DAYS)")
+        parser.add_argument('--bucket-seconds', type=int, default=60,
+                            help="Downsampling bucket: the most confident event of each bucket is kept")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows deleted per transaction")
+        parser.add_argument('--window-minutes', type=int, default=60,
+                            help="Span of events loaded at once while downsampling")
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds slept between chunks")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would change")
+
+    def handle(self, *args, **options):
+        if options['downsample_after'] >= options['delete_after']:
+            raise CommandError("--downsample-after must be shorter than --delete-after")
+        if options['bucket_seconds'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--bucket-seconds and --chunk-size must be positive")
+        now = timezone.now()
+        delete_before = now - timedelta(days=options['delete_after'])
+        downsample_before = now - timedelta(days=options['downsample_after'])
+
+        self.snapshots_deleted = 0
+        deleted = self.delete_before(delete_before, options)
+        merged = self.downsample(delete_before, downsample_before, options)
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {deleted} events older than {delete_before:%Y-%m-%d %H:%M} and "
+            f"{merged} events merged by downsampling before {downsample_before:%Y-%m-%d %H:%M}"
+            + ("" if options['dry_run'] else f" ({self.snapshots_deleted} snapshot files removed)")
+        ))
+
+    def delete_before(self, cutoff, options):
+        expired = DetectionEvent.objects.filter(timestamp__lt=cutoff)
+        if options['dry_run']:
+            return expired.count()
+        deleted = 0
+        while True:
+            # Oldest first through the timestamp index; each delete is its own short transaction
+            rows = list(expired.order_by('timestamp').values_list('pk', 'snapshot')[:options['chunk_size']])
+            if not rows:
+                return deleted
+            DetectionEvent.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+            # Files go once their rows are gone: a failure leaves an orphan file, never a dangling row
+            self.snapshots_deleted += delete_snapshots(snapshot for _, snapshot in rows)
+            deleted += len(rows)
+            time.sleep(options['pause'])
+
+    def downsample(self, start, end, options):
+        """
+        Keep the most confident event of each (camera, kind, bucket) between `start` and
+        `end`; its `count` becomes the total count of the bucket. Each transaction updates
+        some keepers and deletes their merged events together, so the command can be
+        interrupted and rerun (it is idempotent).
+        """
+        bucket = options['bucket_seconds']
+        first = DetectionEvent.objects.filter(timestamp__gte=start, timestamp__lt=end).order_by('timestamp').first()
+        if first is None:
+            return 0
+        # Windows aligned on buckets, so no bucket spans two windows
+        window = timedelta(seconds=max(1, options['window_minutes'] * 60 // bucket) * bucket)
+        window_start = first.timestamp - timedelta(seconds=first.timestamp.timestamp() % bucket)
+
+        merged = 0
+        while window_start < end:
+            window_end = min(window_start + window, end)
+            rows = DetectionEvent.objects.filter(
+                timestamp__gte=window_start, timestamp__lt=window_end
+            ).values_list('pk', 'camera_id', 'kind', 'timestamp', 'confidence', 'count', 'snapshot')
+            groups = defaultdict(list)
+            for row in rows.iterator(chunk_size=options['chunk_size']):
+                groups[(row[1], row[2], int(row[3].timestamp() // bucket))].append(row)
+
+            keepers, extras = [], []
+            for group in groups.values():
+                if len(group) == 1:
+                    continue
+                best = max(group, key=lambda row: (row[4], row[3]))
+                keepers.append(DetectionEvent(pk=best[0], count=sum(row[5] for row in group)))
+                extras.extend(row for row in group if row[0] != best[0])
+                merged += len(group) - 1
+                if len(extras) >= options['chunk_size']:
+                    self.merge(keepers, extras, options)
+                    keepers, extras = [], []
+            if extras:
+                self.merge(keepers, extras, options)
+            window_start = window_end
+        return merged
+
+    def merge(self, keepers, extras, options):
+        """Update the keepers and delete the merged event rows, then their snapshot files"""
+        if options['dry_run']:
+            return
+        with transaction.atomic():
+            DetectionEvent.objects.bulk_update(keepers, ['count'])
+            DetectionEvent.objects.filter(pk__in=[row[0] for row in extras]).delete()
+        self.snapshots_deleted += delete_snapshots(row[6] for row in extras)
+        time.sleep(options['pause'])
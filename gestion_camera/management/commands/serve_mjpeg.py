@@ -0,0 +1,82 @@
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Serve a video file (or a synthetic scene) as an MJPEG stream, a stand-in for an IP camera"
+
+    def add_arguments(self, parser):
+        parser.add_argument('video', nargs='?', help="Video file replayed in a loop (default: synthetic moving flame)")
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8081)
+        parser.add_argument('--fps', type=float, help="Output frame rate (default: the video's, or 15)")
+
+    def handle(self, *args, **options):
+        video = options['video']
+        if video:
+            capture = cv2.VideoCapture(video)
+            if not capture.isOpened():
+                raise CommandError(f"Could not open video: {video}")
+            fps = options['fps'] or capture.get(cv2.CAP_PROP_FPS) or 15.0
+            capture.release()
+        else:
+            fps = options['fps'] or 15.0
+
+        def frames():
+            """Endless frame iterator, one per client"""
+            if video:
+                capture = cv2.VideoCapture(video)
+                try:
+                    while True:
+                        ok, frame = capture.read()
+                        if not ok:
+                            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            continue
+                        yield frame
+                finally:
+                    capture.release()
+            index = 0
+            while True:
+                frame = np.full((480, 640, 3), 40, np.uint8)
+                x = 80 + (index * 4) % 480
+                cv2.circle(frame, (x, 300), 40, (0, 90, 255), -1)
+                cv2.putText(frame, str(index), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+                index += 1
+                yield frame
+
+        class MJPEGHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+                self.end_headers()
+                interval = 1.0 / fps
+                next_frame = time.monotonic()
+                try:
+                    for frame in frames():
+                        ok, jpeg = cv2.imencode('.jpg', frame)
+                        self.wfile.write(
+                            b'--frame\r\nContent-Type: image/jpeg\r\n'
+                            + f'Content-Length: {len(jpeg)}\r\n\r\n'.encode()
+                            + jpeg.tobytes() + b'\r\n'
+                        )
+                        next_frame += interval
+                        time.sleep(max(0.0, next_frame - time.monotonic()))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), MJPEGHandler)
+        server.daemon_threads = True
+        self.stdout.write(f"Serving MJPEG on http://{options['host']}:{options['port']}/ at {fps:g} fps")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion_camera.fire_detection_service import get_fire_detector
+
+
+class Command(BaseCommand):
+    help = "Load the fire detection model and run a dummy inference"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        model_loaded = get_fire_detector().warmup()
+        elapsed = time.perf_counter() - start
+        method = "YOLO model" if model_loaded else "heuristic only (model unavailable)"
+        self.stdout.write(self.style.SUCCESS(f"Fire detector warmed up in {elapsed:.2f}s: {method}"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_camera', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='analysis_max_side',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name="Résolution d'analyse (px)"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_camera', '0002_camera_analysis_max_side'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='detection_exclusions',
+            field=models.JSONField(blank=True, default=list, verbose_name='Zones exclues'),
+        ),
+        migrations.AddField(
+            model_name='camera',
+            name='detection_rois',
+            field=models.JSONField(blank=True, default=list, verbose_name="Zones d'intérêt"),
+        ),
+    ]
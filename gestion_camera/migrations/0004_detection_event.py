@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_camera', '0003_camera_detection_zones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date')),
+                ('kind', models.CharField(choices=[('fire', 'Fire'), ('smoke', 'Smoke'), ('fire_smoke', 'Fire and smoke')], max_length=20, verbose_name='Type')),
+                ('confidence', models.FloatField(verbose_name='Confiance')),
+                ('boxes', models.JSONField(blank=True, default=list, verbose_name='Boîtes')),
+                ('snapshot', models.CharField(blank=True, default='', max_length=255, verbose_name='Capture')),
+                ('source', models.CharField(blank=True, default='', max_length=20, verbose_name='Source')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='Nombre')),
+                ('camera', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='detection_events', to='gestion_camera.camera', verbose_name='Caméra')),
+            ],
+            options={
+                'verbose_name': 'Détection',
+                'verbose_name_plural': 'Détections',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['camera', '-timestamp'], name='detection_camera_time_idx'), models.Index(fields=['timestamp'], name='detection_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_camera', '0005_detection_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Date de modification'),
+        ),
+        migrations.AddIndex(
+            model_name='camera',
+            index=models.Index(fields=['zone', 'status'], name='gestion_cam_zone_0f9ee0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='camera',
+            index=models.Index(fields=['status'], name='gestion_cam_status_fa3c15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='camera',
+            index=models.Index(fields=['resolution'], name='gestion_cam_resolut_1968d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='camera',
+            index=models.Index(fields=['-date_ajout', '-id_camera'], name='gestion_cam_date_aj_99b832_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:36
+
+from django.db import migrations, models
+
+
+def mark_event_images(apps, schema_editor):
+    """Jobs whose annotated image is already an event snapshot keep it when they expire"""
+    DetectionEvent = apps.get_model('gestion_camera', 'DetectionEvent')
+    DetectionJob = apps.get_model('gestion_camera', 'DetectionJob')
+    snapshots = DetectionEvent.objects.exclude(snapshot='').values('snapshot')
+    DetectionJob.objects.filter(annotated_image__in=snapshots).update(image_in_event=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_camera', '0006_camera_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detectionjob',
+            name='image_in_event',
+            field=models.BooleanField(default=False, verbose_name="Image de l'événement"),
+        ),
+        migrations.RunPython(mark_event_images, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,11 @@
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+
+from .detection_zones import DetectionZones, normalize_polygons
 
 
 class Camera(models.Model):
@@ -19,11 +26,143 @@ class Camera(models.Model):
         verbose_name="Statut"
     )
     date_ajout = models.DateTimeField(auto_now_add=True, verbose_name="Date d'ajout")
+    # Bumped on every save: with the camera count, the ETag of the camera list
+    date_modification = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Date de modification")
+    # Longest side (px) frames are downscaled to before fire detection (empty = default)
+    analysis_max_side = models.PositiveIntegerField(null=True, blank=True, verbose_name="Résolution d'analyse (px)")
+    # Detection zones: polygons [[x, y], ...] in normalized coordinates (0-1); no ROI = whole frame
+    detection_rois = models.JSONField(default=list, blank=True, verbose_name="Zones d'intérêt")
+    detection_exclusions = models.JSONField(default=list, blank=True, verbose_name="Zones exclues")
 
     class Meta:
         verbose_name = "Caméra"
         verbose_name_plural = "Caméras"
         ordering = ['-date_ajout']
+        # Filters and order of the camera list
+        indexes = [
+            models.Index(fields=['zone', 'status']),
+            models.Index(fields=['status']),
+            models.Index(fields=['resolution']),
+            models.Index(fields=['-date_ajout', '-id_camera']),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} - {self.zone} ({self.get_status_display()})"
+
+    def clean(self):
+        for field in ('detection_rois', 'detection_exclusions'):
+            try:
+                setattr(self, field, normalize_polygons(getattr(self, field)))
+            except ValueError as e:
+                raise ValidationError({field: str(e)})
+
+    @property
+    def detection_zones(self):
+        """DetectionZones of the camera, or None when the whole frame is monitored"""
+        zones = DetectionZones(self.detection_rois, self.detection_exclusions)
+        return zones if zones else None
+
+    @property
+    def tiled_detection(self):
+        """Fire detection runs on full-resolution tiles (resolution in FIRE_DETECTION_TILED_RESOLUTIONS)"""
+        tiled = getattr(settings, 'FIRE_DETECTION_TILED_RESOLUTIONS', [])
+        return self.resolution.lower() in {resolution.lower() for resolution in tiled}
+
+
+class DetectionEvent(models.Model):
+    """A positive fire/smoke detection, kept for history and trend analysis"""
+
+    class Kind(models.TextChoices):
+        FIRE = 'fire', 'Fire'
+        SMOKE = 'smoke', 'Smoke'
+        FIRE_AND_SMOKE = 'fire_smoke', 'Fire and smoke'
+
+    camera = models.ForeignKey(
+        Camera,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='detection_events',
+        verbose_name="Caméra"
+    )
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Date")
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="Type")
+    confidence = models.FloatField(verbose_name="Confiance")
+    # [[x1, y1, x2, y2, confidence, class], ...] in original image pixels
+    boxes = models.JSONField(default=list, blank=True, verbose_name="Boîtes")
+    # Storage path of the annotated image, when one was saved
+    snapshot = models.CharField(max_length=255, blank=True, default='', verbose_name="Capture")
+    source = models.CharField(max_length=20, blank=True, default='', verbose_name="Source")
+    # Number of detections this event stands for once old events are downsampled
+    count = models.PositiveIntegerField(default=1, verbose_name="Nombre")
+
+    class Meta:
+        verbose_name = "Détection"
+        verbose_name_plural = "Détections"
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['camera', '-timestamp'], name='detection_camera_time_idx'),
+            models.Index(fields=['timestamp'], name='detection_time_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} - {self.camera_id or 'upload'} ({self.timestamp:%Y-%m-%d %H:%M:%S})"
+
+
+class DetectionJob(models.Model):
+    """
+    Fire detection run asynchronously (POST /api/cameras/detect-fire/jobs/): the row is
+    the job state shared by every server process, so any of them can answer a poll
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+        CANCELLED = 'cancelled', 'Cancelled'
+
+    FINISHED = (Status.DONE, Status.FAILED, Status.CANCELLED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, verbose_name="Statut")
+    camera = models.ForeignKey(
+        Camera,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='detection_jobs',
+        verbose_name="Caméra"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='detection_jobs',
+        verbose_name="Créé par"
+    )
+    # Detection response payload (as returned by the synchronous endpoint, image by URL)
+    result = models.JSONField(null=True, blank=True, verbose_name="Résultat")
+    error = models.TextField(blank=True, default='', verbose_name="Erreur")
+    # Storage path of the annotated image, deleted with the job unless it is an event snapshot
+    annotated_image = models.CharField(max_length=255, blank=True, default='', verbose_name="Image annotée")
+    # The annotated image is also the snapshot of the job's DetectionEvent, which owns it
+    image_in_event = models.BooleanField(default=False, verbose_name="Image de l'événement")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Créé le")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Démarré le")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminé le")
+    # Past this date the job and its result are deleted
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expire le")
+
+    class Meta:
+        verbose_name = "Tâche de détection"
+        verbose_name_plural = "Tâches de détection"
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f"{self.id} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED
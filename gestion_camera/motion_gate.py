@@ -0,0 +1,208 @@
+"""
+Motion gating for fixed cameras
+A per-camera background model (running average or MOG2) on a small copy of each
+frame tells which frames, and which part of them, changed since the scene was
+last seen. Fire analysis only needs to run on those; an unchanged scene keeps its
+previous result. Flame flicker (intensity oscillating from frame to frame) is tracked
+as a cheap temporal cue that forces analysis even for very small changes.
+"""
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+from .frame_context import FrameContext
+
+
+class MotionGate:
+    """
+    Background model of one camera.
+
+    - `method`: 'average' (cv2.accumulateWeighted, cheap) or 'mog2'
+      (cv2.createBackgroundSubtractorMOG2, more robust to lighting noise)
+    - the model runs on color frames downscaled to `max_side` pixels and blurred
+      (color, not gray: a red object on a gray wall can have the same luminance)
+    - a frame counts as changed when more than `min_changed_fraction` of its pixels
+      differ from the background by more than `pixel_threshold` levels in any channel,
+      or when any cell flickers
+    - flicker: on a grid of `cell_size` px cells, the fraction of the last `history`
+      frames where the cell intensity reversed direction by more than `flicker_delta`
+      gray levels; cells at or above `flicker_threshold` flicker
+    """
+
+    METHODS = ('average', 'mog2')
+
+    def __init__(self, method='average', max_side=160, alpha=0.05, pixel_threshold=25,
+                 min_changed_fraction=0.002, history=8, cell_size=8, flicker_delta=6.0,
+                 flicker_threshold=0.5, region_margin=0.1):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown motion gate method '{method}'")
+        self.method = method
+        self.max_side = max_side
+        self.alpha = alpha
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.cell_size = cell_size
+        self.flicker_delta = flicker_delta
+        self.flicker_threshold = flicker_threshold
+        self.region_margin = region_margin
+
+        self._background = None
+        self._subtractor = None
+        if method == 'mog2':
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=16, detectShadows=False)
+        self._cells = deque(maxlen=history)
+        self._kernel = np.ones((3, 3), np.uint8)
+        self._frames_seen = 0
+
+    def reset(self):
+        """Forget the scene (e.g. after a reconnect or a camera move)"""
+        self._frames_seen = 0
+        self._background = None
+        if self._subtractor is not None:
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=16, detectShadows=False)
+        self._cells.clear()
+
+    def _foreground(self, small):
+        if self._subtractor is not None:
+            return self._subtractor.apply(small)
+        if self._background is None:
+            self._background = small.astype(np.float32)
+            return np.full(small.shape[:2], 255, np.uint8)
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        diff = cv2.max(cv2.max(diff[:, :, 0], diff[:, :, 1]), diff[:, :, 2])
+        mask = cv2.compare(diff, self.pixel_threshold, cv2.CMP_GT)
+        # Static regions follow lighting changes; changed ones are absorbed slowly
+        # (an object that stays long enough becomes background)
+        cv2.accumulateWeighted(small, self._background, self.alpha, mask=cv2.bitwise_not(mask))
+        cv2.accumulateWeighted(small, self._background, self.alpha * 0.1, mask=mask)
+        return mask
+
+    def _flicker(self, gray):
+        """Mask (uint8, one value per cell) of the flickering cells"""
+        height, width = gray.shape
+        cells = cv2.resize(
+            gray,
+            (max(1, width // self.cell_size), max(1, height // self.cell_size)),
+            interpolation=cv2.INTER_AREA,
+        ).astype(np.float32)
+        if self._cells and self._cells[-1].shape != cells.shape:
+            self._cells.clear()
+        self._cells.append(cells)
+        if len(self._cells) < 3:
+            return np.zeros(cells.shape, np.uint8)
+        diffs = np.diff(np.stack(self._cells), axis=0)
+        significant = np.abs(diffs) > self.flicker_delta
+        reversals = (diffs[1:] * diffs[:-1] < 0) & significant[1:] & significant[:-1]
+        rate = reversals.mean(axis=0)
+        return (rate >= self.flicker_threshold).astype(np.uint8)
+
+    def update(self, image_data):
+        """
+        Feed the next frame (BGR array, FrameContext or anything FrameContext accepts).
+        Returns {
+            'changed': bool (the frame needs analysis),
+            'changed_fraction': fraction of pixels differing from the background,
+            'flicker_cells': number of flickering cells,
+            'region': (x1, y1, x2, y2) box of the changes in original coordinates, or None,
+            'mask': changed-pixel mask at the gate resolution,
+        }
+        The first frame is always reported as changed, with no region (analyze it whole).
+        """
+        if isinstance(image_data, np.ndarray):
+            image_data = FrameContext.from_bgr(image_data)
+        frame = FrameContext.wrap(image_data)
+        small, scale = frame.analysis('bgr', self.max_side)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        mask = cv2.morphologyEx(self._foreground(small), cv2.MORPH_OPEN, self._kernel)
+        flicker = self._flicker(gray)
+        flicker_cells = int(cv2.countNonZero(flicker))
+        if flicker_cells:
+            # Flickering cells count as changed even below the pixel threshold
+            flicker_mask = cv2.resize(flicker * 255, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_NEAREST)
+            mask = cv2.bitwise_or(mask, flicker_mask)
+
+        first = self._frames_seen == 0
+        self._frames_seen += 1
+        changed_pixels = cv2.countNonZero(mask)
+        changed_fraction = changed_pixels / mask.size
+        region = None
+        if changed_pixels and not first:
+            x, y, w, h = cv2.boundingRect(cv2.findNonZero(mask))
+            margin_x, margin_y = int(w * self.region_margin) + 2, int(h * self.region_margin) + 2
+            full_height, full_width = frame.shape
+            region = (
+                max(0, int((x - margin_x) / scale)),
+                max(0, int((y - margin_y) / scale)),
+                min(full_width, int(np.ceil((x + w + margin_x) / scale))),
+                min(full_height, int(np.ceil((y + h + margin_y) / scale))),
+            )
+        return {
+            'changed': first or changed_fraction > self.min_changed_fraction or flicker_cells > 0,
+            'changed_fraction': changed_fraction,
+            'flicker_cells': flicker_cells,
+            'region': region,
+            'mask': mask,
+        }
+
+
+class MotionGatedDetector:
+    """
+    Fire detection of one camera, gated by a MotionGate:
+    - 'full': the whole frame is analyzed for the first frame, after a positive result
+      (until the scene is clear again: a steady fire ends up in the background model),
+      and every `keyframe_interval` frames; a full result on a frame matching the
+      background becomes the background result
+    - 'skipped': frames matching the background reuse the background result
+    - 'region': otherwise only the changed region is analyzed, by the heuristic and by
+      the model fallback (fire elsewhere in a static part of the scene is picked up by
+      the next full analysis)
+    """
+
+    def __init__(self, method='average', keyframe_interval=50, detector=None, **gate_options):
+        self.gate = MotionGate(method, **gate_options)
+        self.keyframe_interval = keyframe_interval
+        self.detector = detector
+        self._background_result = None
+        self._last_positive = False
+        self._since_keyframe = 0
+
+    @property
+    def method(self):
+        return self.gate.method
+
+    def reset(self):
+        self.gate.reset()
+        self._background_result = None
+        self._last_positive = False
+        self._since_keyframe = 0
+
+    def detect(self, image_data, **detect_options):
+        """
+        Returns (result, mode) with the result dict of detect_fire_in_image and
+        mode 'full', 'region' or 'skipped'. `detect_options` are passed to detect_fire_in_image.
+        """
+        if self.detector is None:
+            from .fire_detection_service import get_fire_detector
+            self.detector = get_fire_detector()
+        if isinstance(image_data, np.ndarray):
+            image_data = FrameContext.from_bgr(image_data)
+        frame = FrameContext.wrap(image_data)
+        motion = self.gate.update(frame)
+        self._since_keyframe += 1
+        if (self._background_result is None or self._last_positive
+                or self._since_keyframe >= self.keyframe_interval
+                or (motion['changed'] and motion['region'] is None)):
+            result, mode = self.detector.detect_fire_in_image(frame, **detect_options), 'full'
+            if self._background_result is None or not motion['changed']:
+                self._background_result = result
+                self._since_keyframe = 0
+        elif not motion['changed']:
+            result, mode = self._background_result, 'skipped'
+        else:
+            result, mode = self.detector.detect_fire_in_image(frame, region=motion['region'], **detect_options), 'region'
+        self._last_positive = bool(result['fire_detected'] or result['smoke_detected'])
+        return result, mode
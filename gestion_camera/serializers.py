@@ -1,10 +1,92 @@
+from collections import Counter, defaultdict
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Camera
+from .detection_zones import normalize_polygons
+from .models import Camera, DetectionEvent, DetectionJob
+
+
+class CameraListSerializer(serializers.ListSerializer):
+    """
+    Bulk writes of CameraSerializer(many=True): new cameras are inserted with one
+    bulk_create and the cameras matched on an upsert key updated with one bulk_update,
+    in a single transaction
+    """
+
+    UPSERT_KEYS = ('ip_address', 'name')
+
+    def match_existing(self, key):
+        """
+        Existing camera of each validated item (None: to create), matched on `key`.
+        Raises ValidationError with per-item errors when a key value is repeated in the
+        request or matches several cameras.
+        """
+        values = [item[key] for item in self.validated_data]
+        repeated = {value for value, count in Counter(values).items() if count > 1}
+        matches = defaultdict(list)
+        for camera in Camera.objects.filter(**{f'{key}__in': set(values)}):
+            matches[getattr(camera, key)].append(camera)
+        errors = [{} for _ in values]
+        for index, value in enumerate(values):
+            if value in repeated:
+                errors[index] = {key: [f"{key} {value} appears several times in the request"]}
+            elif len(matches[value]) > 1:
+                errors[index] = {key: [f"Several cameras have the {key} {value}"]}
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [matches[value][0] if matches[value] else None for value in values]
+
+    def upsert(self, key=None):
+        """
+        Create the validated cameras, or update those matching on `key` (UPSERT_KEYS)
+        with the fields given. Only the fields that differ are written, so re-importing
+        the same cameras writes nothing. Returns [(camera, action)] in request order,
+        action being 'created', 'updated' or 'unchanged'.
+        """
+        existing = self.match_existing(key) if key else [None] * len(self.validated_data)
+        now = timezone.now()
+        created, updated, fields = [], [], {'date_modification'}
+        results = []
+        for item, camera in zip(self.validated_data, existing):
+            if camera is None:
+                camera = Camera(**item)
+                created.append(camera)
+                results.append((camera, 'created'))
+                continue
+            changed = {field: value for field, value in item.items() if getattr(camera, field) != value}
+            if not changed:
+                results.append((camera, 'unchanged'))
+                continue
+            for field, value in changed.items():
+                setattr(camera, field, value)
+            # bulk_update does not bump auto_now fields
+            camera.date_modification = now
+            fields.update(changed)
+            updated.append(camera)
+            results.append((camera, 'updated'))
+
+        with transaction.atomic():
+            Camera.objects.bulk_create(created, batch_size=500)
+            if updated:
+                # Small batches: each one is a CASE over its rows per field
+                Camera.objects.bulk_update(updated, sorted(fields), batch_size=100)
+            if key and any(camera.pk is None for camera in created):
+                # Backends that do not return inserted ids (MySQL): look them up by key
+                ids = dict(
+                    Camera.objects.filter(**{f'{key}__in': [getattr(camera, key) for camera in created]})
+                    .values_list(key, 'pk')
+                )
+                for camera in created:
+                    camera.pk = ids.get(getattr(camera, key))
+        return results
 
 
 class CameraSerializer(serializers.ModelSerializer):
     class Meta:
         model = Camera
+        list_serializer_class = CameraListSerializer
         fields = [
             'id_camera',
             'name',
@@ -13,5 +95,76 @@ class CameraSerializer(serializers.ModelSerializer):
             'resolution',
             'status',
             'date_ajout',
+            'date_modification',
+            'analysis_max_side',
+            'detection_rois',
+            'detection_exclusions',
+        ]
+        read_only_fields = ['id_camera', 'date_ajout', 'date_modification']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """`fields`: only render these fields (projection of the camera list)"""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def _validate_polygons(self, value):
+        try:
+            return normalize_polygons(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate_detection_rois(self, value):
+        return self._validate_polygons(value)
+
+    def validate_detection_exclusions(self, value):
+        return self._validate_polygons(value)
+
+
+class DetectionEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DetectionEvent
+        fields = [
+            'id',
+            'camera',
+            'timestamp',
+            'kind',
+            'confidence',
+            'boxes',
+            'snapshot',
+            'source',
+            'count',
+        ]
+        read_only_fields = fields
+
+
+class DetectionJobSerializer(serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DetectionJob
+        fields = [
+            'id',
+            'status',
+            'camera',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'expires_at',
+            'error',
+            'result',
         ]
-        read_only_fields = ['id_camera', 'date_ajout']
+        read_only_fields = fields
+
+    def get_result(self, job):
+        """Detection payload, with the URL of the annotated image"""
+        if job.result is None:
+            return None
+        result = dict(job.result)
+        result['annotated_image_url'] = None
+        if job.annotated_image:
+            url = default_storage.url(job.annotated_image)
+            request = self.context.get('request')
+            result['annotated_image_url'] = request.build_absolute_uri(url) if request else url
+        return result
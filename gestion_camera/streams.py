@@ -0,0 +1,39 @@
+"""
+Video source helpers for surveillance cameras
+Resolves the stream URL of a Camera and opens it (or a local video file) with OpenCV
+"""
+
+import os
+
+import cv2
+from django.conf import settings
+
+
+# RTSP path used by most IP cameras; override per deployment in settings
+DEFAULT_STREAM_URL_TEMPLATE = 'rtsp://{ip}:554/stream'
+
+
+def camera_stream_url(camera):
+    """
+    Build the stream URL of a camera from CAMERA_STREAM_URL_TEMPLATE.
+    The template can use {ip} and {id} placeholders.
+    """
+    template = getattr(settings, 'CAMERA_STREAM_URL_TEMPLATE', DEFAULT_STREAM_URL_TEMPLATE)
+    return template.format(ip=camera.ip_address, id=camera.id_camera)
+
+
+def is_file_source(source):
+    """True when the source is a local video file (replayed as a stand-in for a live feed)"""
+    return isinstance(source, str) and os.path.isfile(source)
+
+
+def open_video_source(source):
+    """
+    Open a stream URL or a local video file.
+    Raises IOError if OpenCV cannot open it.
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        capture.release()
+        raise IOError(f"Could not open video source: {source}")
+    return capture
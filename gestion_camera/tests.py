@@ -1,3 +1,744 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import math
+import socket
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from CyberCobra import compute_resources
+from CyberCobra.compute_resources import JobSlots
+
+from . import detection_jobs, ingestion
+from .detection_events import DetectionEventWriter, event_from_result, save_snapshot
+from .detection_jobs import DetectionJobQueue
+from .detection_scheduler import DetectionScheduler, SchedulerHandoff
+from .fire_detection_service import FireDetectionService
+from .fire_tracker import FireTracker
+from .frame_context import FrameContext
+from .frame_ring import SharedFrameRing
+from .health_probe import apply_status_changes, probe_summary, run_probes, status_changes
+from .inference_scheduler import BatchingInferenceScheduler
+from .ingestion import CameraIngestionWorker
+from .models import Camera, DetectionEvent, DetectionJob
+
+
+class FakeClock:
+    """Monotonic clock advanced by the fake capture, standing in for the time module"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeCapture:
+    """Live feed of `frames` frames at `fps`: each grab() advances the clock by one frame"""
+
+    def __init__(self, clock, frames, fps=64.0, stop_event=None):
+        self.clock = clock
+        self.remaining = frames
+        self.fps = fps
+        self.stop_event = stop_event
+
+    def get(self, prop):
+        return self.fps
+
+    def grab(self):
+        if self.remaining == 0:
+            return False
+        self.remaining -= 1
+        self.clock.sleep(1.0 / self.fps)
+        return True
+
+    def retrieve(self):
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        # The feed ended: stop the grabber instead of reconnecting
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+
+class ScheduledGrabLoopTests(TestCase):
+    """In scheduled mode the DetectionScheduler, not --fps, decides which frames are sampled"""
+
+    def setUp(self):
+        self.camera = Camera.objects.create(name="Quai 1", zone="Quai", ip_address="10.0.0.1")
+        self.clock = FakeClock()
+        self.scheduler = DetectionScheduler(base_interval=0.5, boost_interval=0.125, clock=self.clock.monotonic)
+        self.scheduler.register(self.camera.id_camera, now=self.clock.now)
+
+    def grab(self, seconds, fps=64.0):
+        """Run grab_loop on `seconds` of a live feed; returns the number of frames sampled"""
+        worker = CameraIngestionWorker(
+            self.camera, source='rtsp://test/stream', sample_fps=2.0,
+            handoff=SchedulerHandoff(self.scheduler, self.camera.id_camera),
+        )
+        stop_event = threading.Event()
+        capture = FakeCapture(self.clock, int(seconds * fps), fps, stop_event)
+        with mock.patch.object(ingestion, 'time', self.clock), \
+                mock.patch.object(ingestion, 'open_video_source', return_value=capture):
+            worker.grab_loop(stop_event)
+        return worker.stats['frames_sampled']
+
+    def test_base_interval(self):
+        self.assertEqual(self.grab(2.0), 4)
+
+    def test_boost_interval_overrides_sample_fps(self):
+        self.scheduler.cameras[self.camera.id_camera].boost_until = self.clock.now + 60.0
+        # 0.125 s boost interval: 16 frames in 2 s, where --fps 2 alone would allow 4
+        self.assertEqual(self.grab(2.0), 16)
+
+
+class RecordingBackend:
+    """Inference backend returning no detection, recording the thread and size of each batch"""
+
+    name = 'recording'
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, images, conf_threshold=0.25):
+        self.calls.append((threading.current_thread().name, len(images)))
+        return [[] for _ in images]
+
+
+class TiledDetectionTests(TestCase):
+
+    def setUp(self):
+        self.service = FireDetectionService()
+        self.service.tile_size = 64
+
+    def test_tiled_heuristic_matches_full_frame(self):
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            # Dense fire-colored noise: the opening and closing change the mask at tile borders
+            frame = rng.integers(0, 90, (192, 256, 3), dtype=np.uint8)
+            frame[rng.random((192, 256)) < 0.6] = (0, 128, 255)
+            full = self.service.detect_fire_heuristic(FrameContext.from_bgr(frame), annotate=False)
+            tiled = self.service.detect_fire_heuristic_tiled(FrameContext.from_bgr(frame), annotate=False)
+            self.assertEqual(tiled, full)
+
+    def test_model_tiles_go_through_the_batching_scheduler(self):
+        backend = RecordingBackend()
+        self.service.model, self.service.model_loaded, self.service._model_attempted = backend, True, True
+        self.service.scheduler = BatchingInferenceScheduler(backend, max_batch_size=32, max_wait_ms=50.0)
+        try:
+            frame = np.zeros((128, 192, 3), dtype=np.uint8)
+            result = self.service.detect_fire_model_tiled(FrameContext.from_bgr(frame), annotate=False)
+        finally:
+            self.service.scheduler.close()
+        self.assertFalse(result['fire_detected'])
+        # 4 x 3 overlapping tiles and the overview, run by the scheduler's inference thread
+        self.assertEqual(sum(size for _, size in backend.calls), 13)
+        self.assertEqual({thread for thread, _ in backend.calls}, {'inference-batcher'})
+
+
+class RegionModelTests(TestCase):
+    """In 'region' mode the model only sees the moving region"""
+
+    class CropBackend:
+        name = 'crop'
+
+        def __init__(self):
+            self.shapes = []
+
+        def predict(self, images, conf_threshold=0.25):
+            self.shapes.extend(image.shape for image in images)
+            # One box at the top-left corner of each input
+            return [[{'class': 'fire', 'confidence': 0.9, 'bbox': [0.0, 0.0, 10.0, 10.0]}] for _ in images]
+
+    def setUp(self):
+        self.backend = self.CropBackend()
+        self.service = FireDetectionService()
+        self.service.model, self.service.model_loaded, self.service._model_attempted = self.backend, True, True
+        self.frame = FrameContext.from_bgr(np.zeros((240, 320, 3), dtype=np.uint8))
+
+    def test_model_input_is_the_region_crop(self):
+        result = self.service.detect_fire_in_image(self.frame, region=(100, 60, 180, 140), annotate=False)
+        self.assertEqual(self.backend.shapes, [(80, 80, 3)])
+        self.assertEqual(result['detections'][0]['bbox'], [100, 60, 110, 70])
+
+    def test_tiled_model_only_covers_the_region(self):
+        self.service.tile_size = 64
+        result = self.service.detect_fire_in_image(self.frame, region=(100, 60, 180, 140), annotate=False, tiled=True)
+        # 2 x 2 tiles inside the region and its overview, no tile outside it
+        self.assertEqual(len(self.backend.shapes), 5)
+        self.assertTrue(all(max(shape[:2]) <= 80 for shape in self.backend.shapes))
+        for detection in result['detections']:
+            x1, y1, _, _ = detection['bbox']
+            self.assertTrue(100 <= x1 < 180 and 60 <= y1 < 140)
+
+
+class DetectionEventStoreTests(TransactionTestCase):
+    """Transaction test case: foreign keys are only checked when the writer's inserts commit"""
+
+    def setUp(self):
+        self.camera = Camera.objects.create(name="Quai 1", zone="Quai", ip_address="10.0.0.1")
+
+    def event(self, camera=None, days_ago=0, snapshot=''):
+        result = {'fire_detected': True, 'smoke_detected': False, 'confidence': 0.8,
+                  'detections': [{'class': 'fire', 'confidence': 0.8, 'bbox': [1, 2, 3, 4]}]}
+        timestamp = timezone.now() - timedelta(days=days_ago)
+        return event_from_result(result, camera=camera, source='test', snapshot=snapshot, timestamp=timestamp)
+
+    def test_events_list_validates_limit(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user('operator', password='secret'))
+        DetectionEvent.objects.bulk_create([self.event(self.camera, days_ago=days) for days in range(3)])
+        url = f'/api/cameras/{self.camera.pk}/detection-events/'
+        self.assertEqual(len(client.get(url, {'limit': 2}).json()), 2)
+        for limit in ('abc', '0', '-3', '1.5'):
+            response = client.get(url, {'limit': limit})
+            self.assertEqual(response.status_code, 400, limit)
+            self.assertEqual(response.json(), {'error': 'limit must be a positive integer'})
+
+    def test_failed_batch_keeps_valid_rows(self):
+        deleted = Camera.objects.create(name="Quai 2", zone="Quai", ip_address="10.0.0.2")
+        events = [self.event(self.camera), self.event(deleted), self.event(None)]
+        # Deleted by another process while its event waits in the buffer
+        Camera.objects.filter(pk=deleted.pk).delete()
+        writer = DetectionEventWriter(flush_interval=60.0)
+        try:
+            for event in events:
+                writer.add(event)
+            self.assertEqual(writer.flush(), 2)
+        finally:
+            writer.close()
+        self.assertEqual(writer.stats['failed'], 1)
+        self.assertEqual(DetectionEvent.objects.count(), 2)
+
+    def test_prune_deletes_snapshot_files(self):
+        names = [save_snapshot(b'jpeg', 'jpg') for _ in range(4)]
+        try:
+            DetectionEvent.objects.bulk_create([
+                self.event(self.camera, days_ago=100, snapshot=names[0]),
+                # Same bucket: the second one is merged into the first
+                self.event(self.camera, days_ago=10, snapshot=names[1]),
+                self.event(self.camera, days_ago=10, snapshot=names[2]),
+                self.event(self.camera, days_ago=1, snapshot=names[3]),
+            ])
+            call_command('prune_detection_events', pause=0, stdout=io.StringIO())
+            self.assertEqual(DetectionEvent.objects.count(), 2)
+            kept = set(DetectionEvent.objects.values_list('snapshot', flat=True))
+            for name in names:
+                self.assertEqual(default_storage.exists(name), name in kept, name)
+        finally:
+            for name in names:
+                default_storage.delete(name)
+
+
+class DetectionJobImageTests(TestCase):
+    """The annotated image of a job is deleted with it unless a DetectionEvent references it"""
+
+    def run_job(self):
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        frame[40:80, 60:100] = (0, 128, 255)
+        job = DetectionJob.objects.create(expires_at=timezone.now() + timedelta(minutes=5))
+        detector = FireDetectionService()
+        detector._model_attempted = True  # heuristic only
+        with mock.patch.object(detection_jobs, 'get_fire_detector', return_value=detector):
+            DetectionJobQueue(workers=0)._execute(job.pk, FrameContext.from_bgr(frame), {'annotate': True})
+        job.refresh_from_db()
+        self.assertEqual(job.status, DetectionJob.Status.DONE)
+        self.assertTrue(job.result['fire_detected'])
+        self.assertTrue(default_storage.exists(job.annotated_image))
+        return job
+
+    def expire(self, job):
+        DetectionJob.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(detection_jobs.purge_expired_jobs(), 1)
+
+    def test_image_deleted_when_events_are_disabled(self):
+        with self.settings(DETECTION_EVENTS_ENABLED=False):
+            job = self.run_job()
+        self.assertFalse(job.image_in_event)
+        self.expire(job)
+        self.assertFalse(default_storage.exists(job.annotated_image))
+
+    def test_image_kept_for_its_event(self):
+        writer = mock.Mock()
+        with mock.patch.object(detection_jobs, 'get_event_writer', return_value=writer):
+            job = self.run_job()
+        try:
+            self.assertTrue(job.image_in_event)
+            event = writer.add.call_args.args[0]
+            self.assertEqual(event.snapshot, job.annotated_image)
+            self.expire(job)
+            self.assertTrue(default_storage.exists(job.annotated_image))
+        finally:
+            default_storage.delete(job.annotated_image)
+
+
+class FireColorMaskTests(TestCase):
+    """The lookup-table classifier matches the cv2.inRange pipeline it replaced"""
+
+    @staticmethod
+    def inrange_mask(hsv, ranges):
+        fire_mask = None
+        for lower, upper in ranges:
+            mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+            fire_mask = mask if fire_mask is None else cv2.bitwise_or(fire_mask, mask)
+        return fire_mask
+
+    def color_sample(self, ranges):
+        """HSV pixels on and around every range bound, plus random colors"""
+        values = [set(), set(), set()]
+        for bounds in ranges:
+            for bound in bounds:
+                for channel, value in enumerate(bound):
+                    values[channel].update(v for v in (value - 1, value, value + 1) if 0 <= v <= 255)
+        grid = np.array(np.meshgrid(*(sorted(v) for v in values), indexing='ij'), np.uint8).reshape(3, -1).T
+        rng = np.random.default_rng(0)
+        noise = rng.integers(0, 256, (256 * 256, 3), dtype=np.uint8)
+        noise[:, 0] %= 181
+        return np.concatenate([grid, noise]).reshape(1, -1, 3)
+
+    def test_lut_matches_inrange(self):
+        service = FireDetectionService()
+        hsv = self.color_sample(service.fire_hsv_ranges)
+        np.testing.assert_array_equal(
+            service.fire_color_mask(hsv), self.inrange_mask(hsv, service.fire_hsv_ranges)
+        )
+
+    def test_lut_matches_inrange_with_custom_ranges(self):
+        ranges = [((5, 80, 90), (20, 200, 240)), ((160, 0, 0), (180, 255, 30))]
+        with self.settings(FIRE_DETECTION_HSV_RANGES=ranges):
+            service = FireDetectionService()
+        hsv = self.color_sample(ranges)
+        np.testing.assert_array_equal(service.fire_color_mask(hsv), self.inrange_mask(hsv, ranges))
+
+
+class SharedFrameRingTests(TestCase):
+
+    def setUp(self):
+        self.ring = SharedFrameRing.create((4, 6, 3), slots=2)
+        self.addCleanup(self.ring.release)
+
+    def frame(self, value):
+        return np.full((4, 6, 3), value, dtype=np.uint8)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.ring.read_latest())
+        self.ring.write(self.frame(7), captured_at=12.5)
+        reader = SharedFrameRing.attach(self.ring.name)
+        try:
+            view = reader.read_latest()
+            self.assertEqual((view.frame_number, view.captured_at), (0, 12.5))
+            np.testing.assert_array_equal(view.array, self.frame(7))
+            self.assertTrue(view.valid())
+            view = None  # views must be dropped before the reader detaches
+        finally:
+            reader.release()
+
+    def test_overwritten_slot_is_torn(self):
+        self.ring.write(self.frame(1))
+        view = self.ring.read(0)
+        # Frame 2 reuses the slot of frame 0: the view now shows other pixels
+        self.ring.write(self.frame(2))
+        self.ring.write(self.frame(3))
+        self.assertFalse(view.valid())
+        self.assertIsNone(view.copy())
+        self.assertIsNone(self.ring.read(0))
+        np.testing.assert_array_equal(self.ring.read(2).array, self.frame(3))
+
+    def test_slot_being_written_is_not_readable(self):
+        self.ring.write(self.frame(1))
+        self.ring.write(self.frame(2))
+        view = self.ring.read(0)
+        with self.ring.writing() as slot:
+            slot[:] = 3
+            self.assertFalse(view.valid())
+            self.assertIsNone(self.ring.read(0))
+            self.assertIsNone(self.ring.read(2))
+            self.assertEqual(self.ring.read_latest().frame_number, 1)
+        self.assertEqual(self.ring.read_latest().frame_number, 2)
+
+
+class FireDetectionBenchmarkTests(TestCase):
+    """A tiny run of bench_fire_detection.py: scenes, timing, scoring and baseline comparison"""
+
+    def setUp(self):
+        self.bench = importlib.import_module('bench_fire_detection')
+        detector = FireDetectionService()
+        detector._model_attempted = True  # heuristic only
+        args = SimpleNamespace(repeat=1, analysis_max_side=None, confidence=0.3, iou=0.3, verbose=False)
+        with mock.patch.dict(self.bench.RESOLUTIONS, {'tiny': (320, 240)}), \
+                mock.patch.object(self.bench, 'get_fire_detector', return_value=detector):
+            self.report = self.bench.run(self.bench.synthetic_scenes(['tiny']), args)
+
+    def test_report(self):
+        # 2 noise levels x (3 fire sizes, empty, distractors)
+        self.assertEqual(self.report['frames'], 10)
+        self.assertEqual(list(self.report['timing']), ['heuristic tiny', 'in_image tiny', 'base64 tiny'])
+        self.assertEqual(self.report['timing']['heuristic tiny']['frames'], 10)
+        # Every drawn flame is found where it was labelled
+        self.assertEqual(self.report['accuracy']['heuristic']['box']['recall'], 1.0)
+
+    def test_scoring(self):
+        counts = self.bench.Counts()
+        fire = {'fire_detected': True, 'smoke_detected': False, 'detections': [
+            {'bbox': [10, 10, 50, 50]}, {'bbox': [100, 100, 120, 120]},
+        ]}
+        counts.add(fire, [[12, 12, 50, 52], [200, 200, 220, 220]], 0.5)
+        counts.add({'fire_detected': False, 'smoke_detected': False, 'detections': []}, [], 0.5)
+        self.assertEqual(counts.frame, {'tp': 1, 'fp': 0, 'fn': 0})
+        self.assertEqual(counts.box, {'tp': 1, 'fp': 1, 'fn': 1})
+        self.assertEqual(counts.summary()['box'], {'precision': 0.5, 'recall': 0.5})
+
+    def test_compare_flags_regressions(self):
+        with mock.patch('sys.stdout', io.StringIO()):
+            self.assertEqual(self.bench.compare(self.report, {'meta': {}, **self.report}, 0.1), [])
+            baseline = json.loads(json.dumps(self.report))
+            baseline['timing']['heuristic tiny']['p95_ms'] = self.report['timing']['heuristic tiny']['p95_ms'] / 2
+            baseline['accuracy']['heuristic']['frame']['recall'] = 1.0
+            regressions = self.bench.compare(self.report, {'meta': {}, **baseline}, 0.1)
+        self.assertEqual(len(regressions), 2)
+
+
+class CameraBulkAPITests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('operator', password='secret'))
+        self.cameras = [
+            {'name': 'Quai 1', 'zone': 'Quai', 'ip_address': '10.0.0.1'},
+            {'name': 'Quai 2', 'zone': 'Quai', 'ip_address': '10.0.0.2'},
+        ]
+
+    def post(self, cameras, upsert='ip_address'):
+        return self.client.post(f'/api/cameras/bulk/?upsert={upsert}', cameras, format='json')
+
+    def delete(self, body):
+        return self.client.delete('/api/cameras/bulk/', body, format='json')
+
+    def test_first_import_creates_every_camera(self):
+        response = self.post(self.cameras)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['unchanged']), (2, 0, 0))
+        ids = [row['id_camera'] for row in response.data['results']]
+        self.assertEqual(list(Camera.objects.filter(pk__in=ids).order_by('pk').values_list('name', flat=True)),
+                         ['Quai 1', 'Quai 2'])
+
+    def test_reimport_reports_updated_and_unchanged_rows(self):
+        self.post(self.cameras)
+        self.cameras[1]['zone'] = 'Entrepôt'
+        response = self.post({'cameras': self.cameras})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['unchanged']), (0, 1, 1))
+        self.assertEqual([row['action'] for row in response.data['results']], ['unchanged', 'updated'])
+        self.assertEqual(Camera.objects.count(), 2)
+        self.assertEqual(Camera.objects.get(ip_address='10.0.0.2').zone, 'Entrepôt')
+
+    def test_invalid_items_are_reported_by_index_and_nothing_is_written(self):
+        self.cameras.append({'name': 'Quai 3', 'zone': 'Quai', 'ip_address': 'not an ip'})
+        self.cameras.append({'name': 'Quai 4', 'zone': 'Quai', 'ip_address': '10.0.0.1'})
+        response = self.post(self.cameras)
+        self.assertEqual(response.status_code, 400)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {2})
+        self.assertIn('ip_address', errors[2])
+        self.assertFalse(Camera.objects.exists())
+        # Once valid, the upsert key must be unique in the request
+        self.cameras.pop(2)
+        response = self.post(self.cameras)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0, 2])
+        self.assertFalse(Camera.objects.exists())
+
+    def test_delete_reports_missing_ids(self):
+        ids = [row['id_camera'] for row in self.post(self.cameras).data['results']]
+        response = self.delete({'ids': [ids[0], 999999, ids[0]]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'deleted': 1, 'missing': [999999]})
+        self.assertEqual(list(Camera.objects.values_list('pk', flat=True)), [ids[1]])
+
+    def test_delete_rejects_non_integer_ids(self):
+        self.post(self.cameras)
+        for ids in ([True], [False], ['1'], [1.0], 1, None):
+            response = self.delete({'ids': ids})
+            self.assertEqual(response.status_code, 400, ids)
+        self.assertEqual(Camera.objects.count(), 2)
+
+
+class ChallengeHeadHandler(BaseHTTPRequestHandler):
+    """Stand-in camera web server: answers HEAD with an authentication challenge"""
+
+    def do_HEAD(self):
+        self.send_response(401)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class CameraHealthProbeTests(TestCase):
+    """Probes against stand-in loopback sockets, and the status updates they imply"""
+
+    def setUp(self):
+        # Accepted by the kernel (backlog) but never answered: up for TCP, silent for HTTP
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.addCleanup(self.listener.close)
+        self.up_port = self.listener.getsockname()[1]
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            self.closed_port = closed.getsockname()[1]
+
+    def probe(self, targets, **options):
+        return run_probes(targets, timeout=0.5, concurrency=4, retries=0, **options)
+
+    def test_tcp_probe_of_a_listener_and_a_closed_port(self):
+        up, down = self.probe([(1, '127.0.0.1', self.up_port), (2, '127.0.0.1', self.closed_port)])
+        self.assertTrue(up['ok'])
+        self.assertIsNone(up['error'])
+        self.assertFalse(down['ok'])
+        self.assertEqual(down['error'], 'refused')
+
+    def test_http_probe(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ChallengeHeadHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        web, silent = self.probe(
+            [(1, '127.0.0.1', server.server_address[1]), (2, '127.0.0.1', self.up_port)], method='http'
+        )
+        self.assertTrue(web['ok'])
+        self.assertEqual(web['http_status'], 401)
+        self.assertFalse(silent['ok'])
+        self.assertEqual(silent['error'], 'timeout')
+        self.assertEqual(probe_summary([web, silent])['errors'], {'timeout': 1})
+
+    def test_status_changes(self):
+        Status = Camera.Status
+        cameras = [
+            Camera.objects.create(name=f'C{index}', zone='Quai', ip_address='127.0.0.1', status=camera_status)
+            for index, camera_status in enumerate([
+                Status.RECORDING, Status.RECORDING, Status.OFFLINE, Status.OFFLINE, Status.MAINTENANCE,
+            ])
+        ]
+        reachable = [True, False, True, False, False]
+        results = [{'key': camera.pk, 'ok': ok} for camera, ok in zip(cameras, reachable)]
+        changes = status_changes(cameras, results)
+        self.assertEqual(changes, {cameras[1].pk: Status.OFFLINE, cameras[2].pk: Status.RECORDING})
+
+        before = dict(Camera.objects.values_list('pk', 'date_modification'))
+        # Put in maintenance between the probe and the write: left alone
+        Camera.objects.filter(pk=cameras[2].pk).update(status=Status.MAINTENANCE)
+        self.assertEqual(apply_status_changes(changes), 1)
+        after = {camera.pk: camera for camera in Camera.objects.all()}
+        self.assertEqual(after[cameras[1].pk].status, Status.OFFLINE)
+        self.assertEqual(after[cameras[2].pk].status, Status.MAINTENANCE)
+        self.assertEqual([pk for pk, camera in after.items() if camera.date_modification != before[pk]],
+                         [cameras[1].pk])
+
+    def test_probe_cameras_command(self):
+        Status = Camera.Status
+        online = Camera.objects.create(name='Up', zone='Quai', ip_address='127.0.0.1', status=Status.OFFLINE)
+        steady = Camera.objects.create(name='Steady', zone='Quai', ip_address='127.0.0.1', status=Status.RECORDING)
+        # Nothing listens on 127.0.0.2 (refused on Linux, timeout elsewhere)
+        lost = Camera.objects.create(name='Lost', zone='Quai', ip_address='127.0.0.2', status=Status.RECORDING)
+        modified = steady.date_modification
+        out = io.StringIO()
+        call_command('probe_cameras', port=self.up_port, timeout=0.5, retries=0, stdout=out)
+        statuses = dict(Camera.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {online.pk: Status.RECORDING, steady.pk: Status.RECORDING, lost.pk: Status.OFFLINE})
+        self.assertIn('1 to OFFLINE, 1 to RECORDING (2 rows updated)', out.getvalue())
+        steady.refresh_from_db()
+        self.assertEqual(steady.date_modification, modified)
+
+
+class FireTrackerTests(TestCase):
+    """Hysteresis, smoothing and box matching of the per-camera fire state (2 frames/s)"""
+
+    FIRE = {'class': 'fire', 'confidence': 0.8, 'bbox': [100, 100, 140, 160]}
+
+    def setUp(self):
+        self.tracker = FireTracker(enter_threshold=0.35, clear_threshold=0.1, time_constant=4.0,
+                                   iou_threshold=0.3, frame_interval=0.5)
+
+    def feed(self, frames, start=0.0):
+        """Feed each frame's detections half a second apart; returns [(time, transition)]"""
+        transitions = []
+        for index, detections in enumerate(frames):
+            now = start + index * 0.5
+            transitions.extend((now, transition) for transition in self.tracker.update(detections, now))
+        return transitions
+
+    def test_isolated_positives_do_not_raise_an_alert(self):
+        # One confident positive every 3 s, for a minute
+        frames = [[self.FIRE] if index % 6 == 0 else [] for index in range(120)]
+        self.assertEqual(self.feed(frames), [])
+        self.assertFalse(self.tracker.verdict()['fire_detected'])
+
+    def test_sustained_fire_raises_one_alert(self):
+        # Detected on 3 frames out of 4
+        frames = [[] if index % 4 == 3 else [self.FIRE] for index in range(60)]
+        transitions = self.feed(frames)
+        self.assertEqual([transition['state'] for _, transition in transitions], ['start'])
+        started_at, transition = transitions[0]
+        self.assertEqual(transition['label'], 'fire')
+        self.assertTrue(1.0 <= started_at <= 5.0)
+        self.assertTrue(self.tracker.verdict()['fire_detected'])
+        self.assertEqual(len(self.tracker.tracks), 1)
+
+    def test_track_ends_after_its_exit_window(self):
+        self.feed([[self.FIRE]] * 30)
+        self.assertTrue(self.tracker.active['fire'])
+        transitions = self.feed([[]] * 40, start=15.0)
+        # The score decays below clear_threshold after several seconds, not at the first miss
+        self.assertEqual([transition['state'] for _, transition in transitions], ['clear'])
+        cleared_at = transitions[0][0]
+        self.assertTrue(15.0 + 5.0 <= cleared_at <= 15.0 + self.tracker.max_age)
+        self.assertEqual(self.tracker.tracks, [])
+        self.assertFalse(self.tracker.verdict()['fire_detected'])
+
+    def test_smoothing_weighs_frames_by_elapsed_time(self):
+        self.tracker.update([self.FIRE], 0.0)
+        self.assertAlmostEqual(self.tracker.score('fire'), 0.8 * (1 - math.exp(-0.5 / 4.0)))
+        first = self.tracker.score('fire')
+        self.tracker.update([self.FIRE], 4.0)
+        self.assertAlmostEqual(self.tracker.score('fire'), first + (1 - math.exp(-1.0)) * (0.8 - first))
+
+    def test_boxes_are_matched_by_overlap_and_label(self):
+        moved = {**self.FIRE, 'bbox': [104, 104, 144, 164]}
+        elsewhere = {**self.FIRE, 'bbox': [400, 300, 440, 360]}
+        smoke = {**self.FIRE, 'class': 'smoke'}
+        self.tracker.update([self.FIRE], 0.0)
+        self.tracker.update([moved, elsewhere, smoke], 0.5)
+        tracks = sorted((track.label, track.hits, track.bbox) for track in self.tracker.tracks)
+        self.assertEqual(tracks, [
+            ('fire', 1, elsewhere['bbox']),
+            ('fire', 2, moved['bbox']),
+            ('smoke', 1, smoke['bbox']),
+        ])
+
+    def test_live_tracks_are_capped(self):
+        tracker = FireTracker(max_tracks=8)
+        for frame in range(20):
+            # 100 disjoint boxes per frame, at a new place every frame
+            detections = [
+                {'class': 'fire', 'confidence': 0.3 + index / 200,
+                 'bbox': [index * 50, frame * 50, index * 50 + 40, frame * 50 + 40]}
+                for index in range(100)
+            ]
+            tracker.update(detections, frame * 0.5)
+            self.assertLessEqual(len(tracker.tracks), 8)
+        # The strongest tracks are the ones kept
+        self.assertEqual(min(track.bbox[0] for track in tracker.tracks), 92 * 50)
+
+
+class CameraListAPITests(TestCase):
+    """Filters, projection, ETag revalidation and cursor pages of the camera list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('operator', password='secret'))
+        Status = Camera.Status
+        self.cameras = [
+            Camera.objects.create(name=f'C{index}', zone='Quai' if index % 2 else 'Parking',
+                                  ip_address=f'10.0.0.{index}', status=camera_status)
+            for index, camera_status in enumerate([Status.RECORDING, Status.OFFLINE, Status.RECORDING,
+                                                   Status.MAINTENANCE, Status.RECORDING])
+        ]
+
+    def get(self, query='', **headers):
+        return self.client.get(f'/api/cameras/{query}', **headers)
+
+    def test_filters_and_projection(self):
+        response = self.get('?status=RECORDING,OFFLINE&zone=Quai&fields=name,status')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'name': 'C1', 'status': 'OFFLINE'}])
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('?status=BURNING', '?fields=name,password', '?page_size=abc', '?page_size=0',
+                      '?page_size=-1'):
+            response = self.get(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.json())
+
+    def test_unchanged_list_answers_304(self):
+        response = self.get('?zone=Quai')
+        etag = response['ETag']
+        self.assertEqual(self.get('?zone=Quai', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Another query, a modified camera or a deleted one change the ETag
+        self.assertEqual(self.get('?zone=Parking', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        camera = self.cameras[1]
+        camera.name = 'Quai nord'
+        camera.save()
+        response = self.get('?zone=Quai', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.cameras[3].delete()
+        self.assertEqual(self.get('?zone=Quai', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cursor_pages_with_projection(self):
+        names, url = [], '/api/cameras/?page_size=2&fields=id_camera,name'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            for camera in page['results']:
+                self.assertEqual(set(camera), {'id_camera', 'name'})
+            names.extend(camera['name'] for camera in page['results'])
+            url = page['next']
+        # Newest first, every camera once
+        self.assertEqual(names, ['C4', 'C3', 'C2', 'C1', 'C0'])
+
+
+class BatchDetectionSlotTests(TestCase):
+    """A batch holds a heavy job slot of the worker until its stream ends"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('operator', password='secret'))
+        self.slots = JobSlots(1)
+        patcher = mock.patch.object(compute_resources, '_heavy_job_slots', return_value=self.slots)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self):
+        image = io.BytesIO(cv2.imencode('.png', np.zeros((8, 8, 3), np.uint8))[1].tobytes())
+        image.name = 'frame.png'
+        frames = [{'index': 0, 'frame': 'frame.png', 'fire_detected': False, 'alert_level': 'NORMAL',
+                   'max_confidence': 0.0, 'detections': []}]
+        with mock.patch('gestion_camera.views.detect_batch', return_value=iter(frames)):
+            return self.client.post('/api/cameras/detect-fire-batch/', {'images': [image]}, format='multipart')
+
+    def test_busy_worker_answers_503(self):
+        self.assertTrue(self.slots.acquire(0))
+        with self.settings(COMPUTE_HEAVY_JOB_TIMEOUT=0.01):
+            response = self.post()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_slot_is_held_until_the_stream_ends(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.slots.acquire(0))
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line['type'] for line in lines], ['frame', 'summary'])
+        self.assertTrue(self.slots.acquire(0))
+
+    def test_unread_stream_releases_its_slot_when_closed(self):
+        response = self.post()
+        self.assertFalse(self.slots.acquire(0))
+        response.close()
+        self.assertTrue(self.slots.acquire(0))
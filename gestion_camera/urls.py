@@ -1,15 +1,27 @@
 from django.urls import path
 from .views import (
     CameraListCreateAPIView,
+    CameraBulkAPIView,
     CameraDetailAPIView,
+    CameraIngestionStatsAPIView,
+    CameraDetectionEventsAPIView,
     FireDetectionAPIView,
-    FireDetectionHeuristicAPIView
+    FireDetectionHeuristicAPIView,
+    FireDetectionBatchAPIView,
+    FireDetectionJobsAPIView,
+    FireDetectionJobDetailAPIView
 )
 
 
 urlpatterns = [
     path('cameras/', CameraListCreateAPIView.as_view(), name='camera-list-create'),
+    path('cameras/bulk/', CameraBulkAPIView.as_view(), name='camera-bulk'),
     path('cameras/<int:pk>/', CameraDetailAPIView.as_view(), name='camera-detail'),
+    path('cameras/ingestion-stats/', CameraIngestionStatsAPIView.as_view(), name='camera-ingestion-stats'),
+    path('cameras/<int:pk>/detection-events/', CameraDetectionEventsAPIView.as_view(), name='camera-detection-events'),
     path('cameras/detect-fire/', FireDetectionAPIView.as_view(), name='fire-detection'),
     path('cameras/detect-fire-heuristic/', FireDetectionHeuristicAPIView.as_view(), name='fire-detection-heuristic'),
+    path('cameras/detect-fire-batch/', FireDetectionBatchAPIView.as_view(), name='fire-detection-batch'),
+    path('cameras/detect-fire/jobs/', FireDetectionJobsAPIView.as_view(), name='fire-detection-jobs'),
+    path('cameras/detect-fire/jobs/<uuid:pk>/', FireDetectionJobDetailAPIView.as_view(), name='fire-detection-job'),
 ]
@@ -1,27 +1,123 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.renderers import JSONRenderer
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import Camera
-from .serializers import CameraSerializer
-from .fire_detection_service import fire_detector
-from PIL import Image
-import io
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from .models import Camera, DetectionEvent, DetectionJob
+from .serializers import CameraListSerializer, CameraSerializer, DetectionEventSerializer, DetectionJobSerializer
+from CyberCobra.compute_resources import ComputeBusy, HeavyJobStream, heavy_job
+from .batch_detection import BatchInputError, BatchSummary, archive_frames, detect_batch, upload_frames
+from .detection_events import record_detection, save_snapshot
+from .detection_jobs import QueueFull, cancel_job, submit_job, wait_for_job
+from .fire_detection_service import alert_level, alert_message, get_fire_detector
+from .ingestion import read_ingestion_stats
+from collections import Counter
+import hashlib
+import json
+import uuid
+
+
+class CameraCursorPagination(CursorPagination):
+    """Pages of the camera list, newest first (stable while cameras are added)"""
+    ordering = ('-date_ajout', '-id_camera')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
 
 
 class CameraListCreateAPIView(APIView):
     """
-    GET: List all cameras
+    GET: List cameras
+    Query parameters:
+    - `zone`, `status`, `resolution`: filters (exact values, several separated by commas)
+    - `fields`: fields to return, separated by commas (default all)
+    - `cursor` / `page_size` (positive, at most 500): cursor pagination (`{"next", "previous", "results"}`);
+      without either, every matching camera is returned as a list
+    The response carries an ETag: with `If-None-Match`, an unchanged list answers 304
+    without being serialized.
     POST: Create a new camera
     """
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [JSONParser]
+    FILTERS = ('zone', 'status', 'resolution')
 
-    def get(self, request):
+    def query_list(self, request, name):
+        value = request.query_params.get(name, '')
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def filter_cameras(self, request):
         cameras = Camera.objects.all()
-        serializer = CameraSerializer(cameras, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        for name in self.FILTERS:
+            values = self.query_list(request, name)
+            if name == 'status':
+                unknown = [value for value in values if value not in Camera.Status.values]
+                if unknown:
+                    raise ValueError(f"status must be among {', '.join(Camera.Status.values)}")
+            if values:
+                cameras = cameras.filter(**{f'{name}__in': values})
+        return cameras
+
+    def check_page_size(self, request):
+        value = request.query_params.get('page_size')
+        if value is not None and not (value.isdigit() and int(value) > 0):
+            raise ValueError("page_size must be a positive integer")
+
+    def get_fields(self, request):
+        fields = self.query_list(request, 'fields')
+        if not fields:
+            return None
+        unknown = [field for field in fields if field not in CameraSerializer.Meta.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    def list_etag(self, request, cameras):
+        """
+        ETag of a list request: any save bumps the latest date_modification, a deletion
+        lowers the count; the query string covers filters, projection and page
+        """
+        state = cameras.aggregate(count=Count('pk'), modified=Max('date_modification'))
+        modified = state['modified'].isoformat() if state['modified'] else ''
+        key = f"{state['count']}|{modified}|{request.get_full_path()}"
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def get(self, request):
+        try:
+            cameras = self.filter_cameras(request)
+            fields = self.get_fields(request)
+            self.check_page_size(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        etag = self.list_etag(request, cameras)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        if fields is not None:
+            # Load the projected columns only (plus the pagination order)
+            cameras = cameras.only(*fields, 'date_ajout')
+
+        if 'cursor' in request.query_params or 'page_size' in request.query_params:
+            paginator = CameraCursorPagination()
+            page = paginator.paginate_queryset(cameras, request, view=self)
+            response = paginator.get_paginated_response(CameraSerializer(page, many=True, fields=fields).data)
+        else:
+            response = Response(CameraSerializer(cameras, many=True, fields=fields).data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        # Browsers revalidate on every poll instead of reusing a stale list
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     def post(self, request):
         serializer = CameraSerializer(data=request.data)
@@ -31,6 +127,71 @@ class CameraListCreateAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CameraBulkAPIView(APIView):
+    """
+    POST: Create cameras in bulk: a JSON array of cameras (or {"cameras": [...]}).
+    Every item is validated; if any is invalid nothing is written and the errors are
+    returned per item (`index` in the array). `?upsert=ip_address` (or `name`) updates
+    the camera having the same value instead of creating one, so a re-import is idempotent.
+    DELETE: Delete cameras in bulk: {"ids": [...]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser]
+
+    def max_items(self):
+        return getattr(settings, 'CAMERA_BULK_MAX_ITEMS', 1000)
+
+    def post(self, request):
+        items = request.data.get('cameras') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty array of cameras'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_items():
+            return Response({'error': f'Too many cameras ({len(items)}, at most {self.max_items()})'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        key = request.query_params.get('upsert') or None
+        if key is not None and key not in CameraListSerializer.UPSERT_KEYS:
+            return Response({'error': f"upsert must be one of {', '.join(CameraListSerializer.UPSERT_KEYS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = CameraSerializer(data=items, many=True)
+        try:
+            serializer.is_valid(raise_exception=True)
+            results = serializer.upsert(key)
+        except ValidationError as e:
+            errors = e.detail if isinstance(e.detail, list) else [e.detail]
+            return Response({
+                'error': 'Invalid cameras, nothing was written',
+                'errors': [{'index': index, 'errors': error} for index, error in enumerate(errors) if error],
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        counts = Counter(action for _, action in results)
+        return Response({
+            'created': counts['created'],
+            'updated': counts['updated'],
+            'unchanged': counts['unchanged'],
+            'results': [
+                {'index': index, 'id_camera': camera.pk, 'action': action}
+                for index, (camera, action) in enumerate(results)
+            ],
+        }, status=status.HTTP_201_CREATED if counts['created'] else status.HTTP_200_OK)
+
+    def delete(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        # bool is an int subclass: {"ids": [true]} must not delete camera 1
+        if not isinstance(ids, list) or not all(type(pk) is int for pk in ids):
+            return Response({'error': 'Expected {"ids": [camera ids]}'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_items():
+            return Response({'error': f'Too many cameras ({len(ids)}, at most {self.max_items()})'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            found = set(Camera.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            Camera.objects.filter(pk__in=found).delete()
+        return Response({
+            'deleted': len(found),
+            'missing': [pk for pk in dict.fromkeys(ids) if pk not in found],
+        }, status=status.HTTP_200_OK)
+
+
 class CameraDetailAPIView(APIView):
     """
     GET: Retrieve a single camera
@@ -71,7 +232,200 @@ class CameraDetailAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FireDetectionAPIView(APIView):
+class CameraIngestionStatsAPIView(APIView):
+    """
+    GET: Per-camera ingestion stats (fps, lag, drops...) last written by `manage.py ingest_cameras`
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stats = read_ingestion_stats()
+        if stats is None:
+            return Response({'updated_at': None, 'cameras': []}, status=status.HTTP_200_OK)
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+class CameraDetectionEventsAPIView(APIView):
+    """
+    GET: Detection history of a camera, most recent first
+    Query parameters: `since` / `until` (ISO 8601), `kind` (fire, smoke, fire_smoke),
+    `limit` (default 100, at most 1000)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_LIMIT = 1000
+
+    def get(self, request, pk):
+        camera = get_object_or_404(Camera, pk=pk)
+        events = DetectionEvent.objects.filter(camera=camera)
+        try:
+            for param, lookup in (('since', 'timestamp__gte'), ('until', 'timestamp__lt')):
+                value = request.query_params.get(param)
+                if value:
+                    moment = parse_datetime(value)
+                    if moment is None:
+                        raise ValueError(f"{param} must be an ISO 8601 date and time")
+                    if timezone.is_naive(moment):
+                        moment = timezone.make_aware(moment)
+                    events = events.filter(**{lookup: moment})
+            kind = request.query_params.get('kind')
+            if kind:
+                if kind not in DetectionEvent.Kind.values:
+                    raise ValueError(f"kind must be one of {', '.join(DetectionEvent.Kind.values)}")
+                events = events.filter(kind=kind)
+            limit = request.query_params.get('limit', '100')
+            if not (limit.isdigit() and int(limit) > 0):
+                raise ValueError("limit must be a positive integer")
+            limit = min(int(limit), self.MAX_LIMIT)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Served by the (camera, -timestamp) index
+        serializer = DetectionEventSerializer(events.order_by('-timestamp')[:limit], many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class FireDetectionOptionsMixin:
+    """Request options and response rendering shared by the fire detection endpoints"""
+
+    RESPONSE_FORMATS = ('json', 'multipart', 'url')
+    # image_format option -> (PIL format, content type, file extension)
+    IMAGE_FORMATS = {
+        'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+        'webp': ('WEBP', 'image/webp', 'webp'),
+    }
+    TRUE_VALUES = ('1', 'true', 'yes', 'on')
+    FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+    def get_camera(self, request):
+        """Camera given by the optional `camera` field (id), or None"""
+        camera_id = request.data.get('camera')
+        if not camera_id:
+            return None
+        return get_object_or_404(Camera, pk=int(camera_id))
+
+    def get_analysis_max_side(self, request, camera=None):
+        """
+        Analysis resolution (longest side in px): the `analysis_max_side` field, else the
+        camera's setting, else FIRE_DETECTION_ANALYSIS_MAX_SIDE (None = full resolution).
+        Raises ValueError on an invalid value.
+        """
+        value = request.data.get('analysis_max_side')
+        if value not in (None, ''):
+            value = int(value)
+            if value < 32:
+                raise ValueError("analysis_max_side must be at least 32")
+            return value
+        if camera is not None and camera.analysis_max_side:
+            return camera.analysis_max_side
+        return getattr(settings, 'FIRE_DETECTION_ANALYSIS_MAX_SIDE', None)
+
+    def get_tiled(self, request, camera=None):
+        """
+        Tiled detection: the `tiled` field, else the camera's resolution
+        (FIRE_DETECTION_TILED_RESOLUTIONS). Raises ValueError on an invalid value.
+        """
+        value = request.data.get('tiled')
+        if value not in (None, ''):
+            value = str(value).lower()
+            if value not in self.TRUE_VALUES + self.FALSE_VALUES:
+                raise ValueError("tiled must be a boolean")
+            return value in self.TRUE_VALUES
+        return camera is not None and camera.tiled_detection
+
+    def get_render_options(self, request, camera=None):
+        """
+        How the result is returned:
+        - response_format: 'json' (annotated image base64 in the body, default), 'multipart'
+          (JSON part + raw image part) or 'url' (image saved under media/detections/)
+        - image_format: 'jpeg' (default) or 'webp'
+        - annotate: draw the detections; defaults to off for camera polling (requests naming
+          a `camera` with a JSON response) and on otherwise
+        - annotation_max_side: longest side (px) of the annotated image, the `thumbnail_max_side`
+          field else FIRE_DETECTION_ANNOTATION_MAX_SIDE (None = full resolution)
+        Raises ValueError on an invalid value.
+        """
+        response_format = (request.data.get('response_format') or 'json').lower()
+        if response_format not in self.RESPONSE_FORMATS:
+            raise ValueError(f"response_format must be one of {', '.join(self.RESPONSE_FORMATS)}")
+        image_format = (request.data.get('image_format') or 'jpeg').lower()
+        if image_format not in self.IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {', '.join(self.IMAGE_FORMATS)}")
+
+        annotate = str(request.data.get('annotate', '')).lower()
+        if annotate in self.TRUE_VALUES:
+            annotate = True
+        elif annotate in self.FALSE_VALUES:
+            annotate = False
+        elif annotate == '':
+            annotate = camera is None or response_format != 'json'
+        else:
+            raise ValueError("annotate must be a boolean")
+
+        annotation_max_side = request.data.get('thumbnail_max_side')
+        if annotation_max_side not in (None, ''):
+            annotation_max_side = int(annotation_max_side)
+            if annotation_max_side < 32:
+                raise ValueError("thumbnail_max_side must be at least 32")
+        else:
+            annotation_max_side = getattr(settings, 'FIRE_DETECTION_ANNOTATION_MAX_SIDE', None)
+
+        return {
+            'response_format': response_format,
+            'image_format': image_format,
+            'annotate': annotate,
+            'annotation_max_side': annotation_max_side,
+        }
+
+    def multipart_response(self, payload, image_bytes, content_type, extension):
+        """multipart/mixed response: the JSON result, then the raw annotated image"""
+        boundary = uuid.uuid4().hex
+        body = b''.join([
+            f'--{boundary}\r\nContent-Type: application/json\r\n'
+            f'Content-Disposition: inline; name="result"\r\n\r\n'.encode(),
+            JSONRenderer().render(payload),
+            f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Disposition: inline; name="annotated_image"; filename="annotated.{extension}"\r\n\r\n'.encode(),
+            image_bytes,
+            f'\r\n--{boundary}--\r\n'.encode(),
+        ])
+        return HttpResponse(body, content_type=f'multipart/mixed; boundary={boundary}')
+
+    def detection_response(self, request, payload, annotated_image, options, result=None, camera=None):
+        """
+        Render the detection payload and its annotated image in the requested format.
+        With `result`, a positive detection is recorded as a DetectionEvent (with the
+        saved image as snapshot for the 'url' format).
+        """
+        fire_detector = get_fire_detector()
+        pil_format, content_type, extension = self.IMAGE_FORMATS[options['image_format']]
+        response_format = options['response_format']
+        payload['annotated_image_type'] = content_type if annotated_image else None
+        snapshot = ''
+
+        if response_format == 'json':
+            payload['annotated_image_base64'] = None
+            if annotated_image:
+                payload['annotated_image_base64'] = fire_detector.image_to_base64(annotated_image, pil_format)
+            response = Response(payload, status=status.HTTP_200_OK)
+        else:
+            image_bytes = fire_detector.encode_image(annotated_image, pil_format) if annotated_image else None
+            if response_format == 'url':
+                payload['annotated_image_url'] = None
+                if image_bytes:
+                    snapshot = save_snapshot(image_bytes, extension)
+                    payload['annotated_image_url'] = request.build_absolute_uri(default_storage.url(snapshot))
+                response = Response(payload, status=status.HTTP_200_OK)
+            elif image_bytes is None:
+                # multipart: plain JSON when there is no image to attach
+                response = Response(payload, status=status.HTTP_200_OK)
+            else:
+                response = self.multipart_response(payload, image_bytes, content_type, extension)
+
+        if result is not None:
+            record_detection(result, camera=camera, source='api', snapshot=snapshot)
+        return response
+
+
+class FireDetectionAPIView(FireDetectionOptionsMixin, APIView):
     """
     POST: Detect fire in uploaded image using AI
     """
@@ -79,6 +433,14 @@ class FireDetectionAPIView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request):
+        try:
+            camera = self.get_camera(request)
+            analysis_max_side = self.get_analysis_max_side(request, camera)
+            tiled = self.get_tiled(request, camera)
+            options = self.get_render_options(request, camera)
+        except ValueError as e:
+            return Response({'error': f'Invalid detection options: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Get uploaded image
             image_file = request.FILES.get('image')
@@ -92,44 +454,30 @@ class FireDetectionAPIView(APIView):
             image_data = image_file.read()
             
             # Detect fire using AI service
-            result = fire_detector.detect_fire_in_image(image_data)
-            
-            # Convert annotated image to base64 for response
-            annotated_image_base64 = None
-            if result['annotated_image']:
-                annotated_image_base64 = fire_detector.image_to_base64(result['annotated_image'])
-            
-            # Determine alert level
-            alert_level = 'NORMAL'
-            if result['fire_detected'] and result['smoke_detected']:
-                alert_level = 'CRITICAL'
-            elif result['fire_detected']:
-                alert_level = 'HIGH'
-            elif result['smoke_detected']:
-                alert_level = 'HIGH'
-            
-            # Create response message
-            if result['fire_detected'] or result['smoke_detected']:
-                detected_items = []
-                if result['fire_detected']:
-                    detected_items.append('🔥 FIRE')
-                if result['smoke_detected']:
-                    detected_items.append('💨 SMOKE')
-                message = f"⚠️ ALERT: {' and '.join(detected_items)} detected! Confidence: {result['confidence']:.1%}"
-            else:
-                message = "✅ No fire or smoke detected. Environment is safe."
+            fire_detector = get_fire_detector()
+            with heavy_job():
+                result = fire_detector.detect_fire_in_image(
+                    image_data,
+                    analysis_max_side=analysis_max_side,
+                    annotate=options['annotate'],
+                    annotation_max_side=options['annotation_max_side'],
+                    tiled=tiled,
+                    zones=camera.detection_zones if camera is not None else None
+                )
             
-            return Response({
+            payload = {
                 'success': True,
                 'fire_detected': result['fire_detected'],
                 'smoke_detected': result['smoke_detected'],
                 'confidence': result['confidence'],
                 'detections': result['detections'],
-                'annotated_image_base64': annotated_image_base64,
-                'alert_level': alert_level,
-                'message': message
-            }, status=status.HTTP_200_OK)
+                'alert_level': alert_level(result),
+                'message': alert_message(result)
+            }
+            return self.detection_response(request, payload, result['annotated_image'], options, result, camera)
             
+        except ComputeBusy as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
         except Exception as e:
             return Response(
                 {'error': f'Fire detection failed: {str(e)}'},
@@ -137,7 +485,7 @@ class FireDetectionAPIView(APIView):
             )
 
 
-class FireDetectionHeuristicAPIView(APIView):
+class FireDetectionHeuristicAPIView(FireDetectionOptionsMixin, APIView):
     """
     POST: Detect fire using color-based heuristic method (fallback)
     """
@@ -145,6 +493,14 @@ class FireDetectionHeuristicAPIView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request):
+        try:
+            camera = self.get_camera(request)
+            analysis_max_side = self.get_analysis_max_side(request, camera)
+            tiled = self.get_tiled(request, camera)
+            options = self.get_render_options(request, camera)
+        except ValueError as e:
+            return Response({'error': f'Invalid detection options: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Get uploaded image
             image_file = request.FILES.get('image')
@@ -158,12 +514,24 @@ class FireDetectionHeuristicAPIView(APIView):
             image_data = image_file.read()
             
             # Detect fire using heuristic method
-            result = fire_detector.detect_fire_heuristic(image_data)
-            
-            # Convert annotated image to base64
-            annotated_image_base64 = None
-            if result['annotated_image']:
-                annotated_image_base64 = fire_detector.image_to_base64(result['annotated_image'])
+            fire_detector = get_fire_detector()
+            zones = camera.detection_zones if camera is not None else None
+            with heavy_job():
+                if tiled:
+                    result = fire_detector.detect_fire_heuristic_tiled(
+                        image_data,
+                        annotate=options['annotate'],
+                        annotation_max_side=options['annotation_max_side'],
+                        zones=zones
+                    )
+                else:
+                    result = fire_detector.detect_fire_heuristic(
+                        image_data,
+                        analysis_max_side,
+                        annotate=options['annotate'],
+                        annotation_max_side=options['annotation_max_side'],
+                        zones=zones
+                    )
             
             # Determine alert level
             alert_level = 'HIGH' if result['fire_detected'] else 'NORMAL'
@@ -171,20 +539,150 @@ class FireDetectionHeuristicAPIView(APIView):
             # Create response message
             message = "🔥 Fire-like colors detected!" if result['fire_detected'] else "✅ No fire detected."
             
-            return Response({
+            payload = {
                 'success': True,
                 'fire_detected': result['fire_detected'],
                 'smoke_detected': result['smoke_detected'],
                 'confidence': result['confidence'],
                 'detections': result['detections'],
-                'annotated_image_base64': annotated_image_base64,
                 'alert_level': alert_level,
                 'message': message,
                 'method': 'heuristic'
-            }, status=status.HTTP_200_OK)
+            }
+            return self.detection_response(request, payload, result['annotated_image'], options, result, camera)
             
+        except ComputeBusy as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
         except Exception as e:
             return Response(
                 {'error': f'Fire detection failed: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class FireDetectionBatchAPIView(FireDetectionOptionsMixin, APIView):
+    """
+    POST: Detect fire in a set of images (zip `archive` or several `images` files)
+    Frames are analyzed in parallel by the batch process pool and returned as NDJSON, one
+    line per frame as soon as it is analyzed ({"type": "frame", "index": ...}, completion
+    order), then a {"type": "summary"} line: first frame with fire, highest confidence and
+    confidence timeline. Options: `analysis_max_side`, `tiled`, `camera` (zones).
+    Batch results are not recorded as detection events (archived footage).
+    A batch holds one heavy job slot until its stream ends (503 when none is freed in time).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        try:
+            camera = self.get_camera(request)
+            options = {
+                'analysis_max_side': self.get_analysis_max_side(request, camera),
+                'tiled': self.get_tiled(request, camera),
+                'zones': camera.detection_zones if camera is not None else None,
+            }
+        except ValueError as e:
+            return Response({'error': f'Invalid detection options: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            archive = request.FILES.get('archive')
+            frames = archive_frames(archive) if archive else upload_frames(request.FILES.getlist('images'))
+        except BatchInputError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not frames:
+            return Response({'error': 'No image provided (zip `archive` or `images` files)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        def lines():
+            summary = BatchSummary(len(frames))
+            try:
+                for frame in detect_batch(frames, options, summary=summary):
+                    yield json.dumps({'type': 'frame', **frame}) + '\n'
+            except Exception as e:
+                yield json.dumps({'type': 'error', 'error': f'Batch detection failed: {e}'}) + '\n'
+            yield json.dumps({'type': 'summary', **summary.as_dict()}) + '\n'
+
+        try:
+            stream = HeavyJobStream(lines())
+        except ComputeBusy as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+        response = StreamingHttpResponse(stream, content_type='application/x-ndjson')
+        # Ask proxies (nginx) not to buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class FireDetectionJobsAPIView(FireDetectionOptionsMixin, APIView):
+    """
+    POST: Queue a fire detection (same fields as detect-fire) and return its job at once
+    (202, `Location`: the job URL). 429 when the detection queue of the server is full.
+    The annotated image is returned by URL in the job result.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        try:
+            camera = self.get_camera(request)
+            options = self.get_render_options(request, camera)
+            detect_options = {
+                'analysis_max_side': self.get_analysis_max_side(request, camera),
+                'tiled': self.get_tiled(request, camera),
+                'zones': camera.detection_zones if camera is not None else None,
+                'annotate': options['annotate'],
+                'annotation_max_side': options['annotation_max_side'],
+                'image_format': self.IMAGE_FORMATS[options['image_format']],
+            }
+        except ValueError as e:
+            return Response({'error': f'Invalid detection options: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        image_file = request.FILES.get('image')
+        if not image_file:
+            return Response({'error': 'No image provided'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            job = submit_job(image_file.read(), detect_options, camera=camera, user=request.user)
+        except QueueFull as e:
+            return Response({'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': '1'})
+
+        location = request.build_absolute_uri(reverse('fire-detection-job', args=[job.pk]))
+        data = DetectionJobSerializer(job, context={'request': request}).data
+        data['url'] = location
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+
+class FireDetectionJobDetailAPIView(APIView):
+    """
+    GET: Status of a detection job, with its result once done. `wait` (seconds, at most
+    DETECTION_JOBS_MAX_WAIT) holds the request until the job finishes (long poll); the
+    poll occupies a server thread meanwhile, hence the short cap.
+    DELETE: Cancel a queued or running job, or delete a finished one and its result.
+    Jobs are only visible to their creator (and staff); expired jobs are gone (404).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_job(self, request, pk):
+        jobs = DetectionJob.objects.filter(pk=pk, expires_at__gte=timezone.now())
+        if not request.user.is_staff:
+            jobs = jobs.filter(created_by=request.user)
+        return get_object_or_404(jobs)
+
+    def get(self, request, pk):
+        job = self.get_job(request, pk)
+        wait = request.query_params.get('wait')
+        if wait:
+            try:
+                wait = float(wait)
+            except ValueError:
+                return Response({'error': 'wait must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                job = wait_for_job(job, min(max(wait, 0.0), getattr(settings, 'DETECTION_JOBS_MAX_WAIT', 5.0)))
+            except DetectionJob.DoesNotExist:
+                return Response({'error': 'Job deleted'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(DetectionJobSerializer(job, context={'request': request}).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk):
+        job = self.get_job(request, pk)
+        if cancel_job(job):
+            job.refresh_from_db()
+            return Response(DetectionJobSerializer(job, context={'request': request}).data, status=status.HTTP_200_OK)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,48 @@
+"""
+ORB extraction profiles and packed descriptor storage
+Descriptors are stored as one contiguous uint8 buffer (32 bytes per keypoint) so they
+can be turned back into a NumPy array without copying
+"""
+
+import numpy as np
+from django.conf import settings
+
+
+# ORB descriptors are 256 bits
+DESCRIPTOR_SIZE = 32
+
+# nfeatures: keypoints kept, nlevels: pyramid levels, max_side: working resolution (None = full size)
+ORB_PROFILES = {
+    'fast': {'nfeatures': 250, 'nlevels': 4, 'max_side': 320},
+    'balanced': {'nfeatures': 500, 'nlevels': 8, 'max_side': 640},
+    # The extraction recognition has always used: cv2.ORB_create(nfeatures=500) at full size
+    'standard': {'nfeatures': 500, 'nlevels': 8, 'max_side': None},
+    'accurate': {'nfeatures': 1000, 'nlevels': 8, 'max_side': None},
+}
+
+DEFAULT_ORB_PROFILE = 'standard'
+
+
+def get_orb_profile_name(name=None):
+    """Resolve a profile name, defaulting to EQUIPMENT_ORB_PROFILE"""
+    name = name or getattr(settings, 'EQUIPMENT_ORB_PROFILE', DEFAULT_ORB_PROFILE)
+    if name not in ORB_PROFILES:
+        raise ValueError(f"Unknown ORB profile '{name}' (expected one of {', '.join(ORB_PROFILES)})")
+    return name
+
+
+def pack_descriptors(descriptors):
+    """Pack an (N, 32) uint8 descriptor array into bytes (b'' for an image without keypoints)"""
+    if descriptors is None:
+        return b''
+    return np.ascontiguousarray(descriptors, dtype=np.uint8).tobytes()
+
+
+def unpack_descriptors(buffer):
+    """
+    Zero-copy view of packed descriptors as an (N, 32) read-only uint8 array.
+    Returns None for an empty buffer.
+    """
+    if not buffer:
+        return None
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(-1, DESCRIPTOR_SIZE)
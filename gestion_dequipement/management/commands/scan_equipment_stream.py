@@ -0,0 +1,68 @@
+import threading
+
+from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_camera.models import Camera
+from gestion_dequipement.stream_scanner import EquipmentStreamScanner
+
+
+class Command(BaseCommand):
+    help = "Scan camera feeds for prohibited (INTERDIT) equipment and raise zone alerts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('camera_ids', nargs='+', type=int, help="IDs of the cameras to scan")
+        parser.add_argument('--source', help="Local video file or stream URL to use instead of the camera feed (single camera only)")
+        parser.add_argument('--fps', type=float, default=2.0, help="Frames sampled per second and per camera")
+        parser.add_argument('--max-recognitions', type=float, default=1.0, help="Recognitions per second and per camera")
+        parser.add_argument('--min-score', type=float, default=30.0, help="Minimum ORB score (0-100) to raise an alert")
+        parser.add_argument('--max-frames', type=int, help="Stop after this many sampled frames per camera")
+
+    def handle(self, *args, **options):
+        if options['source'] and len(options['camera_ids']) > 1:
+            raise CommandError("--source can only be used with a single camera")
+
+        cameras = list(Camera.objects.filter(pk__in=options['camera_ids']))
+        missing = set(options['camera_ids']) - {c.id_camera for c in cameras}
+        if missing:
+            raise CommandError(f"Unknown camera id(s): {', '.join(map(str, sorted(missing)))}")
+
+        scanners = []
+        for camera in cameras:
+            scanner = EquipmentStreamScanner(
+                camera,
+                source=options['source'],
+                sample_fps=options['fps'],
+                max_recognitions_per_sec=options['max_recognitions'],
+                min_score=options['min_score'],
+            )
+            references = scanner.load_references()
+            self.stdout.write(f"{camera.name}: {len(references)} prohibited equipment reference(s), source {scanner.source}")
+            scanners.append(scanner)
+
+        stop_event = threading.Event()
+        threads = [
+            threading.Thread(target=self._run, args=(scanner, options['max_frames'], stop_event), daemon=True)
+            for scanner in scanners
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        for scanner in scanners:
+            self.stdout.write(self.style.SUCCESS(f"{scanner.camera.name}: {scanner.stats}"))
+
+    def _run(self, scanner, max_frames, stop_event):
+        try:
+            scanner.run(max_frames=max_frames, stop_event=stop_event)
+        except IOError as exc:
+            self.stderr.write(f"{scanner.camera.name}: {exc}")
+        finally:
+            connection.close()
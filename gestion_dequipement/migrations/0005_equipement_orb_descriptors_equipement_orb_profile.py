@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_dequipement', '0004_equipement_phash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipement',
+            name='orb_descriptors',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipement',
+            name='orb_profile',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
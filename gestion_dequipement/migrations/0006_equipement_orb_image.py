@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_dequipement', '0005_equipement_orb_descriptors_equipement_orb_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipement',
+            name='orb_image',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -15,6 +15,11 @@ class Equipement(models.Model):
     image = models.ImageField(upload_to='equipements/', null=True, blank=True)
     image_hash = models.CharField(max_length=64, blank=True, null=True)
     phash = models.CharField(max_length=64, blank=True, null=True)
+    # Packed ORB descriptors of `image` (see descriptors.py), the profile used to extract
+    # them and the name of the image they come from (a replaced image invalidates them)
+    orb_descriptors = models.BinaryField(blank=True, null=True)
+    orb_profile = models.CharField(max_length=20, blank=True, null=True)
+    orb_image = models.CharField(max_length=255, blank=True, null=True)
 
     class Meta:
         verbose_name = "Équipement"
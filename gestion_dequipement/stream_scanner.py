@@ -0,0 +1,197 @@
+"""
+Live-feed scanning for prohibited equipment
+Samples frames from a camera feed (or a local video file), matches them against
+the INTERDIT equipment references and raises a ZoneAlert on confident matches
+"""
+
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from gestion_camera.streams import camera_stream_url, is_file_source, open_video_source
+from zones_app.models import Zone, ZoneAlert
+from .models import Equipement
+from .views import ImageHashMixin
+
+
+class EquipmentStreamScanner(ImageHashMixin):
+    """
+    Scans one camera feed for INTERDIT equipment.
+
+    Cost is bounded per camera so many feeds can share one host:
+    - frames are sampled at `sample_fps` (the others are grabbed but never decoded)
+    - frames whose thumbnail barely differs from the last analyzed frame are skipped
+    - frames that look like a recently analyzed frame reuse its cached result
+    - recognitions are rate limited to `max_recognitions_per_sec`
+    - reference descriptors are computed once, not on every frame
+    """
+
+    STATIC_THUMB_SIZE = (64, 64)
+    CACHE_SIZE = 8
+
+    def __init__(self, camera, source=None, sample_fps=2.0, max_recognitions_per_sec=1.0,
+                 min_score=30.0, static_threshold=2.0, cache_distance=6, alert_cooldown=60.0):
+        self.camera = camera
+        self.source = source if source is not None else camera_stream_url(camera)
+        self.sample_fps = sample_fps
+        self.max_recognitions_per_sec = max_recognitions_per_sec
+        self.min_score = min_score
+        self.static_threshold = static_threshold
+        self.cache_distance = cache_distance
+        self.alert_cooldown = alert_cooldown
+
+        self.references = []  # [(equipement, descriptors)]
+        self.zone = Zone.objects.filter(name__iexact=camera.zone).first()
+        self._previous_thumb = None
+        self._result_cache = OrderedDict()  # frame hash -> match or None
+        self._last_recognition = None
+        self._last_alert = {}  # id_equipement -> monotonic time of last alert
+        self.stats = {
+            'sampled': 0,
+            'static_skipped': 0,
+            'cache_hits': 0,
+            'rate_limited': 0,
+            'recognized': 0,
+            'alerts': 0,
+        }
+
+    def load_references(self):
+        """Load the stored ORB descriptors of every INTERDIT equipment image once"""
+        self.references = []
+        for eq in Equipement.objects.filter(statut=Equipement.Statut.INTERDIT):
+            try:
+                des = self._equipement_descriptors(eq)
+            except Exception:
+                continue
+            if des is not None:
+                self.references.append((eq, des))
+        return self.references
+
+    def _thumbnail(self, frame_bgr):
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, self.STATIC_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+    def _is_static(self, thumb):
+        """Compare a small grayscale thumbnail with the last analyzed frame"""
+        if self._previous_thumb is None:
+            return False
+        return float(cv2.absdiff(thumb, self._previous_thumb).mean()) < self.static_threshold
+
+    def _cached_result(self, frame_hash):
+        for cached_hash, result in self._result_cache.items():
+            if self._hamming_distance_hex64(frame_hash, cached_hash) <= self.cache_distance:
+                self._result_cache.move_to_end(cached_hash)
+                return True, result
+        return False, None
+
+    def _remember(self, frame_hash, result):
+        self._result_cache[frame_hash] = result
+        while len(self._result_cache) > self.CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
+    def recognize(self, image):
+        """Return (equipement, orb_score) of the best INTERDIT match above min_score, or None"""
+        des = self._orb_descriptors(image)
+        best = None
+        for eq, ref_des in self.references:
+            score = self._orb_descriptor_score(des, ref_des)
+            if score >= self.min_score and (best is None or score > best[1]):
+                best = (eq, score)
+        return best
+
+    def scan_frame(self, frame_bgr, timestamp=None):
+        """
+        Analyze one sampled frame taken at `timestamp` seconds (wall clock by default,
+        media time when replaying a file).
+        Returns the (equipement, orb_score) match, or None when nothing was found or the
+        frame was skipped.
+        """
+        self.stats['sampled'] += 1
+        thumb = self._thumbnail(frame_bgr)
+        if self._is_static(thumb):
+            self.stats['static_skipped'] += 1
+            return None
+
+        image = Image.fromarray(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+        frame_hash = self._average_hash(image)
+        hit, match = self._cached_result(frame_hash)
+        if hit:
+            self.stats['cache_hits'] += 1
+        else:
+            now = time.monotonic() if timestamp is None else timestamp
+            if (self._last_recognition is not None and self.max_recognitions_per_sec
+                    and now - self._last_recognition < 1.0 / self.max_recognitions_per_sec):
+                # Not marked as analyzed: the next sample gets another chance
+                self.stats['rate_limited'] += 1
+                return None
+            self._last_recognition = now
+            match = self.recognize(image)
+            self.stats['recognized'] += 1
+            self._remember(frame_hash, match)
+        self._previous_thumb = thumb
+
+        if match is not None:
+            self.raise_alert(*match)
+        return match
+
+    def raise_alert(self, equipement, score):
+        """Create a ZoneAlert for the camera's zone, at most once per cooldown per equipment"""
+        if self.zone is None:
+            print(f"⚠️ No zone named '{self.camera.zone}' for camera {self.camera.name}, alert not raised")
+            return None
+        now = time.monotonic()
+        last = self._last_alert.get(equipement.id_equipement)
+        if last is not None and now - last < self.alert_cooldown:
+            return None
+        self._last_alert[equipement.id_equipement] = now
+        self.stats['alerts'] += 1
+        return ZoneAlert.objects.create(
+            zone=self.zone,
+            severity='high',
+            message=(
+                f"Équipement interdit détecté: {equipement.nom} "
+                f"(caméra {self.camera.name}, score ORB {score:.1f}%)"
+            ),
+        )
+
+    def run(self, max_frames=None, stop_event=None):
+        """
+        Read the source until it ends, `max_frames` frames were sampled or `stop_event` is set.
+        Local files are sampled by frame position (as fast as possible); live feeds by wall clock.
+        """
+        if not self.references:
+            self.load_references()
+        capture = open_video_source(self.source)
+        replay = is_file_source(self.source)
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_step = max(1, int(round(source_fps / self.sample_fps))) if replay else 1
+        interval = 1.0 / self.sample_fps
+        next_sample = time.monotonic()
+        frame_index = 0
+        try:
+            while stop_event is None or not stop_event.is_set():
+                # grab() only demuxes; frames we do not sample are never decoded
+                if not capture.grab():
+                    break
+                frame_index += 1
+                if replay:
+                    if (frame_index - 1) % frame_step:
+                        continue
+                else:
+                    now = time.monotonic()
+                    if now < next_sample:
+                        continue
+                    next_sample = now + interval
+                ok, frame = capture.retrieve()
+                if not ok or frame is None:
+                    continue
+                timestamp = (frame_index - 1) / source_fps if replay else None
+                self.scan_frame(np.ascontiguousarray(frame), timestamp)
+                if max_frames is not None and self.stats['sampled'] >= max_frames:
+                    break
+        finally:
+            capture.release()
+        return self.stats
@@ -11,6 +11,8 @@ import numpy as np
 import cv2
 from .models import Equipement
 from .serializers import EquipementSerializer
+from CyberCobra.compute_resources import ComputeBusy, heavy_job
+from .descriptors import ORB_PROFILES, get_orb_profile_name, pack_descriptors, unpack_descriptors
 
 
 class ImageHashMixin:
@@ -158,47 +160,86 @@ class ImageHashMixin:
         except Exception:
             return 64
     
-    def _orb_feature_match(self, img1: Image.Image, img2: Image.Image) -> float:
+    def _orb_feature_match(self, img1: Image.Image, img2: Image.Image, profile: str = None) -> float:
         """
         Use ORB features to match two images - rotation and scale invariant.
         Returns a similarity score (0-100, higher is better match).
         """
         try:
-            # Convert PIL to opencv
-            cv_img1 = cv2.cvtColor(np.array(img1), cv2.COLOR_RGB2GRAY)
-            cv_img2 = cv2.cvtColor(np.array(img2), cv2.COLOR_RGB2GRAY)
-            
-            # Initialize ORB detector
-            orb = cv2.ORB_create(nfeatures=500)
-            
-            # Find keypoints and descriptors
-            kp1, des1 = orb.detectAndCompute(cv_img1, None)
-            kp2, des2 = orb.detectAndCompute(cv_img2, None)
-            
-            if des1 is None or des2 is None or len(kp1) < 10 or len(kp2) < 10:
-                return 0.0
-            
-            # BFMatcher with Hamming distance
-            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-            matches = bf.knnMatch(des1, des2, k=2)
-            
-            # Apply ratio test (Lowe's ratio test)
-            good_matches = []
-            for pair in matches:
-                if len(pair) == 2:
-                    m, n = pair
-                    if m.distance < 0.75 * n.distance:
-                        good_matches.append(m)
-            
-            # Compute similarity score
-            if len(good_matches) > 0:
-                # Normalize by the number of keypoints
-                score = (len(good_matches) / min(len(kp1), len(kp2))) * 100
-                return min(score, 100.0)
-            return 0.0
+            des1 = self._orb_descriptors(img1, profile)
+            des2 = self._orb_descriptors(img2, profile)
+            return self._orb_descriptor_score(des1, des2)
         except Exception:
             return 0.0
 
+    def _orb_descriptors(self, img: Image.Image, profile: str = None):
+        """
+        Return the ORB descriptors of an image (one row per keypoint), or None.
+        The extraction profile (see descriptors.ORB_PROFILES) sets the feature count,
+        pyramid levels and working resolution.
+        """
+        params = ORB_PROFILES[get_orb_profile_name(profile)]
+        img = img.convert('L')
+        max_side = params['max_side']
+        if max_side and max(img.size) > max_side:
+            # Downscale before detection: cost grows with the pixel count
+            scale = max_side / max(img.size)
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.BILINEAR)
+        cv_img = np.asarray(img, dtype=np.uint8)
+
+        # Initialize ORB detector
+        orb = cv2.ORB_create(nfeatures=params['nfeatures'], nlevels=params['nlevels'])
+        _, des = orb.detectAndCompute(cv_img, None)
+        return des
+
+    def _equipement_descriptors(self, equipement, profile: str = None):
+        """
+        Stored ORB descriptors of an equipment image as a zero-copy uint8 view.
+        Computes and saves them when missing, extracted with another profile or from
+        another image (replaced in the admin, or a failed recomputation).
+        """
+        profile = get_orb_profile_name(profile)
+        # b'' is a cached result too: the image has no keypoints
+        if (equipement.orb_descriptors is not None and equipement.orb_profile == profile
+                and equipement.orb_image == equipement.image.name):
+            return unpack_descriptors(equipement.orb_descriptors)
+        if not equipement.image or not hasattr(equipement.image, 'path') or not os.path.exists(equipement.image.path):
+            return None
+        with Image.open(equipement.image.path) as im:
+            des = self._orb_descriptors(im, profile)
+        equipement.orb_descriptors = pack_descriptors(des)
+        equipement.orb_profile = profile
+        equipement.orb_image = equipement.image.name
+        equipement.save(update_fields=['orb_descriptors', 'orb_profile', 'orb_image'])
+        return unpack_descriptors(equipement.orb_descriptors)
+
+    def _orb_descriptor_score(self, des1, des2) -> float:
+        """
+        Score two precomputed ORB descriptor sets (0-100, higher is better match).
+        Keypoint counts are the descriptor row counts.
+        """
+        if des1 is None or des2 is None or len(des1) < 10 or len(des2) < 10:
+            return 0.0
+
+        # BFMatcher with Hamming distance
+        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+        matches = bf.knnMatch(des1, des2, k=2)
+
+        # Apply ratio test (Lowe's ratio test)
+        good_matches = []
+        for pair in matches:
+            if len(pair) == 2:
+                m, n = pair
+                if m.distance < 0.75 * n.distance:
+                    good_matches.append(m)
+
+        # Compute similarity score
+        if len(good_matches) > 0:
+            # Normalize by the number of keypoints
+            score = (len(good_matches) / min(len(des1), len(des2))) * 100
+            return min(score, 100.0)
+        return 0.0
+
     def _compute_and_save_hashes(self, instance):
         """Helper to compute and save image hashes for an equipment instance"""
         try:
@@ -206,9 +247,14 @@ class ImageHashMixin:
                 instance.image_hash = self._path_average_hash(instance.image.path)
                 with Image.open(instance.image.path) as im:
                     instance.phash = self._phash(im)
-                instance.save(update_fields=['image_hash', 'phash'])
+                    profile = get_orb_profile_name()
+                    instance.orb_descriptors = pack_descriptors(self._orb_descriptors(im, profile))
+                    instance.orb_profile = profile
+                    instance.orb_image = instance.image.name
+                instance.save(update_fields=['image_hash', 'phash', 'orb_descriptors', 'orb_profile', 'orb_image'])
         except Exception:
-            pass
+            # Never keep the descriptors of a previous image
+            Equipement.objects.filter(pk=instance.pk).update(orb_descriptors=None, orb_profile=None, orb_image=None)
 
 
 class EquipementListCreateAPIView(ImageHashMixin, APIView):
@@ -294,15 +340,23 @@ class EquipementRecognizeAPIView(ImageHashMixin, APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request):
+        file = request.FILES.get("image")
+        if not file:
+            return Response({"detail": "image is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # At most COMPUTE_MAX_HEAVY_JOBS recognitions/detections run at once in this worker
+        try:
+            with heavy_job():
+                return self.recognize(file)
+        except ComputeBusy as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+
+    def recognize(self, file):
         """
         Recognition v2: Try perceptual hash match against stored equipment images.
         If a close match is found, return that equipment's saved statut.
         Otherwise, fall back to brightness heuristic.
         """
-        file = request.FILES.get("image")
-        if not file:
-            return Response({"detail": "image is required"}, status=status.HTTP_400_BAD_REQUEST)
-
         try:
             # 1) Try ORB feature matching (rotation & scale invariant)
             uploaded = Image.open(file)
@@ -310,12 +364,13 @@ class EquipementRecognizeAPIView(ImageHashMixin, APIView):
             
             best_orb = None  # (equip, score)
             candidates = Equipement.objects.all()
+            uploaded_des = self._orb_descriptors(uploaded)
             for eq in candidates:
-                if not eq.image or not hasattr(eq.image, 'path') or not os.path.exists(eq.image.path):
-                    continue
                 try:
-                    ref_img = Image.open(eq.image.path)
-                    orb_score = self._orb_feature_match(uploaded, ref_img)
+                    ref_des = self._equipement_descriptors(eq)
+                    if ref_des is None:
+                        continue
+                    orb_score = self._orb_descriptor_score(uploaded_des, ref_des)
                     if orb_score > 25:  # Minimum 25% match
                         if best_orb is None or orb_score > best_orb[1]:
                             best_orb = (eq, orb_score)
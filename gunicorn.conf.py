@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration, read automatically from the project directory:
+
+    gunicorn CyberCobra.wsgi
+
+Workers and threads per worker: WEB_CONCURRENCY (default 2) and GUNICORN_THREADS
+(default 4). Each worker limits its OpenCV, BLAS and model runtime threads to its share
+of the cores when it boots (CyberCobra/compute_resources.py).
+"""
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+# Detection of large images on a loaded host can take a few seconds
+timeout = 120
+
+
+def post_fork(server, worker):
+    # Also right with --preload, where OpenCV was loaded by the master before the fork
+    from CyberCobra.compute_resources import configure_compute
+    threads = configure_compute(workers=server.cfg.workers)
+    server.log.info("Worker %s: %s compute threads", worker.pid, threads)
@@ -0,0 +1,144 @@
+"""
+Load test of the per-process compute configuration
+Simulates a gunicorn deployment: --workers processes with --threads request threads each
+run the fire detection request path (JPEG decode, detect_fire_in_image with annotation,
+base64 encoding) in a loop, in two modes:
+- default: the libraries keep their own thread pools (one thread per core each, or
+  --default-threads to reproduce a bigger host) and every request runs at once
+- configured: configure_compute() at process start (threads = cores / workers) and
+  heavy_job() around the detection, as in the API views
+
+and reports throughput, latency percentiles and involuntary context switches per request
+(a sign of oversubscription: threads preempted while holding a core).
+
+Usage:
+    python loadtest_compute_resources.py [--workers 4] [--threads 4] [--duration 10]
+        [--width 1920 --height 1080] [--default-threads 8] [--max-heavy-jobs 2]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import threading
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import cv2
+import numpy as np
+
+
+def request_image(width, height):
+    """JPEG of a scene with a flame-colored blob (the heuristic finds it: annotation is drawn)"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(60, 110, (height, width, 3), dtype=np.uint8)
+    cv2.ellipse(frame, (width // 2, height // 2), (height // 8, height // 5), 0, 0, 360, (0, 140, 255), -1)
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def worker(mode, args, image, start, results):
+    from django.conf import settings
+
+    from CyberCobra.compute_resources import ComputeBusy, configure_compute, heavy_job
+    from gestion_camera.fire_detection_service import get_fire_detector
+
+    if mode == 'configured':
+        if args.max_heavy_jobs:
+            settings.COMPUTE_MAX_HEAVY_JOBS = args.max_heavy_jobs
+        threads = configure_compute(workers=args.workers)
+    else:
+        threads = args.default_threads or cv2.getNumThreads()
+        cv2.setNumThreads(threads)
+    detector = get_fire_detector()
+    detector.image_to_base64(detector.detect_fire_in_image(image)['annotated_image'])  # warm-up
+
+    latencies, busy = [], [0]
+    lock = threading.Lock()
+
+    def handle():
+        result = detector.detect_fire_in_image(image)
+        detector.image_to_base64(result['annotated_image'])
+
+    def caller(stop_at):
+        local = []
+        while time.monotonic() < stop_at:
+            begin = time.perf_counter()
+            try:
+                if mode == 'configured':
+                    with heavy_job():
+                        handle()
+                else:
+                    handle()
+            except ComputeBusy:
+                with lock:
+                    busy[0] += 1
+                continue
+            local.append((time.perf_counter() - begin) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    start.wait()
+    switches = resource.getrusage(resource.RUSAGE_SELF).ru_nivcsw
+    stop_at = time.monotonic() + args.duration
+    callers = [threading.Thread(target=caller, args=(stop_at,)) for _ in range(args.threads)]
+    for thread in callers:
+        thread.start()
+    for thread in callers:
+        thread.join()
+    switches = resource.getrusage(resource.RUSAGE_SELF).ru_nivcsw - switches
+    results.put({'latencies': latencies, 'busy': busy[0], 'switches': switches, 'threads': threads})
+
+
+def run_mode(mode, args, image):
+    context = multiprocessing.get_context('spawn')
+    start, results = context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(mode, args, image, start, results)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    # Let every worker load and warm up before the clock starts
+    time.sleep(args.startup)
+    start.set()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    latencies = [latency for report in reports for latency in report['latencies']]
+    return {
+        'threads': reports[0]['threads'],
+        'requests': len(latencies),
+        'throughput': len(latencies) / args.duration,
+        'p50_ms': float(np.percentile(latencies, 50)) if latencies else 0.0,
+        'p95_ms': float(np.percentile(latencies, 95)) if latencies else 0.0,
+        'busy': sum(report['busy'] for report in reports),
+        'switches_per_request': sum(report['switches'] for report in reports) / max(1, len(latencies)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help="Worker processes")
+    parser.add_argument('--threads', type=int, default=4, help="Request threads per worker")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--default-threads', type=int,
+                        help="OpenCV threads per process in default mode (default: the library's, one per core)")
+    parser.add_argument('--max-heavy-jobs', type=int, help="Heavy jobs per worker in configured mode (default COMPUTE_MAX_HEAVY_JOBS)")
+    parser.add_argument('--startup', type=float, default=5.0, help="Seconds left to the workers to load")
+    args = parser.parse_args()
+
+    image = request_image(args.width, args.height)
+    print(f"{args.workers} workers x {args.threads} threads, {os.cpu_count()} cores, {args.width}x{args.height}, {args.duration:g} s per mode\n")
+    print(f"{'mode':<11} {'cv threads':>10} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'503':>5} {'ctx sw/req':>11}")
+    for mode in ('default', 'configured'):
+        row = run_mode(mode, args, image)
+        print(f"{mode:<11} {row['threads']:>10} {row['throughput']:>8.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['busy']:>5} {row['switches_per_request']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
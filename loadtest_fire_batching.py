@@ -0,0 +1,91 @@
+"""
+Load test of the fire detection micro-batching scheduler
+Runs N concurrent callers against the inference backend, first with one model call
+per request (direct), then through BatchingInferenceScheduler, and reports
+throughput and latency percentiles for each concurrency level.
+
+Usage:
+    python loadtest_fire_batching.py --backend onnxruntime --model yolov8n.onnx \
+        [--concurrency 1 2 4 8 16] [--duration 5] [--max-batch-size 8] [--max-wait-ms 10]
+
+Batching needs a model exported with a dynamic batch axis (yolo export ... dynamic=True).
+"""
+import argparse
+import os
+import threading
+import time
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CyberCobra.settings')
+django.setup()
+
+import numpy as np
+
+from gestion_camera.inference_backends import create_backend
+from gestion_camera.inference_scheduler import BatchingInferenceScheduler
+
+
+def run_level(predict, image, concurrency, duration):
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def caller():
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            predict(image)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='onnxruntime')
+    parser.add_argument('--model', help="Model path (backend default if omitted)")
+    parser.add_argument('--threads', type=int, help="Intra-op threads of the runtime")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per concurrency level and mode")
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend, args.model, args.threads)
+    image = np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+    backend.predict([image])  # warm-up
+
+    scheduler = BatchingInferenceScheduler(backend, args.max_batch_size, args.max_wait_ms)
+    modes = {
+        'direct': lambda img: backend.predict([img])[0],
+        'batched': scheduler.predict,
+    }
+
+    print(f"backend={backend.name} max_batch_size={args.max_batch_size} max_wait_ms={args.max_wait_ms}\n")
+    print(f"{'callers':>7} {'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for concurrency in args.concurrency:
+        for mode, predict in modes.items():
+            r = run_level(predict, image, concurrency, args.duration)
+            print(f"{concurrency:>7} {mode:<8} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+    scheduler.close()
+    if scheduler.stats['batches']:
+        print(f"\nMean batch size: {scheduler.stats['requests'] / scheduler.stats['batches']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
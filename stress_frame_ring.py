@@ -0,0 +1,162 @@
+"""
+Torn-read stress test and benchmark of the shared-memory frame ring
+A writer process fills the ring as fast as it can with frames whose every byte is
+the frame number (mod 256); reader processes hold zero-copy views (for a random time
+up to --hold-ms, so the writer laps them), check every pixel and then validate the
+view. A view that still validates with mixed pixels is an undetected torn read.
+
+Also compares handing 1080p frames to another process through the ring and
+through a multiprocessing.Queue (pickling).
+
+Usage:
+    python stress_frame_ring.py [--duration 5] [--readers 3] [--slots 4] [--hold-ms 1]
+
+Exits with status 1 if any torn read went undetected.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+from gestion_camera.frame_ring import SharedFrameRing
+
+
+SHAPE = (240, 320, 3)
+
+
+def writer(name, duration, ready):
+    ring = SharedFrameRing.attach(name)
+    ready.wait()
+    frame = np.empty(SHAPE, np.uint8)
+    stop_at = time.monotonic() + duration
+    written = 0
+    while time.monotonic() < stop_at:
+        with ring.writing() as slot:
+            # Write in two halves to widen the window of a torn read
+            value = written % 256
+            slot[:SHAPE[0] // 2] = value
+            slot[SHAPE[0] // 2:] = value
+        written += 1
+    ring.close_stream()
+    ring.release()
+
+
+def reader(name, ready, results, hold_ms):
+    ring = SharedFrameRing.attach(name)
+    ready.wait()
+    counts = {'clean': 0, 'torn_detected': 0, 'torn_undetected': 0, 'skipped': 0}
+    last = -1
+    while not ring.closed:
+        view = ring.read_latest()
+        if view is None or view.frame_number == last:
+            continue
+        counts['skipped'] += max(0, view.frame_number - last - 1)
+        last = view.frame_number
+        pixels = view.array
+        if hold_ms:
+            time.sleep(random.uniform(0, hold_ms) / 1000)
+        expected = view.frame_number % 256
+        consistent = bool(pixels.min() == expected and pixels.max() == expected)
+        if view.valid():
+            counts['clean' if consistent else 'torn_undetected'] += 1
+        else:
+            counts['torn_detected'] += 1
+        del pixels, view
+    results.put(counts)
+    ring.release()
+
+
+def stress(duration, readers, slots, hold_ms):
+    ctx = multiprocessing.get_context('fork')
+    ring = SharedFrameRing.create(SHAPE, slots)
+    ready = ctx.Event()
+    results = ctx.Queue()
+    processes = [ctx.Process(target=writer, args=(ring.name, duration, ready))]
+    processes += [ctx.Process(target=reader, args=(ring.name, ready, results, hold_ms)) for _ in range(readers)]
+    for process in processes:
+        process.start()
+    ready.set()
+    totals = {}
+    for _ in range(readers):
+        for key, value in results.get().items():
+            totals[key] = totals.get(key, 0) + value
+    for process in processes:
+        process.join()
+    written = ring.frames_written
+    ring.release()
+    return written, totals
+
+
+def queue_consumer(q, count):
+    for _ in range(count):
+        q.get()
+
+
+def ring_consumer(name, count, progress):
+    ring = SharedFrameRing.attach(name)
+    last = -1
+    while last < count - 1:
+        view = ring.read_next(last)
+        if view is not None:
+            view.array[0, 0].copy()  # touch the frame
+            last = progress.value = view.frame_number
+            del view
+    ring.release()
+
+
+def handoff_benchmark(count=200, slots=8):
+    """Frames/s delivered to another process without loss, 1080p BGR"""
+    ctx = multiprocessing.get_context('fork')
+    frame = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+
+    q = ctx.Queue(maxsize=slots)
+    consumer = ctx.Process(target=queue_consumer, args=(q, count))
+    consumer.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        q.put(frame)
+    consumer.join()
+    queue_fps = count / (time.perf_counter() - start)
+
+    ring = SharedFrameRing.create(frame.shape, slots)
+    progress = ctx.Value('q', -1, lock=False)
+    consumer = ctx.Process(target=ring_consumer, args=(ring.name, count, progress))
+    consumer.start()
+    start = time.perf_counter()
+    for number in range(count):
+        # Same backpressure as the bounded queue, so no frame is overwritten unread
+        while number - progress.value > slots - 1:
+            time.sleep(0)
+        ring.write(frame)
+    consumer.join()
+    ring_fps = count / (time.perf_counter() - start)
+    ring.release()
+    return queue_fps, ring_fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=3)
+    parser.add_argument('--slots', type=int, default=4)
+    parser.add_argument('--hold-ms', type=float, default=1.0, help="Maximum time a reader holds a view before checking it")
+    args = parser.parse_args()
+
+    written, totals = stress(args.duration, args.readers, args.slots, args.hold_ms)
+    print(f"Frames written: {written} ({written / args.duration:.0f}/s), {args.readers} readers, {args.slots} slots")
+    for key, value in totals.items():
+        print(f"  {key:<16} {value}")
+
+    queue_fps, ring_fps = handoff_benchmark()
+    print("\n1080p frames handed to another process")
+    print(f"  multiprocessing.Queue (pickle) {queue_fps:>8.0f} frames/s")
+    print(f"  SharedFrameRing                {ring_fps:>8.0f} frames/s")
+
+    if totals.get('torn_undetected'):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()